@@ -1,6 +1,9 @@
 #include <stdio.h>
 #include <stdlib.h>
 #include "baseline_linked_list.h"
+#include "list_probes.h"
+
+LIST_PROBES_DEFINE_SEMAPHORES;
 
 __attribute__((noinline, used, externally_visible))
 void deletion_instrumentation(void *pred, void *target, void *succ) {
@@ -18,22 +21,27 @@ void baseline_insert(BaselineNode** head, int data) {
     // Insert at the head: new_node->next points to the current head.
     new_node->next = *head;
     *head = new_node;
+    LIST_PROBE_INSERT_DONE(head, new_node, data);
 }
 
 int baseline_delete(BaselineNode** head, int data) {
-    if (*head == NULL)
+    if (*head == NULL) {
+        LIST_PROBE_DELETE_MISS(head, data);
         return 0; // List is empty.
+    }
     
     BaselineNode* current = *head;
     BaselineNode* prev = NULL;
     
     while (current) {
         if (current->data == data) {
-            deletion_instrumentation(prev, current, current->next);
+            BaselineNode* succ = current->next;
+            LIST_DELETE_HOOK(prev, current, succ);
             if (prev == NULL)
-                *head = current->next; // Node to delete is the head.
+                *head = succ; // Node to delete is the head.
             else
-                prev->next = current->next;
+                prev->next = succ;
+            LIST_PROBE_DELETE_UNLINK(head, prev, current, succ, data);
             
             free(current);
             return 1; // Deletion successful.
@@ -41,6 +49,7 @@ int baseline_delete(BaselineNode** head, int data) {
         prev = current;
         current = current->next;
     }
+    LIST_PROBE_DELETE_MISS(head, data);
     return 0; // Node not found.
 }
 
@@ -56,10 +65,13 @@ void baseline_show(BaselineNode* head) {
 BaselineNode* baseline_search(BaselineNode* head, int data) {
     BaselineNode* current = head;
     while (current) {
-        if (current->data == data)
+        if (current->data == data) {
+            LIST_PROBE_SEARCH_HIT(head, data, current);
             return current;
+        }
         current = current->next;
     }
+    LIST_PROBE_SEARCH_MISS(head, data);
     return NULL;
 }
 
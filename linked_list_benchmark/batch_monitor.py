@@ -0,0 +1,366 @@
+#!/usr/bin/env python3
+"""
+Capture-and-check pipeline: probes record, user space verifies.
+
+The probes compare nothing. Entry probes note the pre-state (*head and,
+for deletes, the head node's value and next pointer), the deletion hook
+notes pred/succ, and return probes read the post-state and push one
+fixed-size op_record_t to a ring buffer. The consumer drains the buffer in
+batches and checks whole batches at once with NumPy:
+
+  insert        *head is non-NULL, holds the value, and links to the old head
+  delete        the predecessor's link (or *head) is the old successor
+  length        running inserts minus successful deletes per (pid, head);
+                with --from-empty a negative count is a violation
+
+Batches can be spread over --workers processes; only the length merge is
+sequential. Violations use the same kinds and CSV layout as verif_monitor.
+
+Example:
+    sudo ./batch_monitor.py ./main_verif_optimised --workers 4 --violations-out v.csv
+"""
+from bcc import BPF
+import argparse
+import ctypes
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from violation_events import VIOLATION_KINDS, ViolationWriter, format_value
+from probe_stats import probe_stats_bpf, ProbeStats
+
+OP_INSERT = 1
+OP_DELETE = 2
+FLAG_RET = 1
+FLAG_HOOKED = 2
+
+PROBES = [
+    ("insert_entry", "uprobe", "{prefix}_insert"),
+    ("insert_return", "uretprobe", "{prefix}_insert"),
+    ("delete_entry", "uprobe", "{prefix}_delete"),
+    ("delete_hook", "uprobe", "{hook_symbol}"),
+    ("delete_return", "uretprobe", "{prefix}_delete"),
+]
+
+BPF_TEXT = r"""
+#include <uapi/linux/ptrace.h>
+
+#define OP_INSERT 1
+#define OP_DELETE 2
+#define FLAG_RET 1
+#define FLAG_HOOKED 2
+
+// Must match RECORD_DTYPE.
+struct op_record_t {
+    u64 ts_ns;
+    u64 head_addr;
+    u64 pre_head;   // *head at entry
+    u64 pre_next;   // delete: (*head)->next at entry
+    u64 post_head;  // *head at return
+    u64 post_link;  // insert: (*head)->next at return; hooked delete: pred->next
+    u64 pred;       // hooked delete; 0 when the hook reports a head delete
+    u64 succ;       // hooked delete
+    u32 pid;
+    u32 tid;
+    int arg;
+    int pre_val;    // delete: (*head)->data at entry
+    int post_val;   // insert: (*head)->data at return
+    u32 op;
+    u32 flags;
+    u32 pad;
+};
+
+BPF_HASH(pending, u32, struct op_record_t, 10240);
+BPF_RINGBUF_OUTPUT(op_records, %(pages)d);
+BPF_PERCPU_ARRAY(record_drops, u64, 1);
+
+static inline int on_entry(struct pt_regs *ctx, u32 op) {
+    u64 id = bpf_get_current_pid_tgid();
+    u32 tid = id;
+    struct op_record_t r = {};
+    r.op = op;
+    r.pid = id >> 32;
+    r.tid = tid;
+    r.head_addr = PT_REGS_PARM1(ctx);
+    r.arg = PT_REGS_PARM2(ctx);
+    bpf_probe_read_user(&r.pre_head, sizeof(r.pre_head), (void *)r.head_addr);
+    if (op == OP_DELETE && r.pre_head) {
+        bpf_probe_read_user(&r.pre_val, sizeof(r.pre_val), (void *)r.pre_head);
+        bpf_probe_read_user(&r.pre_next, sizeof(r.pre_next), (void *)(r.pre_head + 8));
+    }
+    pending.update(&tid, &r);
+    return 0;
+}
+
+static inline int on_return(struct pt_regs *ctx) {
+    u32 tid = bpf_get_current_pid_tgid();
+    struct op_record_t *r = pending.lookup(&tid);
+    if (!r)
+        return 0;
+    r->ts_ns = bpf_ktime_get_ns();
+    if (PT_REGS_RC(ctx))
+        r->flags |= FLAG_RET;
+    bpf_probe_read_user(&r->post_head, sizeof(r->post_head), (void *)r->head_addr);
+    if (r->op == OP_INSERT && r->post_head) {
+        bpf_probe_read_user(&r->post_val, sizeof(r->post_val), (void *)r->post_head);
+        bpf_probe_read_user(&r->post_link, sizeof(r->post_link), (void *)(r->post_head + 8));
+    } else if ((r->flags & FLAG_HOOKED) && r->pred) {
+        // A head delete (pred == 0) is checked against post_head instead.
+        bpf_probe_read_user(&r->post_link, sizeof(r->post_link), (void *)(r->pred + 8));
+    }
+    if (op_records.ringbuf_output(r, sizeof(*r), BPF_RB_NO_WAKEUP) != 0) {
+        u32 zero = 0;
+        u64 *drops = record_drops.lookup(&zero);
+        if (drops)
+            (*drops)++;
+    }
+    pending.delete(&tid);
+    return 0;
+}
+
+int on_insert_entry(struct pt_regs *ctx) {
+    BEGIN_PROBE();
+    on_entry(ctx, OP_INSERT);
+    END_PROBE(0);
+    return 0;
+}
+
+int on_insert_return(struct pt_regs *ctx) {
+    BEGIN_PROBE();
+    on_return(ctx);
+    END_PROBE(1);
+    return 0;
+}
+
+int on_delete_entry(struct pt_regs *ctx) {
+    BEGIN_PROBE();
+    on_entry(ctx, OP_DELETE);
+    END_PROBE(2);
+    return 0;
+}
+
+int on_delete_hook(struct pt_regs *ctx) {
+    BEGIN_PROBE();
+    u32 tid = bpf_get_current_pid_tgid();
+    struct op_record_t *r = pending.lookup(&tid);
+    if (r) {
+        r->pred = PT_REGS_PARM1(ctx);
+        r->succ = PT_REGS_PARM3(ctx);
+        r->flags |= FLAG_HOOKED;
+    }
+    END_PROBE(3);
+    return 0;
+}
+
+int on_delete_return(struct pt_regs *ctx) {
+    BEGIN_PROBE();
+    on_return(ctx);
+    END_PROBE(4);
+    return 0;
+}
+"""
+
+RECORD_DTYPE = np.dtype([
+    ("ts_ns", "<u8"), ("head_addr", "<u8"), ("pre_head", "<u8"), ("pre_next", "<u8"),
+    ("post_head", "<u8"), ("post_link", "<u8"), ("pred", "<u8"), ("succ", "<u8"),
+    ("pid", "<u4"), ("tid", "<u4"), ("arg", "<i4"), ("pre_val", "<i4"), ("post_val", "<i4"),
+    ("op", "<u4"), ("flags", "<u4"), ("pad", "<u4"),
+])
+
+KIND_IDS = {name: kind for kind, name in VIOLATION_KINDS.items()}
+
+
+def check_batch(data):
+    """
+    Check one batch of raw records. Returns (violations, lists): violations
+    as (record index, kind, expected, observed); lists maps (pid, head) to
+    (net length change, lowest running change) for the batch.
+    """
+    r = np.frombuffer(data, dtype=RECORD_DTYPE)
+    ins = r["op"] == OP_INSERT
+    dels = r["op"] == OP_DELETE
+    ok = (r["flags"] & FLAG_RET) != 0
+    hooked = (r["flags"] & FLAG_HOOKED) != 0
+    head_hit = dels & ~hooked & (r["pre_head"] != 0) & (r["pre_val"] == r["arg"])
+    # The baseline calls the hook for head deletes too, with pred == 0.
+    hooked_head = dels & hooked & (r["pred"] == 0)
+    hooked_mid = dels & hooked & (r["pred"] != 0)
+
+    checks = [
+        ("insert_null_head", ins & (r["post_head"] == 0), None, "post_head"),
+        ("insert_value_mismatch", ins & (r["post_head"] != 0) & (r["post_val"] != r["arg"]), "arg", "post_val"),
+        ("insert_next_mismatch", ins & (r["post_head"] != 0) & (r["post_link"] != r["pre_head"]),
+         "pre_head", "post_link"),
+        ("delete_head_link", head_hit & (r["post_head"] != r["pre_next"]), "pre_next", "post_head"),
+        ("delete_head_link", hooked_head & (r["post_head"] != r["succ"]), "succ", "post_head"),
+        ("delete_mid_link", hooked_mid & (r["post_link"] != r["succ"]), "succ", "post_link"),
+    ]
+    violations = []
+    for kind, mask, expected, observed in checks:
+        for i in np.flatnonzero(mask):
+            violations.append((int(i), kind, int(r[expected][i]) if expected else 0, int(r[observed][i])))
+
+    lists = {}
+    delta = np.where(ins, 1, np.where(dels & ok, -1, 0)).astype(np.int64)
+    if len(r):
+        order = np.lexsort((np.arange(len(r)), r["head_addr"], r["pid"]))
+        pid, head, d = r["pid"][order], r["head_addr"][order], delta[order]
+        starts = np.flatnonzero(np.r_[True, (pid[1:] != pid[:-1]) | (head[1:] != head[:-1])])
+        running = np.cumsum(d)
+        base = np.r_[0, running[starts[1:] - 1]]
+        running -= np.repeat(base, np.diff(np.r_[starts, len(d)]))
+        totals = np.add.reduceat(d, starts)
+        lowest = np.minimum.reduceat(running, starts)
+        for s, total, low in zip(starts, totals, lowest):
+            lists[(int(pid[s]), int(head[s]))] = (int(total), int(low))
+    return violations, lists
+
+
+def check_batch_timed(data):
+    """check_batch() in a worker, with the time.monotonic() it finished at."""
+    return check_batch(data), time.monotonic()
+
+
+class BatchChecker:
+    def __init__(self, b, args):
+        self.b = b
+        self.args = args
+        self.buf = bytearray()
+        self.records = 0
+        self.check_time = 0.0
+        # End of the pool's last busy span counted in check_time.
+        self.busy_until = 0.0
+        self.lengths = {}
+        self.writer = ViolationWriter(args.violations_out)
+        self.pool = ProcessPoolExecutor(args.workers) if args.workers > 1 else None
+        self.inflight = []
+        b["op_records"].open_ring_buffer(self._handle)
+
+    def _handle(self, ctx, data, size):
+        self.buf += ctypes.string_at(data, size)
+
+    def _report(self, data, violations, lists):
+        r = np.frombuffer(data, dtype=RECORD_DTYPE)
+        probe = {OP_INSERT: "batch_insert", OP_DELETE: "batch_delete"}
+        for i, kind, expected, observed in violations:
+            kid = KIND_IDS[kind]
+            self.writer.write({
+                "ts_ns": int(r["ts_ns"][i]),
+                "pid": int(r["pid"][i]),
+                "tid": int(r["tid"][i]),
+                "probe": probe.get(int(r["op"][i]), "batch"),
+                "kind": kind,
+                "head_addr": "0x%x" % int(r["head_addr"][i]),
+                "expected": format_value(kid, expected),
+                "observed": format_value(kid, observed),
+            })
+        # Batches are merged in capture order, so the running length is exact.
+        for key, (total, lowest) in lists.items():
+            start = self.lengths.get(key, 0)
+            if self.args.from_empty and start + lowest < 0:
+                self.writer.write({
+                    "ts_ns": time.monotonic_ns(), "pid": key[0], "tid": key[0], "probe": "batch_delete",
+                    "kind": "length_mismatch", "head_addr": "0x%x" % key[1],
+                    "expected": "0", "observed": str(start + lowest),
+                })
+            self.lengths[key] = start + total
+
+    def drain(self):
+        self.b.ring_buffer_consume()
+        size = len(self.buf) - len(self.buf) % RECORD_DTYPE.itemsize
+        if size:
+            data = bytes(self.buf[:size])
+            del self.buf[:size]
+            self.records += size // RECORD_DTYPE.itemsize
+            if self.pool is None:
+                start = time.monotonic()
+                self._report(data, *check_batch(data))
+                self.check_time += time.monotonic() - start
+            else:
+                submitted = time.monotonic()
+                self.inflight.append((data, submitted, self.pool.submit(check_batch_timed, data)))
+        while self.inflight and self.inflight[0][2].done():
+            self._collect(*self.inflight.pop(0))
+        self.writer.flush()
+
+    def _collect(self, data, submitted, future):
+        """
+        Report a batch from the pool. check_time gets the pool's busy wall
+        time, the union of the batches' submit-to-finish spans (they start in
+        order), plus reporting, so records/s means the same as with one
+        worker.
+        """
+        result, finished = future.result()
+        start = max(submitted, self.busy_until)
+        if finished > start:
+            self.check_time += finished - start
+        self.busy_until = max(self.busy_until, finished)
+        report_start = time.monotonic()
+        self._report(data, *result)
+        self.check_time += time.monotonic() - report_start
+
+    def finish(self):
+        self.drain()
+        for batch in self.inflight:
+            self._collect(*batch)
+        self.inflight = []
+        if self.pool is not None:
+            self.pool.shutdown()
+        self.writer.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Capture list operations in BPF and check them in NumPy batches")
+    parser.add_argument("binary", help="Path to the target binary (e.g., ./main_verif_optimised)")
+    parser.add_argument("--prefix", default="verif_optimised",
+                        help="Symbol prefix of the list functions (<prefix>_insert, <prefix>_delete)")
+    parser.add_argument("--hook-symbol", default="deletion_instrumentation",
+                        help="Deletion hook called with (pred, target, succ)")
+    parser.add_argument("--pid", type=int, default=-1, help="Only attach to this process")
+    parser.add_argument("--ringbuf-pages", type=int, default=1024,
+                        help="Ring buffer size in pages, a power of two (default: %(default)s)")
+    parser.add_argument("--batch-interval", type=float, default=0.1,
+                        help="Seconds between batches (default: %(default)s)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Processes checking batches in parallel (default: %(default)s)")
+    parser.add_argument("--from-empty", action="store_true",
+                        help="The monitor is attached before the lists are populated, so a negative "
+                             "running length is a violation")
+    parser.add_argument("--duration", type=float, default=0, help="Stop after N seconds (0 = run until Ctrl+C)")
+    parser.add_argument("--violations-out", help="Write violation records to this CSV file instead of stdout")
+    args = parser.parse_args()
+
+    b = BPF(text=probe_stats_bpf(len(PROBES)) + BPF_TEXT % {"pages": args.ringbuf_pages})
+    probe_names = {}
+    for idx, (name, kind, symbol) in enumerate(PROBES):
+        symbol = symbol.format(prefix=args.prefix, hook_symbol=args.hook_symbol)
+        attach = b.attach_uprobe if kind == "uprobe" else b.attach_uretprobe
+        attach(name=args.binary, sym=symbol, fn_name="on_" + name, pid=args.pid)
+        probe_names[idx] = "on_" + name
+    stats = ProbeStats(b, probe_names)
+    checker = BatchChecker(b, args)
+
+    print("Capturing operations on %s. Ctrl+C to exit." % args.binary)
+    deadline = time.time() + args.duration if args.duration else None
+    try:
+        while deadline is None or time.time() < deadline:
+            time.sleep(args.batch_interval)
+            checker.drain()
+    except KeyboardInterrupt:
+        pass
+    checker.finish()
+
+    print("Aggregated probe timings:")
+    stats.print_report()
+    drops = sum(b["record_drops"][0])
+    rate = checker.records / checker.check_time if checker.check_time else 0.0
+    print("Records checked: %d (dropped: %d), %.0f records/s in the checker, %d violations" % (
+        checker.records, drops, rate, checker.writer.count), file=sys.stderr)
+    for (pid, head), length in sorted(checker.lengths.items()):
+        print("  pid %d list 0x%x: net length change %d" % (pid, head, length))
+
+
+if __name__ == "__main__":
+    main()
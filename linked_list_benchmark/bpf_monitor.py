@@ -1,10 +1,11 @@
 #!/usr/bin/env python3
 from bcc import BPF
 import argparse
-import time
+from violation_events import VIOLATION_BPF, ViolationConsumer
 
 parser = argparse.ArgumentParser(description="Runtime verification of verif-optimised linked list operations")
 parser.add_argument("binary", help="Path to the verif-optimised linked list binary (e.g., ./main_verif_optimised)")
+parser.add_argument("--violations-out", help="Write violation records to this CSV file instead of stdout")
 args = parser.parse_args()
 
 # BPF program for verifying insert and delete operations with a deletion hook.
@@ -70,7 +71,7 @@ int on_insert_return(struct pt_regs *ctx) {
     u64 new_head_ptr = 0;
     bpf_probe_read_user(&new_head_ptr, sizeof(new_head_ptr), (void*)st->head_addr);
     if (new_head_ptr == 0) {
-        bpf_trace_printk("ERROR: verif_optimised_insert: new head is NULL (tid %d)\\n", tid);
+        report_violation(1, VIOL_INSERT_NULL_HEAD, st->head_addr, 0, 0);
         entryinfo.delete(&tid);
         return 0;
     }
@@ -78,8 +79,7 @@ int on_insert_return(struct pt_regs *ctx) {
     int new_node_data = 0;
     bpf_probe_read_user(&new_node_data, sizeof(new_node_data), (void*)new_head_ptr);
     if (new_node_data != st->inserted_val) {
-        bpf_trace_printk("ERROR: verif_optimised_insert: data mismatch: new node data %d != inserted %d (tid %d)\\n",
-            new_node_data, st->inserted_val, tid);
+        report_violation(1, VIOL_INSERT_VALUE_MISMATCH, st->head_addr, st->inserted_val, new_node_data);
         entryinfo.delete(&tid);
         return 0;
     }
@@ -88,8 +88,7 @@ int on_insert_return(struct pt_regs *ctx) {
     // Assuming the 'next' pointer is at offset 8.
     bpf_probe_read_user(&new_node_next, sizeof(new_node_next), (void*)(new_head_ptr + 8));
     if (new_node_next != st->old_head) {
-        bpf_trace_printk("ERROR: verif_optimised_insert: new node's next pointer 0x%lx != old head 0x%lx (tid %d)\\n",
-            new_node_next, st->old_head, tid);
+        report_violation(1, VIOL_INSERT_NEXT_MISMATCH, st->head_addr, st->old_head, new_node_next);
         entryinfo.delete(&tid);
         return 0;
     }
@@ -182,16 +181,14 @@ int on_delete_return(struct pt_regs *ctx) {
             u64 new_head = 0;
             bpf_probe_read_user(&new_head, sizeof(new_head), (void*)dval->head_addr);
             if (new_head != hinfo->succ) {
-                bpf_trace_printk("ERROR: delete hook: head deletion: new head 0x%lx != expected 0x%lx (tid %d)\\n",
-                    new_head, hinfo->succ, tid);
+                report_violation(4, VIOL_DELETE_HEAD_LINK, dval->head_addr, hinfo->succ, new_head);
             }
         } else {
             // Deletion in the middle; re-read the predecessor's next pointer.
             u64 new_link = 0;
             bpf_probe_read_user(&new_link, sizeof(new_link), (void*)(hinfo->pred + 8));
             if (new_link != hinfo->succ) {
-                bpf_trace_printk("ERROR: delete hook: mid deletion: pred->next 0x%lx != expected 0x%lx (tid %d)\\n",
-                    new_link, hinfo->succ, tid);
+                report_violation(4, VIOL_DELETE_MID_LINK, dval->head_addr, hinfo->succ, new_link);
             }
         }
         hookinfo.delete(&tid);
@@ -204,16 +201,14 @@ int on_delete_return(struct pt_regs *ctx) {
             u64 new_head = 0;
             bpf_probe_read_user(&new_head, sizeof(new_head), (void*)dval->head_addr);
             if (new_head != dval->next_after) {
-                bpf_trace_printk("ERROR: verif_optimised_delete: head deletion: new head 0x%lx != expected 0x%lx (tid %d)\\n",
-                    new_head, dval->next_after, tid);
+                report_violation(4, VIOL_DELETE_HEAD_LINK, dval->head_addr, dval->next_after, new_head);
             }
         } else {
             // Deletion in the middle; re-read the predecessor's next pointer.
             u64 new_link = 0;
             bpf_probe_read_user(&new_link, sizeof(new_link), (void*)(dval->pred + 8));
             if (new_link != dval->next_after) {
-                bpf_trace_printk("ERROR: verif_optimised_delete: mid deletion: pred->next 0x%lx != expected 0x%lx (tid %d)\\n",
-                    new_link, dval->next_after, tid);
+                report_violation(4, VIOL_DELETE_MID_LINK, dval->head_addr, dval->next_after, new_link);
             }
         }
     }
@@ -223,7 +218,7 @@ int on_delete_return(struct pt_regs *ctx) {
 """
 
 # Load BPF program.
-b = BPF(text=bpf_program)
+b = BPF(text=VIOLATION_BPF + bpf_program)
 
 # Attach probes for verif_optimised_insert.
 b.attach_uprobe(name=args.binary, sym="verif_optimised_insert", fn_name="on_insert_entry")
@@ -236,11 +231,12 @@ b.attach_uretprobe(name=args.binary, sym="verif_optimised_delete", fn_name="on_d
 # Attach probe for the deletion hook.
 b.attach_uprobe(name=args.binary, sym="delete_node_info", fn_name="on_delete_hook")
 
+probe_names = {0: "on_insert_entry", 1: "on_insert_return", 2: "on_delete_entry",
+               3: "on_delete_hook", 4: "on_delete_return"}
+consumer = ViolationConsumer(b, probe_names, out_path=args.violations_out)
+
 print("Attached to verif_optimised_insert, verif_optimised_delete, and delete_node_info hook. Ctrl+C to exit.")
-try:
-    while True:
-        time.sleep(5)
-        # To view trace output, run:
-        # sudo cat /sys/kernel/debug/tracing/trace_pipe
-except KeyboardInterrupt:
-    print("Exiting...")
+# Violation records are drained from the ring buffer in batches.
+consumer.run()
+consumer.close()
+print("Exiting...")
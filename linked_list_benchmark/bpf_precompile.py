@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Precompile verif_monitor configurations to BPF objects.
+
+BCC runs clang on the generated program text at every start, which with
+the unrolled length walks takes seconds. This script generates the same
+text, rewrites the BCC-specific parts (map macros, map.method() calls,
+probe sections) into libbpf C built against vmlinux.h, and compiles it
+once with clang -target bpf. verif_monitor.py --precompiled DIR then loads
+the object through libbpf_loader.py instead of calling BCC.
+
+Objects are named after a hash of the translated text, so a monitor run
+only finds an object built from exactly the program it would generate.
+USDT attach is not supported here; it needs BCC's bpf_usdt_readarg.
+
+Example:
+    ./bpf_precompile.py                       # the configurations in CONFIGS
+    ./bpf_precompile.py -- --properties length --throttle-ms 15000
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+
+DEFAULT_OUT_DIR = "bpf_objects"
+
+# The configurations used by the wrapper scripts and collect_perf.py.
+CONFIGS = {
+    "both": ["--properties", "insert-head,delete-link,length", "--throttle-ms", "1000"],
+    "both-deferred": ["--properties", "insert-head,delete-link,length", "--throttle-ms", "1000",
+                      "--attach", "deferred"],
+    "length": ["--properties", "length", "--throttle-ms", "15000"],
+    "length-incremental": ["--properties", "length", "--length-mode", "incremental"],
+    "length-loop": ["--properties", "length", "--walk-engine", "loop", "--node-budget", "1048576"],
+    "props": ["--properties", "insert-head,delete-link"],
+}
+
+PRELUDE = r"""
+#include "vmlinux.h"
+#include <bpf/bpf_helpers.h>
+#include <bpf/bpf_tracing.h>
+
+char LICENSE[] SEC("license") = "GPL";
+
+// BCC helpers the monitors use.
+static __always_inline unsigned int bpf_log2(unsigned int v) {
+    unsigned int r, shift;
+    r = (v > 0xFFFF) << 4; v >>= r;
+    shift = (v > 0xFF) << 3; v >>= shift; r |= shift;
+    shift = (v > 0xF) << 2; v >>= shift; r |= shift;
+    shift = (v > 0x3) << 1; v >>= shift; r |= shift;
+    r |= (v >> 1);
+    return r;
+}
+
+static __always_inline unsigned int bpf_log2l(unsigned long v) {
+    unsigned int hi = v >> 32;
+    if (hi)
+        return bpf_log2(hi) + 32 + 1;
+    return bpf_log2(v) + 1;
+}
+"""
+
+# BCC map macro -> (libbpf map type, has key argument, default size)
+MAP_MACROS = {
+    "BPF_HASH": ("BPF_MAP_TYPE_HASH", True, 10240),
+    "BPF_LRU_HASH": ("BPF_MAP_TYPE_LRU_HASH", True, 10240),
+    "BPF_PERCPU_HASH": ("BPF_MAP_TYPE_PERCPU_HASH", True, 10240),
+    "BPF_ARRAY": ("BPF_MAP_TYPE_ARRAY", False, 10240),
+    "BPF_PERCPU_ARRAY": ("BPF_MAP_TYPE_PERCPU_ARRAY", False, 10240),
+}
+
+MAP_DECL_RE = re.compile(r"^(BPF_[A-Z_]+)\((.*)\);\s*$", re.M)
+METHOD_RE = re.compile(r"\b(\w+)\.(\w+)\(")
+PROBE_RE = re.compile(r"^int (on_\w+)\(struct pt_regs \*ctx\)", re.M)
+INCLUDE_RE = re.compile(r"^#include <(uapi/)?linux/.*>\s*$", re.M)
+
+
+def _map_decl(macro, args):
+    args = [a.strip() for a in args.split(",")]
+    name = args[0]
+    if macro == "BPF_RINGBUF_OUTPUT":
+        return name, ("struct {\n    __uint(type, BPF_MAP_TYPE_RINGBUF);\n"
+                      "    __uint(max_entries, %s * 4096);\n} %s SEC(\".maps\");" % (args[1], name))
+    if macro not in MAP_MACROS:
+        raise ValueError("%s is not supported by the precompiled loader" % macro)
+    map_type, keyed, size = MAP_MACROS[macro]
+    if keyed:
+        key, value, rest = args[1], args[2], args[3:]
+    else:
+        key, value, rest = "u32", args[1], args[2:]
+    if rest:
+        size = rest[0]
+    return name, ("struct {\n    __uint(type, %s);\n    __uint(max_entries, %s);\n"
+                  "    __type(key, %s);\n    __type(value, %s);\n} %s SEC(\".maps\");"
+                  % (map_type, size, key, value, name))
+
+
+def _close_paren(text, start):
+    """Index of the parenthesis closing the one opened just before `start`."""
+    depth = 1
+    for i in range(start, len(text)):
+        if text[i] == "(":
+            depth += 1
+        elif text[i] == ")":
+            depth -= 1
+            if depth == 0:
+                return i
+    raise ValueError("unbalanced parentheses in BPF text")
+
+
+def _rewrite_methods(text, maps):
+    out = []
+    pos = 0
+    for m in METHOD_RE.finditer(text):
+        name, method = m.groups()
+        if name not in maps or m.start() < pos:
+            continue
+        out.append(text[pos:m.start()])
+        if method == "lookup":
+            out.append("bpf_map_lookup_elem(&%s, " % name)
+            pos = m.end()
+        elif method == "delete":
+            out.append("bpf_map_delete_elem(&%s, " % name)
+            pos = m.end()
+        elif method == "ringbuf_output":
+            out.append("bpf_ringbuf_output(&%s, " % name)
+            pos = m.end()
+        elif method == "update":
+            end = _close_paren(text, m.end())
+            out.append("bpf_map_update_elem(&%s, %s, BPF_ANY)" % (name, text[m.end():end]))
+            pos = end + 1
+        else:
+            raise ValueError("%s.%s() is not supported by the precompiled loader" % (name, method))
+    out.append(text[pos:])
+    return "".join(out)
+
+
+def translate(bpf_text):
+    """Rewrite BCC program text into libbpf C."""
+    maps = {}
+
+    def decl(m):
+        name, c = _map_decl(m.group(1), m.group(2))
+        maps[name] = True
+        return c
+
+    text = INCLUDE_RE.sub("", bpf_text)
+    text = MAP_DECL_RE.sub(decl, text)
+    text = _rewrite_methods(text, maps)
+    # Plain "uprobe" sections are not auto-attached; verif_monitor attaches
+    # each program to its symbol, as a return probe where needed.
+    text = PROBE_RE.sub(r'SEC("uprobe")\nint \1(struct pt_regs *ctx)', text)
+    return PRELUDE + text
+
+
+def object_name(c_text):
+    return hashlib.sha1(c_text.encode()).hexdigest()[:16]
+
+
+def object_path(out_dir, bpf_text):
+    """Path the precompiled object for this program text would have."""
+    return os.path.join(out_dir, object_name(translate(bpf_text)) + ".bpf.o")
+
+
+def ensure_vmlinux_h(out_dir):
+    path = os.path.join(out_dir, "vmlinux.h")
+    if not os.path.exists(path):
+        with open(path, "w") as f:
+            subprocess.run(["bpftool", "btf", "dump", "file", "/sys/kernel/btf/vmlinux", "format", "c"],
+                           stdout=f, check=True)
+    return path
+
+
+def build(out_dir, monitor_args, clang="clang"):
+    """Compile one verif_monitor configuration; return (object path, build seconds)."""
+    from verif_monitor import program_for_args
+    args, _, bpf_text, _ = program_for_args(["<binary>"] + monitor_args)
+    if args.attach == "usdt":
+        raise ValueError("USDT attach cannot be precompiled")
+    c_text = translate(bpf_text)
+    name = object_name(c_text)
+    src = os.path.join(out_dir, name + ".bpf.c")
+    obj = os.path.join(out_dir, name + ".bpf.o")
+    with open(src, "w") as f:
+        f.write(c_text)
+    start = time.perf_counter()
+    subprocess.run([clang, "-O2", "-g", "-target", "bpf", "-D__TARGET_ARCH_x86", "-I", out_dir,
+                    "-c", src, "-o", obj], check=True)
+    elapsed = time.perf_counter() - start
+    with open(os.path.join(out_dir, name + ".json"), "w") as f:
+        json.dump({"monitor_args": monitor_args, "build_seconds": elapsed}, f, indent=2)
+    return obj, elapsed
+
+
+def build_seconds(obj_path):
+    """Compile time recorded when the object was built, or None."""
+    try:
+        with open(obj_path[:-len(".bpf.o")] + ".json") as f:
+            return json.load(f)["build_seconds"]
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompile verif_monitor configurations to BPF objects")
+    parser.add_argument("--out-dir", default=DEFAULT_OUT_DIR, help="Output directory (default: %(default)s)")
+    parser.add_argument("--clang", default="clang", help="clang binary (default: %(default)s)")
+    parser.add_argument("--config", action="append", choices=sorted(CONFIGS),
+                        help="Build only this configuration (repeatable)")
+    parser.add_argument("monitor_args", nargs=argparse.REMAINDER,
+                        help="After --: verif_monitor.py arguments for a single extra configuration")
+    args = parser.parse_args()
+
+    configs = {name: CONFIGS[name] for name in (args.config or CONFIGS)}
+    extra = args.monitor_args[1:] if args.monitor_args[:1] == ["--"] else args.monitor_args
+    if extra:
+        configs = {"command line": extra}
+    os.makedirs(args.out_dir, exist_ok=True)
+    ensure_vmlinux_h(args.out_dir)
+    for name, monitor_args in configs.items():
+        try:
+            obj, elapsed = build(args.out_dir, monitor_args, args.clang)
+        except (subprocess.CalledProcessError, ValueError) as e:
+            print("%s: build failed: %s" % (name, e), file=sys.stderr)
+            continue
+        print("%-20s %s (%.2f s)" % (name, obj, elapsed))
+
+
+if __name__ == "__main__":
+    main()
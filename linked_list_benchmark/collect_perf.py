@@ -4,13 +4,34 @@ import csv
 import re
 import time
 import argparse
+import hashlib
+import os
+import platform
+import shutil
+import signal
+import statistics
+import sys
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
-def run_perf(binary):
-    # Run "perf stat" on the given binary.
+def run_perf(binary, args=(), cpus=None):
+    # Run "perf stat" on the given binary, passing args (workload options) to it,
+    # pinned to cpus if given. Without perf the binary runs alone and only the
+    # wall-clock time is reported, in perf's format.
     # We capture stdout (from the binary) and stderr (from perf).
-    cmd = ["perf", "stat", "-e", "cache-misses,cycles,instructions,branch-misses", binary]
+    cmd = [binary, *args]
+    have_perf = shutil.which("perf") is not None
+    if have_perf:
+        cmd = ["perf", "stat", "-e", "cache-misses,cycles,instructions,branch-misses"] + cmd
+    if cpus:
+        cmd = ["taskset", "-c", ",".join(map(str, cpus))] + cmd
+    start = time.monotonic()
     result = subprocess.run(cmd, capture_output=True, text=True)
-    return result.stdout, result.stderr
+    stderr = result.stderr
+    if not have_perf:
+        stderr += "\n %.9f seconds time elapsed\n" % (time.monotonic() - start)
+    return result.stdout, stderr
 
 def parse_perf_output(stderr):
     """
@@ -53,6 +74,18 @@ def parse_stdout(stdout):
         Insertions: 40688, Time spent: 0.0240 seconds
         Searches: 39763, Time spent: 4.8856 seconds
         Deletions: 40002, Time spent: 4.4994 seconds
+        Hits: searches 27001, deletions 26980
+        Cost: insert=0.6 search=122.9 delete=112.5 ns/op
+        Latency insert: count=40688 p50=31 p90=39 p99=87 p99.9=607 max=20416 ns
+        Latency search: count=39763 p50=...
+        Latency delete: count=40002 p50=...
+        Counters prefill: cycles=1254210 instructions=2115033 cache_misses=... llc_loads=...
+        Counters insert: cycles=...
+    The cost line becomes insert_ns_per_op, search_ns_per_op and
+    delete_ns_per_op; the latency lines (absent with --batch) become
+    insert_p50, ..., insert_p999 and insert_max (ns). The counter lines
+    (--counters, which needs --batch) become prefill_cycles, ...,
+    delete_llc_loads.
     """
     data = {}
     for line in stdout.splitlines():
@@ -75,13 +108,327 @@ def parse_stdout(stdout):
             if m:
                 data["deletions"] = int(m.group(1))
                 data["delete_time"] = float(m.group(2))
+        elif line.startswith("Hits:"):
+            m = re.search(r"Hits:\s*searches\s*(\d+),\s*deletions\s*(\d+)", line)
+            if m:
+                data["search_hits"] = int(m.group(1))
+                data["delete_hits"] = int(m.group(2))
+        elif line.startswith("Cost:"):
+            for op, value in re.findall(r"(\w+)=([\d\.]+)", line):
+                data["%s_ns_per_op" % op] = float(value)
+        elif line.startswith("Counters "):
+            m = re.match(r"Counters (\w+):(.*)$", line)
+            if m:
+                for name, value in re.findall(r"(\w+)=(\d+)", m.group(2)):
+                    data["%s_%s" % (m.group(1), name)] = int(value)
+        elif line.startswith("Latency "):
+            m = re.match(r"Latency (\w+):\s*(.*?)\s*ns$", line)
+            if m:
+                op = m.group(1)
+                for name, value in re.findall(r"([\w.]+)=(\d+)", m.group(2)):
+                    if name != "count":
+                        data["%s_%s" % (op, name.replace(".", ""))] = int(value)
     return data
 
+LATENCY_FIELDS = ["%s_%s" % (op, stat) for op in ("insert", "search", "delete")
+                  for stat in ("p50", "p90", "p99", "p999", "max")]
+
+COUNTER_FIELDS = ["%s_%s" % (phase, event) for phase in ("prefill", "insert", "search", "delete")
+                  for event in ("cycles", "instructions", "cache_misses", "branch_misses", "llc_loads")]
+
+def parse_cpus(text):
+    """CPU list such as 2-5,8 (or "isolated" for the kernel's isolcpus set) as a sorted list."""
+    if text == "isolated":
+        with open("/sys/devices/system/cpu/isolated") as f:
+            text = f.read().strip()
+        if not text:
+            raise argparse.ArgumentTypeError("no isolated CPUs (boot with isolcpus=)")
+    cpus = set()
+    for part in text.split(","):
+        lo, _, hi = part.partition("-")
+        cpus.update(range(int(lo), int(hi or lo) + 1))
+    return sorted(cpus)
+
+def t_quantile(confidence, df):
+    # Two-sided Student t quantile via Hill's expansion of the normal one;
+    # within 1% of the tables from 3 degrees of freedom up.
+    z = statistics.NormalDist().inv_cdf(0.5 + confidence / 2)
+    return (z + (z**3 + z) / (4 * df) + (5 * z**5 + 16 * z**3 + 3 * z) / (96 * df**2)
+            + (3 * z**7 + 19 * z**5 + 17 * z**3 - 15 * z) / (384 * df**3)
+            + (79 * z**9 + 776 * z**7 + 1482 * z**5 - 1920 * z**3 - 945 * z) / (92160 * df**4))
+
+def ci_halfwidth(values, confidence):
+    """Confidence interval half-width of the mean, relative to the mean."""
+    if len(values) < 2 or statistics.mean(values) == 0:
+        return float("inf")
+    sem = statistics.stdev(values) / len(values) ** 0.5
+    return t_quantile(confidence, len(values) - 1) * sem / statistics.mean(values)
+
+def _read(path, default=""):
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except OSError:
+        return default
+
+def host_metadata():
+    cpu_model = ""
+    for line in _read("/proc/cpuinfo").splitlines():
+        if line.startswith("model name"):
+            cpu_model = line.split(":", 1)[1].strip()
+            break
+    return {"kernel": platform.release(), "cpu_model": cpu_model}
+
+def run_metadata(binary, cpus):
+    with open(binary, "rb") as f:
+        digest = hashlib.sha256(f.read()).hexdigest()[:16]
+    cpus = cpus or sorted(os.sched_getaffinity(0))
+    governors = {_read("/sys/devices/system/cpu/cpu%d/cpufreq/scaling_governor" % c, "n/a") for c in cpus}
+    return {
+        "binary_sha256": digest,
+        "cpus": ",".join(map(str, cpus)),
+        "governor": "/".join(sorted(governors)),
+    }
+
+def ops_per_sec(row):
+    return row["total_operations"] / row["elapsed"] if row.get("elapsed") else 0.0
+
+def run_version(version, binary, workload_args, cpus, args, emit):
+    """Warm up, then run until the ops/sec interval is narrow enough; emit(row) per kept run."""
+    meta = {**host_metadata(), **run_metadata(binary, cpus)}
+    for i in range(args.warmup):
+        print(f"Running {version}, warmup {i + 1}...")
+        run_perf(binary, workload_args, cpus)
+        time.sleep(args.pause)
+    throughput = []
+    run = 0
+    while True:
+        run += 1
+        print(f"Running {version}, run {run}...")
+        stdout, stderr = run_perf(binary, workload_args, cpus)
+        perf_data = parse_perf_output(stderr)
+        run_data = parse_stdout(stdout)
+        if "total_operations" not in run_data:
+            raise SystemExit(f"{version} produced no results:\n{stderr}")
+        ipc = ""
+        if "instructions" in perf_data and "cycles" in perf_data and perf_data["cycles"] != 0:
+            ipc = perf_data["instructions"] / perf_data["cycles"]
+        row = {
+            "Version": version,
+            "Run": run,
+            **run_data,
+            **perf_data,
+            "IPC": ipc,
+            **meta,
+        }
+        row["ops_per_sec"] = ops_per_sec(row)
+        throughput.append(row["ops_per_sec"])
+        width = ci_halfwidth(throughput, args.confidence)
+        row["ci_halfwidth"] = width if width != float("inf") else ""
+        emit(row)
+        # Optionally pause briefly between runs.
+        time.sleep(args.pause)
+        if run >= args.runs and (args.ci_width is None or width <= args.ci_width / 100):
+            break
+        if run >= args.max_runs:
+            print(f"{version}: stopped at {run} runs, ops/sec interval +/-{100 * width:.2f}%")
+            break
+    return throughput
+
+# Monitor configurations for --monitors: name -> verif_monitor.py --properties.
+# A throttle can follow the name (length:15000 passes --throttle-ms 15000).
+MONITOR_PROPERTIES = {
+    "props": "insert-head,delete-link",
+    "length": "length",
+    "both": "insert-head,delete-link,length",
+}
+
+# Metrics of the long-format --monitors table, from the workload, perf and the monitor.
+MATRIX_METRICS = [
+    "ops_per_sec", "total_operations", "elapsed", "user", "sys",
+    "cycles", "instructions", "cache_misses", "branch_misses", "IPC",
+    "insert_ns_per_op", "search_ns_per_op", "delete_ns_per_op",
+    "insert_p99", "search_p99", "delete_p99",
+    "probe_total_ns", "probe_hits", "violations", "violations_dropped",
+]
+
+def parse_monitors(text):
+    """[(label, verif_monitor.py arguments or None)], always starting with the unmonitored "none"."""
+    configs = []
+    for spec in (item.strip() for item in text.split(",")):
+        if not spec or spec == "none":
+            continue
+        name, _, throttle = spec.partition(":")
+        if name not in MONITOR_PROPERTIES:
+            raise argparse.ArgumentTypeError("unknown monitor %r (none, %s)" % (spec, ", ".join(MONITOR_PROPERTIES)))
+        monitor_args = ["--properties", MONITOR_PROPERTIES[name]]
+        if throttle:
+            monitor_args += ["--throttle-ms", str(int(throttle))]
+        configs.append((spec, monitor_args))
+    return [("none", None)] + configs
+
+class MonitorSession:
+    """
+    verif_monitor.py on a binary for the length of a with-block. Entering
+    returns once the probes are attached; leaving stops the monitor with
+    Ctrl+C and fills in self.results from its CSV files and log.
+    """
+
+    def __init__(self, binary, monitor_args, extra_args=(), attach_timeout=120):
+        self.dir = tempfile.mkdtemp(prefix="monitor_")
+        self.log_path = os.path.join(self.dir, "monitor.log")
+        self.cmd = [sys.executable, "-u", "verif_monitor.py", binary, *monitor_args, *extra_args,
+                    "--csv", os.path.join(self.dir, "combined.csv"),
+                    "--stats-out", os.path.join(self.dir, "stats.csv"),
+                    "--violations-out", os.path.join(self.dir, "violations.csv")]
+        self.attach_timeout = attach_timeout
+        self.results = {}
+
+    def log(self):
+        with open(self.log_path) as f:
+            return f.read()
+
+    def __enter__(self):
+        # Output goes to a file, not a pipe, so a chatty monitor never blocks.
+        with open(self.log_path, "w") as log:
+            self.proc = subprocess.Popen(self.cmd, stdout=log, stderr=subprocess.STDOUT)
+        deadline = time.monotonic() + self.attach_timeout
+        while "Checking " not in self.log():
+            if self.proc.poll() is not None or time.monotonic() > deadline:
+                self.proc.kill()
+                self.proc.wait()
+                raise RuntimeError("monitor did not attach:\n" + self.log()[-2000:])
+            time.sleep(0.1)
+        return self
+
+    def __exit__(self, *exc):
+        if self.proc.poll() is None:
+            self.proc.send_signal(signal.SIGINT)
+            try:
+                self.proc.wait(timeout=60)
+            except subprocess.TimeoutExpired:
+                self.proc.kill()
+                self.proc.wait()
+        try:
+            with open(os.path.join(self.dir, "stats.csv")) as f:
+                probes = list(csv.DictReader(f))
+            self.results["probe_total_ns"] = sum(int(r["total_time_ns"]) for r in probes)
+            self.results["probe_hits"] = sum(int(r["count"]) for r in probes)
+            for r in probes:
+                self.results["%s_total_ns" % r["probe_name"]] = int(r["total_time_ns"])
+        except OSError:
+            pass
+        m = re.search(r"Violations reported: (\d+) \(dropped: (\d+)\)", self.log())
+        if m:
+            self.results["violations"] = int(m.group(1))
+            self.results["violations_dropped"] = int(m.group(2))
+        shutil.rmtree(self.dir, ignore_errors=True)
+        return False
+
+def run_matrix(versions, monitors, workload_args, args):
+    """Every version under every monitor configuration; returns the long-format rows."""
+    runs = []
+    for version, binary in versions.items():
+        for label, monitor_args in monitors:
+            for i in range(args.warmup + args.runs):
+                warmup = i < args.warmup
+                print(f"Running {version} under {label}, {'warmup' if warmup else 'run'} "
+                      f"{i + 1 if warmup else i - args.warmup + 1}...")
+                monitor = None
+                try:
+                    if monitor_args is None:
+                        stdout, stderr = run_perf(binary, workload_args, args.cpus)
+                    else:
+                        with MonitorSession(binary, monitor_args, args.monitor_args,
+                                            args.attach_timeout) as monitor:
+                            stdout, stderr = run_perf(binary, workload_args, args.cpus)
+                except RuntimeError as e:
+                    print(f"{version} under {label}: {e}", file=sys.stderr)
+                    break
+                time.sleep(args.pause)
+                if warmup:
+                    continue
+                row = {**parse_stdout(stdout), **parse_perf_output(stderr)}
+                if "total_operations" not in row:
+                    raise SystemExit(f"{version} produced no results:\n{stderr}")
+                row["ops_per_sec"] = ops_per_sec(row)
+                if row.get("cycles"):
+                    row["IPC"] = row["instructions"] / row["cycles"]
+                if monitor:
+                    row.update(monitor.results)
+                runs.append((version, label, i - args.warmup + 1, row))
+
+    # Overhead of each metric against the same version's unmonitored mean.
+    baseline = {}
+    for version, label, _, row in runs:
+        if label == "none":
+            for metric, value in row.items():
+                baseline.setdefault((version, metric), []).append(value)
+    baseline = {key: statistics.mean(values) for key, values in baseline.items()}
+    rows = []
+    for version, label, run, row in runs:
+        probe_metrics = sorted(k for k in row if k.endswith("_total_ns") and k != "probe_total_ns")
+        for metric in MATRIX_METRICS + probe_metrics:
+            if metric not in row:
+                continue
+            base = baseline.get((version, metric))
+            overhead = ""
+            if base and label != "none":
+                overhead = 100.0 * (row[metric] / base - 1)
+            rows.append({"Version": version, "monitor": label, "Run": run, "metric": metric,
+                         "value": row[metric], "baseline": "" if base is None else base,
+                         "overhead_pct": overhead})
+    return rows
+
 def main():
     parser = argparse.ArgumentParser(description="Collect performance data for linked list benchmarks")
-    parser.add_argument("--runs", type=int, default=3, help="Number of runs per version")
+    parser.add_argument("--runs", type=int, default=3,
+                        help="Number of runs per version (the minimum with --ci-width)")
     parser.add_argument("--output", type=str, default="results.csv", help="Output CSV file")
+    parser.add_argument("--replay", type=str, metavar="TRACE",
+                        help="Run every version on this trace (see trace_gen.py) instead of random keys")
+    parser.add_argument("--batch", type=int, metavar="N",
+                        help="Have the workload time batches of N operations instead of each one")
+    parser.add_argument("--counters", action="store_true",
+                        help="Also have the workload count hardware events per phase and operation type "
+                             "(needs --batch)")
+    parser.add_argument("--warmup", type=int, default=0, help="Runs per version to discard first")
+    parser.add_argument("--ci-width", type=float, metavar="PCT",
+                        help="Repeat until the ops/sec confidence interval is within +/-PCT%% of the mean")
+    parser.add_argument("--confidence", type=float, default=0.95, help="Confidence level for --ci-width")
+    parser.add_argument("--max-runs", type=int, default=30, help="Give up on --ci-width after this many runs")
+    parser.add_argument("--cpus", type=parse_cpus,
+                        help="Pin runs to these CPUs, e.g. 2-3 or 'isolated'")
+    parser.add_argument("--cpus-per-run", type=int, default=1,
+                        help="With --parallel, CPUs given to each version")
+    parser.add_argument("--parallel", action="store_true",
+                        help="Run the versions at once on disjoint slices of --cpus "
+                             "(they still share the last-level cache and memory bandwidth)")
+    parser.add_argument("--pause", type=float, default=0.5, help="Seconds to sleep between runs")
+    parser.add_argument("--monitors", type=parse_monitors, metavar="LIST",
+                        help="Measure monitor overhead instead: run every version under each of these "
+                             "verif_monitor.py configurations (none, props, length[:THROTTLE_MS], "
+                             "both[:THROTTLE_MS]), e.g. props,length:1,length:15000,both:1000. "
+                             "Needs root; writes a long-format table")
+    parser.add_argument("--monitor-args", type=str.split, default=[],
+                        help="Extra verif_monitor.py arguments, e.g. '--precompiled bpf_objects'")
+    parser.add_argument("--attach-timeout", type=float, default=120,
+                        help="Seconds to wait for a monitor to attach (default: %(default)s)")
     args = parser.parse_args()
+    if args.monitors and (args.parallel or args.ci_width is not None):
+        parser.error("--monitors runs serially for a fixed --runs")
+    if args.counters and not args.batch:
+        parser.error("--counters needs --batch")
+    if args.replay and args.batch:
+        parser.error("--replay runs the trace in order and cannot be combined with --batch")
+    if args.ci_width is not None and args.runs < 3:
+        parser.error("--ci-width needs --runs of at least 3")
+    args.max_runs = max(args.max_runs, args.runs)
+    workload_args = ["--replay", args.replay, "--duration", "0"] if args.replay else []
+    if args.batch:
+        workload_args += ["--batch", str(args.batch)]
+    if args.counters:
+        workload_args.append("--counters")
 
     # Define the three binary versions. Adjust paths as needed.
     versions = {
@@ -94,33 +441,64 @@ def main():
         "Version", "Run",
         "total_operations", "insertions", "insert_time", 
         "searches", "search_time", "deletions", "delete_time",
+        "search_hits", "delete_hits",
+        "insert_ns_per_op", "search_ns_per_op", "delete_ns_per_op",
+        *LATENCY_FIELDS,
+        *COUNTER_FIELDS,
         "cache_misses", "cycles", "instructions", "branch_misses",
-        "elapsed", "user", "sys", "IPC"
+        "elapsed", "user", "sys", "IPC",
+        "ops_per_sec", "ci_halfwidth",
+        "kernel", "cpu_model", "governor", "cpus", "binary_sha256"
     ]
 
+    if args.monitors:
+        rows = run_matrix(versions, args.monitors, workload_args, args)
+        with open(args.output, "w", newline="") as csvfile:
+            writer = csv.DictWriter(csvfile, fieldnames=["Version", "monitor", "Run", "metric", "value",
+                                                         "baseline", "overhead_pct"])
+            writer.writeheader()
+            writer.writerows(rows)
+        for version in versions:
+            for label, _ in args.monitors[1:]:
+                overheads = [r["overhead_pct"] for r in rows if r["Version"] == version
+                             and r["monitor"] == label and r["metric"] == "ops_per_sec"]
+                if overheads:
+                    print(f"{version} under {label}: ops/sec {statistics.mean(overheads):+.1f}% "
+                          f"vs unmonitored")
+        print("Overhead matrix complete. Results written to", args.output)
+        return
+
+    if args.parallel:
+        if not args.cpus:
+            parser.error("--parallel needs --cpus")
+        slots = [args.cpus[i:i + args.cpus_per_run]
+                 for i in range(0, len(args.cpus) - args.cpus_per_run + 1, args.cpus_per_run)]
+        if len(slots) < len(versions):
+            parser.error("--parallel needs %d CPUs for %d versions" % (len(versions) * args.cpus_per_run,
+                                                                         len(versions)))
+    else:
+        slots = [args.cpus] * len(versions)
+
     with open(args.output, "w", newline="") as csvfile:
         writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
         writer.writeheader()
+        lock = threading.Lock()
 
-        for version, binary in versions.items():
-            for run in range(1, args.runs+1):
-                print(f"Running {version}, run {run}...")
-                stdout, stderr = run_perf(binary)
-                perf_data = parse_perf_output(stderr)
-                run_data = parse_stdout(stdout)
-                ipc = ""
-                if "instructions" in perf_data and "cycles" in perf_data and perf_data["cycles"] != 0:
-                    ipc = perf_data["instructions"] / perf_data["cycles"]
-                row = {
-                    "Version": version,
-                    "Run": run,
-                    **run_data,
-                    **perf_data,
-                    "IPC": ipc
-                }
+        def emit(row):
+            with lock:
                 writer.writerow(row)
-                # Optionally pause briefly between runs.
-                time.sleep(0.5)
+                csvfile.flush()
+
+        jobs = [(version, binary, workload_args, cpus, args, emit)
+                for (version, binary), cpus in zip(versions.items(), slots)]
+        with ThreadPoolExecutor(max_workers=len(jobs) if args.parallel else 1) as pool:
+            results = dict(zip(versions, pool.map(lambda job: run_version(*job), jobs)))
+
+    for version, throughput in results.items():
+        mean = statistics.mean(throughput)
+        width = ci_halfwidth(throughput, args.confidence)
+        print(f"{version}: {mean:,.0f} ops/sec over {len(throughput)} runs, "
+              f"{100 * args.confidence:.0f}% CI +/-{100 * width:.2f}%")
 
     print("Data collection complete. Results written to", args.output)
 
@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+"""
+Flight recorder: the last N operations on each list, dumped on violation.
+
+Every monitored insert, delete and search appends a flight_rec_t (args and
+the head/node/link pointers around the operation) to a circular buffer kept
+per list and per CPU in a BPF_PERCPU_HASH, so recording takes no lock and
+costs two map lookups per operation. Nothing leaves the kernel until a
+check fires.
+
+report_violation() bumps a per-CPU counter; the recorder fragment, which
+runs after the property checks in the same probe, sees the counter move
+and freezes the list: it is added to flight_frozen and no CPU records to it
+any more. FlightDumper (an on_tick callback) then reads every CPU's buffer
+for each frozen list, merges them by timestamp and writes the result to a
+CSV file in one os.replace(), then clears the buffers and unfreezes the list.
+
+A violation reported from a probe without a recorder fragment (the deletion
+hook) is picked up by the next recorded operation on that CPU, normally the
+return probe of the same delete.
+
+Searches take the first node rather than the head address, so they are
+matched to their list through flight_firsts, which maps the head node left
+by the last insert/delete on each list back to the list.
+"""
+import ctypes
+import os
+import struct
+import sys
+
+from properties.base import Property
+
+OPS = {1: "insert", 2: "delete", 3: "search"}
+FIELDNAMES = ["ts_ns", "cpu", "tid", "op", "arg", "ret", "head_before", "head_after", "node", "link"]
+
+FLIGHT_BPF = r"""
+// --- Flight recorder ---
+#define FLIGHT_DEPTH %(depth)d
+
+struct flight_rec_t {
+    u64 ts_ns;
+    u64 head_before;
+    u64 head_after;
+    u64 node;   // insert: new head; delete: unlinked node; search: result
+    u64 link;   // insert: node->next; delete: its successor
+    u32 tid;
+    int arg;
+    int ret;    // -1: not known (deferred searches)
+    u32 op;
+};
+
+struct flight_ring_t {
+    u64 pos;
+    struct flight_rec_t recs[FLIGHT_DEPTH];
+};
+
+struct flight_freeze_t {
+    u64 ts_ns;
+    u32 probe_id;
+    u32 cpu;
+};
+
+BPF_PERCPU_HASH(flight_log, struct pid_addr_t, struct flight_ring_t, %(lists)d);
+// Zeroed template for new rings; too large for the BPF stack.
+BPF_ARRAY(flight_zero, struct flight_ring_t, 1);
+BPF_HASH(flight_frozen, struct pid_addr_t, struct flight_freeze_t, %(max_dumps)d);
+// violation_seq value last acted on, per CPU.
+BPF_PERCPU_ARRAY(flight_seen, u64, 1);
+BPF_LRU_HASH(flight_firsts, struct pid_addr_t, u64, %(lists)d);
+
+static inline u64 flight_list_of(u64 first) {
+    struct pid_addr_t k = pid_addr(first);
+    u64 *head_addr = flight_firsts.lookup(&k);
+    return head_addr ? *head_addr : 0;
+}
+
+static inline void flight_record(u32 probe_id, u64 head_addr, u32 op, int arg, int ret,
+                                 u64 head_before, u64 node, u64 link) {
+    if (!head_addr)
+        return;
+    struct pid_addr_t key = pid_addr(head_addr);
+    u64 head_after = 0;
+    bpf_probe_read_user(&head_after, sizeof(head_after), (void*)head_addr);
+    if (op != OP_SEARCH && head_after) {
+        struct pid_addr_t first = pid_addr(head_after);
+        flight_firsts.update(&first, &head_addr);
+    }
+    if (flight_frozen.lookup(&key))
+        return;
+    struct flight_ring_t *ring = flight_log.lookup(&key);
+    if (!ring) {
+        u32 zero = 0;
+        struct flight_ring_t *init = flight_zero.lookup(&zero);
+        if (!init)
+            return;
+        flight_log.update(&key, init);
+        ring = flight_log.lookup(&key);
+        if (!ring)
+            return;
+    }
+    if (op == OP_INSERT && !node && head_after) {
+        node = head_after;
+        bpf_probe_read_user(&link, sizeof(link), (void*)(node + 8));
+    }
+    struct flight_rec_t *r = &ring->recs[ring->pos & (FLIGHT_DEPTH - 1)];
+    ring->pos++;
+    r->ts_ns = bpf_ktime_get_ns();
+    r->head_before = head_before;
+    r->head_after = head_after;
+    r->node = node;
+    r->link = link;
+    r->tid = bpf_get_current_pid_tgid();
+    r->arg = arg;
+    r->ret = ret;
+    r->op = op;
+
+    u32 zero = 0;
+    u64 *seq = violation_seq.lookup(&zero);
+    u64 *seen = flight_seen.lookup(&zero);
+    if (seq && seen && *seq != *seen) {
+        *seen = *seq;
+        if (!flight_frozen.lookup(&key)) {
+            struct flight_freeze_t f = {};
+            f.ts_ns = r->ts_ns;
+            f.probe_id = probe_id;
+            f.cpu = bpf_get_smp_processor_id();
+            flight_frozen.update(&key, &f);
+        }
+    }
+}
+"""
+
+
+def _record_types(depth):
+    class FlightRec(ctypes.Structure):
+        _fields_ = [
+            ("ts_ns", ctypes.c_uint64),
+            ("head_before", ctypes.c_uint64),
+            ("head_after", ctypes.c_uint64),
+            ("node", ctypes.c_uint64),
+            ("link", ctypes.c_uint64),
+            ("tid", ctypes.c_uint32),
+            ("arg", ctypes.c_int32),
+            ("ret", ctypes.c_int32),
+            ("op", ctypes.c_uint32),
+        ]
+
+    class FlightRing(ctypes.Structure):
+        _fields_ = [("pos", ctypes.c_uint64), ("recs", FlightRec * depth)]
+
+    class FlightFreeze(ctypes.Structure):
+        _fields_ = [("ts_ns", ctypes.c_uint64), ("probe_id", ctypes.c_uint32), ("cpu", ctypes.c_uint32)]
+
+    return FlightRing, FlightFreeze
+
+
+class FlightRecorder(Property):
+    """Recording fragments for verif_monitor; enabled with --flight-recorder N."""
+
+    name = "flight-recorder"
+    context_fields = "u64 fr_list; u64 fr_before; u64 fr_node; u64 fr_link;"
+
+    def __init__(self, args):
+        super().__init__(args)
+        depth = args.flight_recorder
+        if depth & (depth - 1):
+            raise SystemExit("--flight-recorder must be a power of two, got %d" % depth)
+        ring, freeze = _record_types(depth)
+        self.value_types = {"flight_log": ring, "flight_zero": ring, "flight_frozen": freeze}
+        self.dumper = None
+        self.hooks = {
+            "insert_entry": r"""
+    c->fr_list = c->head_addr;
+    bpf_probe_read_user(&c->fr_before, sizeof(c->fr_before), (void*)c->head_addr);
+""",
+            "delete_entry": r"""
+    c->fr_list = c->head_addr;
+    bpf_probe_read_user(&c->fr_before, sizeof(c->fr_before), (void*)c->head_addr);
+""",
+            "delete_hook": r"""
+    c->fr_node = PT_REGS_PARM2(ctx);
+    c->fr_link = PT_REGS_PARM3(ctx);
+""",
+            "insert_return": r"""
+    flight_record(PROBE_ID, c->fr_list, OP_INSERT, c->arg, 0, c->fr_before, 0, 0);
+""",
+            "delete_return": r"""
+    flight_record(PROBE_ID, c->fr_list, OP_DELETE, c->arg, ret, c->fr_before, c->fr_node, c->fr_link);
+""",
+        }
+        if args.attach == "deferred":
+            # No return probe: the search is recorded at entry, result unknown.
+            self.hooks["search_entry"] = r"""
+    flight_record(PROBE_ID, flight_list_of(c->head_addr), OP_SEARCH, c->arg, -1, c->head_addr, 0, 0);
+"""
+        else:
+            self.hooks["search_entry"] = r"""
+    c->fr_list = flight_list_of(c->head_addr);
+"""
+            self.hooks["search_return"] = r"""
+    flight_record(PROBE_ID, c->fr_list, OP_SEARCH, c->arg, PT_REGS_RC(ctx) != 0,
+                  c->head_addr, PT_REGS_RC(ctx), 0);
+"""
+        # usdt_heads still holds the head from before the operation here; the
+        # epilogue that updates it runs after the fragments.
+        self.usdt_hooks = {
+            "usdt_insert_done": r"""
+    {
+        u64 *before = usdt_heads.lookup(&lkey);
+        u64 node_next = 0;
+        bpf_probe_read_user(&node_next, sizeof(node_next), (void*)(node + 8));
+        flight_record(PROBE_ID, head_addr, OP_INSERT, value, 0, before ? *before : 0, node, node_next);
+    }
+""",
+            "usdt_delete_unlink": r"""
+    {
+        u64 *before = usdt_heads.lookup(&lkey);
+        flight_record(PROBE_ID, head_addr, OP_DELETE, value, 1, before ? *before : 0, target, succ);
+    }
+""",
+            "usdt_delete_miss": r"""
+    {
+        u64 *before = usdt_heads.lookup(&lkey);
+        flight_record(PROBE_ID, head_addr, OP_DELETE, value, 0, before ? *before : 0, 0, 0);
+    }
+""",
+            "usdt_search_hit": r"""
+    flight_record(PROBE_ID, flight_list_of(first), OP_SEARCH, value, 1, first, node, 0);
+""",
+            "usdt_search_miss": r"""
+    flight_record(PROBE_ID, flight_list_of(first), OP_SEARCH, value, 0, first, 0, 0);
+""",
+        }
+
+    @classmethod
+    def add_arguments(cls, parser):
+        parser.add_argument("--flight-recorder", type=int, default=0, metavar="N",
+                            help="Keep the last N operations per list and CPU (a power of two) and dump "
+                                 "them to --flight-dir when a check fires (default: off)")
+        parser.add_argument("--flight-dir", default="flight_dumps",
+                            help="Directory for flight recorder dumps (default: %(default)s)")
+        parser.add_argument("--flight-max-dumps", type=int, default=16,
+                            help="Stop dumping after this many; later violations leave their list "
+                                 "frozen (default: %(default)s)")
+        parser.add_argument("--flight-lists", type=int, default=256,
+                            help="Lists the recorder keeps buffers for (default: %(default)s)")
+
+    def bpf_text(self):
+        return FLIGHT_BPF % {"depth": self.args.flight_recorder, "lists": self.args.flight_lists,
+                             "max_dumps": self.args.flight_max_dumps}
+
+    def ticks(self, b):
+        self.dumper = FlightDumper(b, self.args.flight_dir, self.args.flight_max_dumps)
+        return [self.dumper]
+
+    def report(self, b):
+        if self.dumper is None:
+            return
+        self.dumper(None)
+        print("Flight recorder: %d dumps written to %s" % (len(self.dumper.written), self.args.flight_dir))
+
+
+class FlightDumper:
+    """on_tick callback writing one CSV file per frozen list."""
+
+    def __init__(self, b, out_dir, max_dumps):
+        self.b = b
+        self.out_dir = out_dir
+        self.max_dumps = max_dumps
+        self.written = []
+
+    def _records(self, key):
+        log = self.b["flight_log"]
+        try:
+            rings = log[log.Key.from_buffer_copy(bytes(key))]
+        except KeyError:
+            return []
+        records = []
+        for cpu, ring in enumerate(rings):
+            for rec in ring.recs[:min(ring.pos, len(ring.recs))]:
+                records.append((rec.ts_ns, cpu, rec))
+        records.sort(key=lambda r: r[0])
+        return records
+
+    def dump(self, key, freeze):
+        pid, _, head_addr = struct.unpack("<IIQ", bytes(key))
+        os.makedirs(self.out_dir, exist_ok=True)
+        path = os.path.join(self.out_dir, "flight_%d_%x_%d.csv" % (pid, head_addr, freeze.ts_ns))
+        tmp = path + ".tmp"
+        with open(tmp, "w") as f:
+            f.write("# pid %d list 0x%x frozen at %d by probe %d on cpu %d\n" % (
+                pid, head_addr, freeze.ts_ns, freeze.probe_id, freeze.cpu))
+            f.write(",".join(FIELDNAMES) + "\n")
+            for ts, cpu, r in self._records(key):
+                f.write("%d,%d,%d,%s,%d,%d,0x%x,0x%x,0x%x,0x%x\n" % (
+                    ts, cpu, r.tid, OPS.get(r.op, str(r.op)), r.arg, r.ret,
+                    r.head_before, r.head_after, r.node, r.link))
+        os.replace(tmp, path)
+        self.written.append(path)
+        print("Flight recorder: dumped list 0x%x of pid %d to %s" % (head_addr, pid, path), file=sys.stderr)
+
+    def __call__(self, now):
+        if len(self.written) >= self.max_dumps:
+            return
+        frozen = self.b["flight_frozen"]
+        for key, freeze in frozen.items():
+            if len(self.written) >= self.max_dumps:
+                break
+            self.dump(key, freeze)
+            # Start the list over so the next violation gets its own history.
+            try:
+                del self.b["flight_log"][self.b["flight_log"].Key.from_buffer_copy(bytes(key))]
+            except KeyError:
+                pass
+            del frozen[key]
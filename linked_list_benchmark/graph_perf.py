@@ -14,6 +14,27 @@ def plot_with_error(x, y_mean, y_std, title, ylabel, filename):
     plt.savefig(filename)
     plt.show()
 
+LATENCY_STATS = ["p50", "p90", "p99", "p999", "max"]
+LATENCY_LABELS = ["p50", "p90", "p99", "p99.9", "max"]
+
+def plot_latency_percentiles(df, op, filename):
+    # Grouped bars: one group per percentile, one bar per version, log scale
+    # so the tail is visible next to the median.
+    columns = ["%s_%s" % (op, stat) for stat in LATENCY_STATS]
+    grouped = df.groupby("Version")[columns].median()
+    positions = np.arange(len(columns))
+    width = 0.8 / len(grouped)
+    plt.figure(figsize=(8,6))
+    for i, (version, row) in enumerate(grouped.iterrows()):
+        plt.bar(positions + i * width, row.values, width, label=version, alpha=0.7)
+    plt.xticks(positions + width * (len(grouped) - 1) / 2, LATENCY_LABELS)
+    plt.yscale("log")
+    plt.title("%s latency percentiles by Version (median over runs)" % op.capitalize())
+    plt.ylabel("Latency (ns)")
+    plt.legend()
+    plt.savefig(filename)
+    plt.show()
+
 def main():
     parser = argparse.ArgumentParser(description="Graph performance data from CSV")
     parser.add_argument("--csv", type=str, default="results.csv", help="Input CSV file with performance data")
@@ -69,6 +90,11 @@ def main():
     plot_with_error(grouped['Version'], grouped['cycles_sec_mean'], grouped['cycles_sec_std'],
                     "Average Cycles per Second by Version", "Cycles per Second", "cycles_sec_by_version.png")
     
+    # Plot per-operation latency percentiles when the workload reported them.
+    for op in ("insert", "search", "delete"):
+        if "%s_p50" % op in df.columns and df["%s_p50" % op].notna().any():
+            plot_latency_percentiles(df, op, "%s_latency_percentiles.png" % op)
+
     # Optionally, print aggregated data for review.
     print(grouped)
 
@@ -0,0 +1,100 @@
+#include <math.h>
+#include <string.h>
+#include "keygen.h"
+
+static const char* dist_names[] = { "uniform", "zipf", "hotset", "sequential" };
+
+uint64_t keygen_rand(KeyGen* g) {
+    /* xorshift64*: much cheaper than rand() and not shared with libc. */
+    g->rng ^= g->rng >> 12;
+    g->rng ^= g->rng << 25;
+    g->rng ^= g->rng >> 27;
+    return g->rng * 0x2545F4914F6CDD1DULL;
+}
+
+static double keygen_unit(KeyGen* g) {
+    return (keygen_rand(g) >> 11) * (1.0 / 9007199254740992.0);
+}
+
+int keygen_uniform(KeyGen* g, int min, int max) {
+    return min + (int)(keygen_rand(g) % (uint64_t)(max - min + 1));
+}
+
+static double zeta(long n, double theta) {
+    double sum = 0.0;
+    for (long i = 1; i <= n; i++)
+        sum += 1.0 / pow((double)i, theta);
+    return sum;
+}
+
+void keygen_init(KeyGen* g, KeyDist dist, int key_min, int key_max, uint64_t seed,
+                 double zipf_theta, double hot_fraction, double hot_probability) {
+    memset(g, 0, sizeof(*g));
+    g->dist = dist;
+    g->key_min = key_min;
+    g->key_max = key_max;
+    g->rng = seed ? seed : 0x9E3779B97F4A7C15ULL;
+    long n = (long)key_max - key_min + 1;
+    if (dist == DIST_ZIPF) {
+        /* O(n) once; sampling is O(1). */
+        g->zipf_theta = zipf_theta;
+        g->zipf_zetan = zeta(n, zipf_theta);
+        double zeta2 = zeta(2, zipf_theta);
+        g->zipf_alpha = 1.0 / (1.0 - zipf_theta);
+        g->zipf_eta = (1.0 - pow(2.0 / n, 1.0 - zipf_theta)) / (1.0 - zeta2 / g->zipf_zetan);
+    }
+    g->hot_keys = (int)(n * hot_fraction);
+    if (g->hot_keys < 1)
+        g->hot_keys = 1;
+    g->hot_probability = hot_probability;
+    /* Deletes trail inserts by half the range so they don't always hit the head. */
+    g->next_seq[0] = 0;
+    g->next_seq[1] = 0;
+    g->next_seq[2] = (int)(n / 2);
+}
+
+int keygen_next(KeyGen* g, int op) {
+    int n = g->key_max - g->key_min + 1;
+    switch (g->dist) {
+    case DIST_ZIPF: {
+        double u = keygen_unit(g);
+        double uz = u * g->zipf_zetan;
+        long rank;
+        if (uz < 1.0)
+            rank = 0;
+        else if (uz < 1.0 + pow(0.5, g->zipf_theta))
+            rank = 1;
+        else
+            rank = (long)(n * pow(g->zipf_eta * u - g->zipf_eta + 1.0, g->zipf_alpha));
+        if (rank >= n)
+            rank = n - 1;
+        return g->key_min + (int)rank;
+    }
+    case DIST_HOTSET:
+        if (keygen_unit(g) < g->hot_probability)
+            return g->key_min + (int)(keygen_rand(g) % (uint64_t)g->hot_keys);
+        return keygen_uniform(g, g->key_min, g->key_max);
+    case DIST_SEQUENTIAL: {
+        int k = g->next_seq[op];
+        g->next_seq[op] = (k + 1) % n;
+        return g->key_min + k;
+    }
+    case DIST_UNIFORM:
+    default:
+        return keygen_uniform(g, g->key_min, g->key_max);
+    }
+}
+
+int keygen_parse_dist(const char* name, KeyDist* dist) {
+    for (int i = 0; i < (int)(sizeof(dist_names) / sizeof(dist_names[0])); i++) {
+        if (strcmp(name, dist_names[i]) == 0) {
+            *dist = (KeyDist)i;
+            return 0;
+        }
+    }
+    return -1;
+}
+
+const char* keygen_dist_name(KeyDist dist) {
+    return dist_names[dist];
+}
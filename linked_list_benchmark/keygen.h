@@ -0,0 +1,42 @@
+#ifndef KEYGEN_H
+#define KEYGEN_H
+
+#include <stdint.h>
+
+/* Key distributions for the workload. */
+typedef enum {
+    DIST_UNIFORM,
+    DIST_ZIPF,
+    DIST_HOTSET,
+    DIST_SEQUENTIAL
+} KeyDist;
+
+typedef struct KeyGen {
+    KeyDist dist;
+    int key_min;
+    int key_max;
+    uint64_t rng;           /* xorshift64* state */
+    /* zipf (Gray et al., as in YCSB); rank 0 is the most frequent key */
+    double zipf_theta;
+    double zipf_alpha;
+    double zipf_zetan;
+    double zipf_eta;
+    /* hot set: hot_probability of the keys come from the first hot_keys */
+    int hot_keys;
+    double hot_probability;
+    /* sequential: each operation type walks the range from its own offset */
+    int next_seq[3];
+} KeyGen;
+
+void keygen_init(KeyGen* g, KeyDist dist, int key_min, int key_max, uint64_t seed,
+                 double zipf_theta, double hot_fraction, double hot_probability);
+/* Next key for operation type op (0 insert, 1 search, 2 delete). */
+int keygen_next(KeyGen* g, int op);
+/* Uniform random helpers sharing the generator's state. */
+uint64_t keygen_rand(KeyGen* g);
+int keygen_uniform(KeyGen* g, int min, int max);
+
+int keygen_parse_dist(const char* name, KeyDist* dist);
+const char* keygen_dist_name(KeyDist dist);
+
+#endif
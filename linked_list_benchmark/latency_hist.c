@@ -0,0 +1,39 @@
+#include <math.h>
+#include <stdio.h>
+#include "latency_hist.h"
+
+static uint64_t bucket_high(int i) {
+    if (i < LAT_HIST_SUB)
+        return (uint64_t)i;
+    int e = (i - LAT_HIST_SUB) / LAT_HIST_HALF + LAT_HIST_BITS;
+    uint64_t sub = (uint64_t)((i - LAT_HIST_SUB) % LAT_HIST_HALF + LAT_HIST_HALF);
+    int shift = e - (LAT_HIST_BITS - 1);
+    return ((sub + 1) << shift) - 1;
+}
+
+uint64_t lat_hist_percentile(const LatencyHist* h, double p) {
+    if (h->count == 0)
+        return 0;
+    uint64_t rank = (uint64_t)ceil(p / 100.0 * (double)h->count);
+    if (rank < 1)
+        rank = 1;
+    uint64_t seen = 0;
+    for (int i = 0; i < LAT_HIST_BUCKETS; i++) {
+        seen += h->buckets[i];
+        if (seen >= rank) {
+            uint64_t v = bucket_high(i);
+            return v < h->max ? v : h->max;
+        }
+    }
+    return h->max;
+}
+
+void lat_hist_print(const char* name, const LatencyHist* h) {
+    printf("Latency %s: count=%llu p50=%llu p90=%llu p99=%llu p99.9=%llu max=%llu ns\n", name,
+           (unsigned long long)h->count,
+           (unsigned long long)lat_hist_percentile(h, 50.0),
+           (unsigned long long)lat_hist_percentile(h, 90.0),
+           (unsigned long long)lat_hist_percentile(h, 99.0),
+           (unsigned long long)lat_hist_percentile(h, 99.9),
+           (unsigned long long)h->max);
+}
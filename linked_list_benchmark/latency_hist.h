@@ -0,0 +1,49 @@
+#ifndef LATENCY_HIST_H
+#define LATENCY_HIST_H
+
+#include <stdint.h>
+
+/*
+ * Log-bucketed latency histogram in the style of HdrHistogram.
+ *
+ * Values below LAT_HIST_SUB are counted exactly. Above that every power of
+ * two is split into LAT_HIST_SUB / 2 equal sub-buckets, so a recorded value
+ * is off by at most 1/16 (about 6%) from the bucket it lands in, whatever
+ * its magnitude. Recording is a clz, a shift and an increment; the whole
+ * 64-bit range fits in under 8 KB per histogram.
+ */
+
+#define LAT_HIST_BITS 5
+#define LAT_HIST_SUB (1 << LAT_HIST_BITS)
+#define LAT_HIST_HALF (LAT_HIST_SUB / 2)
+#define LAT_HIST_BUCKETS (LAT_HIST_SUB + (64 - LAT_HIST_BITS) * LAT_HIST_HALF)
+
+typedef struct LatencyHist {
+    uint64_t count;
+    uint64_t max;
+    uint64_t buckets[LAT_HIST_BUCKETS];
+} LatencyHist;
+
+static inline int lat_hist_index(uint64_t v) {
+    if (v < LAT_HIST_SUB)
+        return (int)v;
+    int e = 63 - __builtin_clzll(v);
+    int sub = (int)(v >> (e - (LAT_HIST_BITS - 1))) & (LAT_HIST_HALF - 1);
+    return LAT_HIST_SUB + (e - LAT_HIST_BITS) * LAT_HIST_HALF + sub;
+}
+
+static inline void lat_hist_record(LatencyHist* h, uint64_t v) {
+    h->buckets[lat_hist_index(v)]++;
+    h->count++;
+    if (v > h->max)
+        h->max = v;
+}
+
+/* Highest value that lands in the same bucket as the p-th percentile
+ * (0 < p <= 100), capped at the recorded maximum; 0 if h is empty. */
+uint64_t lat_hist_percentile(const LatencyHist* h, double p);
+
+/* Print one "Latency <name>: count=N p50=... max=... ns" line. */
+void lat_hist_print(const char* name, const LatencyHist* h);
+
+#endif
@@ -0,0 +1,356 @@
+#!/usr/bin/env python3
+"""
+Linked list length checking used by the length property (properties/length.py).
+
+Both modes walk at most `slice_size` nodes per probe hit (the node
+budget), resume from a saved cursor on the next hit when the list is
+longer, and reconcile against the expected length when the walk reaches
+NULL. State is kept per (pid, head address), so one monitor can follow
+many lists in many processes:
+
+  full         budget of MAX_LEN nodes, so lists up to that size are walked
+               inside a single probe; walks start at most once per throttle
+               period.
+  incremental  small budget per hit; the gap before the next walk scales
+               with the observed length so the average read rate stays under
+               `nodes_per_sec`.
+
+The traversal engine decides how a hit walks its budget: "unroll" is a
+#pragma unroll loop, so program size grows with the budget; "loop" uses
+bpf_loop (Linux 5.17+), whose budget is only an iteration count, so one hit
+can cover lists of millions of nodes. A walk that passes `max_walk_nodes`
+is given up and counted in the walk stats rather than reported, since a
+cycle and a list longer than the limit look the same from the walk.
+
+Both modes define the len_lists map and the check_list_length(probe_id,
+head_addr), length_note_insert(head_addr) and length_note_delete(head_addr,
+target, succ) helpers; probes call them the same way in either mode. They
+need struct pid_addr_t and pid_addr() from verif_monitor.HEADER.
+
+Walks in progress are read back from len_lists, per list, by
+walk_progress().
+"""
+import ctypes
+import struct
+
+MODES = ("full", "incremental")
+DEFAULT_SLICE = {"full": 50000, "incremental": 256}
+
+_COMMON = r"""
+// --- Length checking ---
+#define MAX_LEN 50000
+#define LEN_THROTTLE_NS %(throttle_ns)dULL
+#define LEN_SLICE %(slice_size)d
+#define LEN_NS_PER_NODE %(ns_per_node)dULL
+#define LEN_MAX_LISTS %(max_lists)d
+// A walk is given up after this many nodes: the list is either following
+// a cycle or longer than --max-walk-nodes, so it is counted, not reported.
+#define LEN_WALK_LIMIT %(max_walk_nodes)dLL
+"""
+
+# len_walk_nodes(&curr) advances curr by at most LEN_SLICE nodes and
+# returns how many it visited.
+_UNROLL = r"""
+static inline u32 len_walk_nodes(u64 *cursor) {
+    u64 curr = *cursor;
+    u32 visited = 0;
+#pragma unroll
+    for (int i = 0; i < LEN_SLICE; i++) {
+        if (curr == 0)
+            break; // end of list reached
+        visited++;
+        u64 next = 0;
+        // Assumes node layout: first 8 bytes is data; next 8 bytes is pointer to next node.
+        bpf_probe_read_user(&next, sizeof(next), (void *)(curr + 8));
+        curr = next;
+    }
+    *cursor = curr;
+    return visited;
+}
+"""
+
+# bpf_loop (Linux 5.17+) verifies the callback once, so the budget is a
+# runtime count rather than unrolled code.
+_LOOP = r"""
+struct len_step_t {
+    u64 curr;
+    u32 visited;
+};
+
+static long len_walk_step(u32 index, void *data) {
+    struct len_step_t *s = data;
+    if (s->curr == 0)
+        return 1; // end of list reached
+    s->visited++;
+    u64 next = 0;
+    // Assumes node layout: first 8 bytes is data; next 8 bytes is pointer to next node.
+    bpf_probe_read_user(&next, sizeof(next), (void *)(s->curr + 8));
+    s->curr = next;
+    return 0;
+}
+
+static inline u32 len_walk_nodes(u64 *cursor) {
+    struct len_step_t s = {};
+    s.curr = *cursor;
+    bpf_loop(LEN_SLICE, len_walk_step, &s, 0);
+    *cursor = s.curr;
+    return s.visited;
+}
+"""
+
+_WALK = r"""
+// Per-list state, keyed by (pid, head address). Inserts only ever happen
+// at the head, so they never change the number of nodes left ahead of the
+// cursor; each successful delete can remove at most one of them. A walk
+// that started when the list held L nodes must therefore count between
+// L - deletes and L.
+//
+// The length is known as a range: expected is its lower end and slack its
+// width. A walk of a list first seen mid-run (monitor attached late, or a
+// forked child carrying on its parent's list) sets the range to
+// [count, count + deletes]; every later walk must overlap it and narrows
+// it to the overlap, so a list calibrated while deletes ran is checked
+// straight away and tightens as walks see fewer deletes.
+struct len_list_t {
+    u64 cursor;        // next node of the walk in progress
+    u64 next_walk_ns;  // earliest start of the next walk
+    int expected;      // lowest possible length: inserts minus successful deletes seen
+    int count;         // nodes counted by the walk in progress
+    int walk_expected; // expected when the walk started
+    u32 deletes;       // successful deletes since the walk started
+    u32 active;        // a walk is in progress
+    u32 known;         // expected has been calibrated by a walk
+    u32 slack;         // the length may be up to this much above expected
+};
+BPF_HASH(len_lists, struct pid_addr_t, struct len_list_t, LEN_MAX_LISTS);
+// 0: walks completed, 1: walks abandoned, 2: nodes visited,
+// 3: probe hits that left a walk unfinished, 4: lists calibrated,
+// 5: lists not tracked because len_lists was full, 6: walks that hit LEN_WALK_LIMIT
+BPF_ARRAY(len_walk_stats, u64, 7);
+
+static inline void len_walk_stat(u32 idx, u64 n) {
+    u64 *v = len_walk_stats.lookup(&idx);
+    if (v)
+        __sync_fetch_and_add(v, n);
+}
+
+static inline struct len_list_t *len_list(u64 head_addr) {
+    struct pid_addr_t key = pid_addr(head_addr);
+    struct len_list_t *l = len_lists.lookup(&key);
+    if (l)
+        return l;
+    struct len_list_t zero = {};
+    if (len_lists.update(&key, &zero) != 0) {
+        len_walk_stat(5, 1);
+        return 0;
+    }
+    return len_lists.lookup(&key);
+}
+
+// A freed node is reused LIFO by the next insert. If that node is the
+// cursor the walk would jump back to the head, so abandon it.
+static inline void length_note_insert(u64 head_addr) {
+    struct len_list_t *l = len_list(head_addr);
+    if (!l)
+        return;
+    l->expected++;
+    if (!l->active)
+        return;
+    u64 new_head = 0;
+    bpf_probe_read_user(&new_head, sizeof(new_head), (void *)head_addr);
+    if (new_head == l->cursor) {
+        l->active = 0;
+        len_walk_stat(1, 1);
+    }
+}
+
+// Deleting the node the walk is parked on frees it, and the allocator may
+// overwrite its next pointer (or reuse it at the head), so the walk moves
+// on to the node's successor. Skipping the node is within the one removal
+// per delete the reconcile allows for.
+static inline void length_note_delete(u64 head_addr, u64 target, u64 succ) {
+    struct len_list_t *l = len_list(head_addr);
+    if (!l)
+        return;
+    l->expected--;
+    if (!l->active)
+        return;
+    l->deletes++;
+    if (target && target == l->cursor)
+        l->cursor = succ;
+}
+
+// Advance the list's walk by at most LEN_SLICE nodes; start a new one if
+// the previous walk finished and its gap has elapsed.
+static inline int check_list_length(u32 probe_id, u64 head_addr) {
+    struct pid_addr_t key = pid_addr(head_addr);
+    struct len_list_t *l = len_lists.lookup(&key);
+    if (!l)
+        return 0;
+    u64 now = bpf_ktime_get_ns();
+    if (!l->active) {
+        if (now < l->next_walk_ns)
+            return 0;
+        l->walk_expected = l->expected;
+        l->count = 0;
+        l->deletes = 0;
+        l->cursor = 0;
+        bpf_probe_read_user(&l->cursor, sizeof(l->cursor), (void *)head_addr);
+        l->active = 1;
+    }
+
+    u64 curr = l->cursor;
+    u32 visited = len_walk_nodes(&curr);
+    l->cursor = curr;
+    l->count += visited;
+    len_walk_stat(2, visited);
+    if (curr != 0 && l->count < LEN_WALK_LIMIT) {
+        len_walk_stat(3, 1);
+        return 0;
+    }
+
+    // Walk finished or hit the limit: reconcile and schedule the next one.
+    if (curr != 0) {
+        len_walk_stat(6, 1);
+    } else {
+        // Lengths at the start of the walk: [lo, hi] from the walk, and
+        // [walk_expected, walk_expected + slack] from the operations seen.
+        int lo = l->count, hi = l->count + (int)l->deletes;
+        int want_lo = l->walk_expected, want_hi = l->walk_expected + (int)l->slack;
+        if (!l->known) {
+            want_lo = lo;
+            want_hi = hi;
+            l->known = 1;
+            len_walk_stat(4, 1);
+        }
+        if (lo > want_hi || hi < want_lo) {
+            report_violation(probe_id, VIOL_LENGTH_MISMATCH, head_addr, l->walk_expected, l->count);
+        } else {
+            if (lo > want_lo)
+                want_lo = lo;
+            if (hi < want_hi)
+                want_hi = hi;
+            l->expected += want_lo - l->walk_expected;
+            l->slack = want_hi - want_lo;
+        }
+    }
+    l->active = 0;
+    l->next_walk_ns = now + LEN_THROTTLE_NS + (u64)l->count * LEN_NS_PER_NODE;
+    len_walk_stat(0, 1);
+    return 0;
+}
+"""
+
+ENGINES = ("unroll", "loop")
+# bpf_loop rejects more iterations than this.
+MAX_LOOP_NODES = 1 << 23
+# Default --max-walk-nodes: far past any list the benchmark builds, and
+# small enough that counts stay within an int.
+DEFAULT_MAX_WALK_NODES = 100000000
+
+
+def length_check_bpf(mode="full", throttle_ns=1000000000, slice_size=None, nodes_per_sec=1000000,
+                     engine="unroll", max_lists=1024, max_walk_nodes=DEFAULT_MAX_WALK_NODES):
+    """BPF text for the length checker in the given mode and traversal engine."""
+    if mode not in MODES:
+        raise ValueError("unknown length check mode %r (expected one of %s)" % (mode, ", ".join(MODES)))
+    if engine not in ENGINES:
+        raise ValueError("unknown walk engine %r (expected one of %s)" % (engine, ", ".join(ENGINES)))
+    if slice_size is None:
+        slice_size = DEFAULT_SLICE[mode]
+    if engine == "loop" and not 0 < slice_size <= MAX_LOOP_NODES:
+        raise ValueError("node budget must be between 1 and %d with bpf_loop" % MAX_LOOP_NODES)
+    if not 0 < max_walk_nodes < 1 << 31:
+        raise ValueError("walk limit must be between 1 and %d nodes" % ((1 << 31) - 1))
+    params = {
+        "throttle_ns": throttle_ns,
+        "max_lists": max_lists,
+        "max_walk_nodes": max_walk_nodes,
+        "slice_size": slice_size,
+        # Full mode keeps a fixed gap between walks.
+        "ns_per_node": 0 if mode == "full" else max(1, 1000000000 // max(1, nodes_per_sec)),
+    }
+    engine_text = _UNROLL if engine == "unroll" else _LOOP
+    return (_COMMON + engine_text + _WALK) % params
+
+
+def add_length_arguments(parser, default_throttle_ms):
+    parser.add_argument("--length-mode", choices=MODES, default="full",
+                        help="full: walk the whole list in one probe hit; incremental: walk a bounded slice per hit")
+    parser.add_argument("--throttle-ms", type=int, default=default_throttle_ms,
+                        help="Minimum gap between length checks in ms (default: %(default)s)")
+    parser.add_argument("--walk-engine", choices=ENGINES, default="unroll",
+                        help="unroll: unrolled traversal loop; loop: bpf_loop, for budgets past a few "
+                             "thousand nodes (Linux 5.17+)")
+    parser.add_argument("--slice", "--node-budget", dest="slice", type=int,
+                        help="Nodes walked per probe hit; longer lists continue on the next hit "
+                             "(default: 50000 in full mode, 256 in incremental mode)")
+    parser.add_argument("--nodes-per-sec", type=int, default=1000000,
+                        help="Incremental mode: average node read budget; the gap after a walk grows "
+                             "with the observed length (default: %(default)s)")
+    parser.add_argument("--max-walk-nodes", type=int, default=DEFAULT_MAX_WALK_NODES,
+                        help="Give up a walk after this many nodes, taking the list to be cyclic or "
+                             "longer than expected; such walks are counted, not reported "
+                             "(default: %(default)s)")
+
+
+def length_check_from_args(args):
+    return length_check_bpf(args.length_mode, args.throttle_ms * 1000000, args.slice, args.nodes_per_sec,
+                            args.walk_engine, args.max_lists, args.max_walk_nodes)
+
+
+def print_walk_stats(b, args):
+    stats = b["len_walk_stats"]
+    print("Length walks: %d completed, %d abandoned, %d nodes visited, %d unfinished probe hits" % (
+        stats[0].value, stats[1].value, stats[2].value, stats[3].value))
+    print("  %d lists calibrated, %d lists not tracked (--max-lists reached), "
+          "%d walks given up at --max-walk-nodes" % (stats[4].value, stats[5].value, stats[6].value))
+    print_walk_progress(b)
+
+
+class LenList(ctypes.Structure):
+    # Must match struct len_list_t.
+    _fields_ = [
+        ("cursor", ctypes.c_uint64),
+        ("next_walk_ns", ctypes.c_uint64),
+        ("expected", ctypes.c_int),
+        ("count", ctypes.c_int),
+        ("walk_expected", ctypes.c_int),
+        ("deletes", ctypes.c_uint32),
+        ("active", ctypes.c_uint32),
+        ("known", ctypes.c_uint32),
+        ("slack", ctypes.c_uint32),
+    ]
+
+
+def walk_progress(b):
+    """[(pid, head address, nodes counted, expected at the start)] of the walks in progress."""
+    walks = []
+    for key, l in b["len_lists"].items():
+        if l.active:
+            # Key layout of struct pid_addr_t; BCC and libbpf give different key types.
+            pid, _, head = struct.unpack("<IIQ", bytes(key))
+            walks.append((pid, head, l.count, l.walk_expected))
+    return sorted(walks)
+
+
+def print_walk_progress(b):
+    for pid, head, count, expected in walk_progress(b):
+        print("  pid %d list 0x%x: walk in progress, %d nodes counted, %d expected" % (pid, head, count, expected))
+
+
+class WalkProgressReporter:
+    """on_tick callback printing the walks in progress every `interval` seconds."""
+
+    def __init__(self, b, interval):
+        self.b = b
+        self.interval = interval
+        self.next_report = None
+
+    def __call__(self, now):
+        if self.next_report is None:
+            self.next_report = now + self.interval
+        elif now >= self.next_report:
+            print("Length walks in progress:")
+            print_walk_progress(self.b)
+            self.next_report = now + self.interval
@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+Loads a precompiled BPF object (see bpf_precompile.py) through libbpf.
+
+LibbpfObject offers the small part of the BCC BPF interface the monitors
+use: b["map"] tables with item access, len() and open_ring_buffer(),
+attach_uprobe()/attach_uretprobe() and ring_buffer_consume(). That lets
+ViolationConsumer, ProbeStats and the sampling helpers work unchanged on
+either loader. Nothing is compiled at startup.
+
+Map values are returned as ctypes objects. Maps whose value is not a plain
+4 or 8 byte integer need a ctypes type in `value_types`.
+"""
+import ctypes
+import ctypes.util
+import errno
+import os
+
+BPF_MAP_TYPE_PERCPU_HASH = 5
+BPF_MAP_TYPE_PERCPU_ARRAY = 6
+BPF_MAP_TYPE_LRU_PERCPU_HASH = 10
+BPF_MAP_TYPE_RINGBUF = 27
+PERCPU_MAP_TYPES = (BPF_MAP_TYPE_PERCPU_HASH, BPF_MAP_TYPE_PERCPU_ARRAY, BPF_MAP_TYPE_LRU_PERCPU_HASH)
+
+BPF_ANY = 0
+
+_RING_BUFFER_SAMPLE_FN = ctypes.CFUNCTYPE(ctypes.c_int, ctypes.c_void_p, ctypes.c_void_p, ctypes.c_size_t)
+
+
+class _UprobeOpts(ctypes.Structure):
+    # struct bpf_uprobe_opts up to func_name (libbpf >= 0.8); libbpf reads
+    # only the first `sz` bytes.
+    _fields_ = [
+        ("sz", ctypes.c_size_t),
+        ("ref_ctr_offset", ctypes.c_size_t),
+        ("bpf_cookie", ctypes.c_uint64),
+        ("retprobe", ctypes.c_bool),
+        ("func_name", ctypes.c_char_p),
+    ]
+
+
+def _load_libbpf():
+    path = ctypes.util.find_library("bpf") or "libbpf.so.1"
+    lib = ctypes.CDLL(path, use_errno=True)
+    vp, cp, i, u32 = ctypes.c_void_p, ctypes.c_char_p, ctypes.c_int, ctypes.c_uint32
+    signatures = {
+        "bpf_object__open_file": (vp, [cp, vp]),
+        "bpf_object__load": (i, [vp]),
+        "bpf_object__close": (None, [vp]),
+        "bpf_object__find_map_by_name": (vp, [vp, cp]),
+        "bpf_object__find_program_by_name": (vp, [vp, cp]),
+        "bpf_map__fd": (i, [vp]),
+        "bpf_map__key_size": (u32, [vp]),
+        "bpf_map__value_size": (u32, [vp]),
+        "bpf_map__type": (i, [vp]),
+        "bpf_map__max_entries": (u32, [vp]),
+        "bpf_map_lookup_elem": (i, [i, vp, vp]),
+        "bpf_map_update_elem": (i, [i, vp, vp, ctypes.c_uint64]),
+        "bpf_map_delete_elem": (i, [i, vp]),
+        "bpf_map_get_next_key": (i, [i, vp, vp]),
+        "bpf_map_lookup_batch": (i, [i, vp, vp, vp, vp, ctypes.POINTER(u32), vp]),
+        "bpf_program__attach_uprobe_opts": (vp, [vp, i, cp, ctypes.c_size_t, ctypes.POINTER(_UprobeOpts)]),
+        "bpf_link__destroy": (i, [vp]),
+        "ring_buffer__new": (vp, [i, _RING_BUFFER_SAMPLE_FN, vp, vp]),
+        "ring_buffer__add": (i, [vp, i, _RING_BUFFER_SAMPLE_FN, vp]),
+        "ring_buffer__consume": (i, [vp]),
+        "ring_buffer__free": (None, [vp]),
+        "libbpf_get_error": (ctypes.c_long, [vp]),
+        "libbpf_num_possible_cpus": (i, []),
+    }
+    for name, (restype, argtypes) in signatures.items():
+        fn = getattr(lib, name)
+        fn.restype = restype
+        fn.argtypes = argtypes
+    return lib
+
+
+_lib = None
+
+
+def libbpf():
+    global _lib
+    if _lib is None:
+        _lib = _load_libbpf()
+    return _lib
+
+
+def _check_ptr(ptr, what):
+    err = libbpf().libbpf_get_error(ptr)
+    if err or not ptr:
+        err = -err if err else ctypes.get_errno()
+        raise OSError(err, "%s: %s" % (what, os.strerror(err)))
+    return ptr
+
+
+def _check_ret(ret, what):
+    if ret < 0:
+        raise OSError(-ret, "%s: %s" % (what, os.strerror(-ret)))
+    return ret
+
+
+def _int_type(size):
+    return {4: ctypes.c_uint32, 8: ctypes.c_uint64}.get(size, ctypes.c_ubyte * size)
+
+
+class Table:
+    """Item access to one map, shaped like the BCC table classes."""
+
+    def __init__(self, owner, name, map_ptr, value_type=None):
+        lib = libbpf()
+        self.owner = owner
+        self.name = name
+        self.fd = lib.bpf_map__fd(map_ptr)
+        self.map_type = lib.bpf_map__type(map_ptr)
+        self.max_entries = lib.bpf_map__max_entries(map_ptr)
+        self.Key = _int_type(lib.bpf_map__key_size(map_ptr))
+        self.Leaf = value_type or _int_type(lib.bpf_map__value_size(map_ptr))
+        self.percpu = self.map_type in PERCPU_MAP_TYPES
+        if self.percpu:
+            # The kernel copies one 8-byte aligned value per possible CPU.
+            self.ncpus = _check_ret(lib.libbpf_num_possible_cpus(), "libbpf_num_possible_cpus")
+            self.stride = (ctypes.sizeof(self.Leaf) + 7) & ~7
+
+    def _key(self, key):
+        return key if isinstance(key, (ctypes._SimpleCData, ctypes.Structure, ctypes.Array)) else self.Key(key)
+
+    def __getitem__(self, key):
+        key = self._key(key)
+        if self.percpu:
+            buf = (ctypes.c_ubyte * (self.stride * self.ncpus))()
+        else:
+            buf = self.Leaf()
+        if libbpf().bpf_map_lookup_elem(self.fd, ctypes.byref(key), ctypes.byref(buf)) != 0:
+            raise KeyError(key)
+        return self._value(buf)
+
+    def _value(self, buf, offset=0):
+        if not self.percpu:
+            return self.Leaf.from_buffer_copy(buf, offset)
+        values = [self.Leaf.from_buffer_copy(buf, offset + cpu * self.stride) for cpu in range(self.ncpus)]
+        if issubclass(self.Leaf, ctypes._SimpleCData):
+            return [v.value for v in values]
+        return values
+
+    def items_lookup_batch(self):
+        """All (key, value) pairs in one BPF_MAP_LOOKUP_BATCH call, as BCC's method of that name."""
+        n = self.max_entries
+        value_size = self.stride * self.ncpus if self.percpu else ctypes.sizeof(self.Leaf)
+        keys = (self.Key * n)()
+        values = (ctypes.c_ubyte * (value_size * n))()
+        out_batch = self.Key()
+        count = ctypes.c_uint32(n)
+        ret = libbpf().bpf_map_lookup_batch(self.fd, None, ctypes.byref(out_batch), keys, values,
+                                            ctypes.byref(count), None)
+        # ENOENT means the whole map fitted in this batch.
+        if ret < 0 and ctypes.get_errno() != errno.ENOENT and -ret != errno.ENOENT:
+            _check_ret(ret, "batch lookup %s" % self.name)
+        return [(keys[i], self._value(values, i * value_size)) for i in range(count.value)]
+
+    def __setitem__(self, key, leaf):
+        key = self._key(key)
+        _check_ret(libbpf().bpf_map_update_elem(self.fd, ctypes.byref(key), ctypes.byref(leaf), BPF_ANY),
+                   "update %s" % self.name)
+
+    def __delitem__(self, key):
+        key = self._key(key)
+        if libbpf().bpf_map_delete_elem(self.fd, ctypes.byref(key)) != 0:
+            raise KeyError(key)
+
+    def keys(self):
+        lib = libbpf()
+        keys = []
+        prev = None
+        while True:
+            key = self.Key()
+            if lib.bpf_map_get_next_key(self.fd, ctypes.byref(prev) if prev is not None else None,
+                                        ctypes.byref(key)) != 0:
+                return keys
+            keys.append(key)
+            prev = key
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.keys())
+
+    def items(self):
+        return [(k, self[k]) for k in self.keys()]
+
+    def open_ring_buffer(self, callback, ctx=None):
+        if self.map_type != BPF_MAP_TYPE_RINGBUF:
+            raise ValueError("%s is not a ring buffer map" % self.name)
+        self.owner._add_ring_buffer(self.fd, callback)
+
+
+class LibbpfObject:
+    """A loaded BPF object file, used in place of bcc.BPF."""
+
+    def __init__(self, path, value_types=None, load=True):
+        self.path = path
+        self.value_types = value_types or {}
+        self.obj = _check_ptr(libbpf().bpf_object__open_file(path.encode(), None), "open %s" % path)
+        self.links = []
+        self.tables = {}
+        self._rb = None
+        self._rb_callbacks = []
+        if load:
+            self.load()
+
+    def load(self):
+        """Run the verifier and create the maps."""
+        _check_ret(libbpf().bpf_object__load(self.obj), "load %s" % self.path)
+
+    def __getitem__(self, name):
+        if name not in self.tables:
+            map_ptr = libbpf().bpf_object__find_map_by_name(self.obj, name.encode())
+            if not map_ptr:
+                raise KeyError(name)
+            self.tables[name] = Table(self, name, map_ptr, self.value_types.get(name))
+        return self.tables[name]
+
+    def attach_uprobe(self, name, sym="", fn_name="", addr=None, pid=-1, retprobe=False):
+        """Attach by symbol name, or by symbol address (st_value) as BCC does."""
+        prog = libbpf().bpf_object__find_program_by_name(self.obj, fn_name.encode())
+        if not prog:
+            raise KeyError(fn_name)
+        offset = 0
+        opts = _UprobeOpts(sz=ctypes.sizeof(_UprobeOpts), retprobe=retprobe)
+        if addr is not None:
+            from symbol_cache import file_offset
+            offset = file_offset(name, addr)
+            sym = "0x%x" % addr
+        else:
+            opts.func_name = sym.encode()
+        link = libbpf().bpf_program__attach_uprobe_opts(prog, pid, os.path.abspath(name).encode(), offset,
+                                                         ctypes.byref(opts))
+        self.links.append(_check_ptr(link, "attach %s to %s:%s" % (fn_name, name, sym)))
+
+    def attach_uretprobe(self, name, sym="", fn_name="", addr=None, pid=-1):
+        self.attach_uprobe(name, sym, fn_name, addr, pid, retprobe=True)
+
+    def _add_ring_buffer(self, fd, callback):
+        lib = libbpf()
+        # libbpf calls back with (ctx, data, size), the same as BCC.
+        fn = _RING_BUFFER_SAMPLE_FN(lambda ctx, data, size: callback(ctx, data, size) or 0)
+        self._rb_callbacks.append(fn)
+        if self._rb is None:
+            self._rb = _check_ptr(lib.ring_buffer__new(fd, fn, None, None), "ring_buffer__new")
+        else:
+            _check_ret(lib.ring_buffer__add(self._rb, fd, fn, None), "ring_buffer__add")
+
+    def ring_buffer_consume(self):
+        if self._rb is not None:
+            libbpf().ring_buffer__consume(self._rb)
+
+    def cleanup(self):
+        lib = libbpf()
+        for link in self.links:
+            lib.bpf_link__destroy(link)
+        self.links = []
+        if self._rb is not None:
+            lib.ring_buffer__free(self._rb)
+            self._rb = None
+        if self.obj:
+            lib.bpf_object__close(self.obj)
+            self.obj = None
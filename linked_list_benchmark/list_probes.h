@@ -0,0 +1,77 @@
+#ifndef LIST_PROBES_H
+#define LIST_PROBES_H
+
+/*
+ * Static probe points for the list libraries.
+ *
+ * Built with -DLIST_USDT (make USDT=1) these are USDT probes in the
+ * "linkedlist" provider. Each one is guarded by its semaphore, which a
+ * tracer increments when it attaches, so an untraced run only pays a
+ * predicted-not-taken branch. Each library defines the semaphores once
+ * with LIST_PROBES_DEFINE_SEMAPHORES.
+ *
+ * Without LIST_USDT the probes compile to nothing and LIST_DELETE_HOOK
+ * calls deletion_instrumentation(), the function uprobe monitors attach to.
+ *
+ * Probes and arguments:
+ *   insert_done    (head, node, value)              after *head = node
+ *   delete_unlink  (head, pred, target, succ, value) after the unlink,
+ *                                                   pred == NULL at the head
+ *   delete_miss    (head, value)                    value not found
+ *   search_hit     (first, value, node)             first is the head node,
+ *   search_miss    (first, value)                   not the head pointer
+ *
+ * Other probes take head as the Node** passed to insert/delete.
+ */
+
+#ifdef LIST_USDT
+#define _SDT_HAS_SEMAPHORES 1
+#include <sys/sdt.h>
+
+#define LIST_PROBE_SEMAPHORE(name) \
+    unsigned short linkedlist_##name##_semaphore __attribute__((unused)) __attribute__((section(".probes")))
+
+#define LIST_PROBES_DEFINE_SEMAPHORES        \
+    LIST_PROBE_SEMAPHORE(insert_done);       \
+    LIST_PROBE_SEMAPHORE(delete_unlink);     \
+    LIST_PROBE_SEMAPHORE(delete_miss);       \
+    LIST_PROBE_SEMAPHORE(search_hit);        \
+    LIST_PROBE_SEMAPHORE(search_miss)
+
+extern unsigned short linkedlist_insert_done_semaphore;
+extern unsigned short linkedlist_delete_unlink_semaphore;
+extern unsigned short linkedlist_delete_miss_semaphore;
+extern unsigned short linkedlist_search_hit_semaphore;
+extern unsigned short linkedlist_search_miss_semaphore;
+
+/* The tracer writes the semaphore from outside, so always reload it. */
+#define LIST_PROBE_ENABLED(name) \
+    __builtin_expect(*(volatile unsigned short *)&linkedlist_##name##_semaphore, 0)
+
+#define LIST_PROBE_INSERT_DONE(head, node, value) \
+    do { if (LIST_PROBE_ENABLED(insert_done)) STAP_PROBE3(linkedlist, insert_done, head, node, value); } while (0)
+#define LIST_PROBE_DELETE_UNLINK(head, pred, target, succ, value) \
+    do { if (LIST_PROBE_ENABLED(delete_unlink)) STAP_PROBE5(linkedlist, delete_unlink, head, pred, target, succ, value); } while (0)
+#define LIST_PROBE_DELETE_MISS(head, value) \
+    do { if (LIST_PROBE_ENABLED(delete_miss)) STAP_PROBE2(linkedlist, delete_miss, head, value); } while (0)
+#define LIST_PROBE_SEARCH_HIT(head, value, node) \
+    do { if (LIST_PROBE_ENABLED(search_hit)) STAP_PROBE3(linkedlist, search_hit, head, value, node); } while (0)
+#define LIST_PROBE_SEARCH_MISS(head, value) \
+    do { if (LIST_PROBE_ENABLED(search_miss)) STAP_PROBE2(linkedlist, search_miss, head, value); } while (0)
+
+#define LIST_DELETE_HOOK(pred, target, succ) do { } while (0)
+
+#else
+
+#define LIST_PROBES_DEFINE_SEMAPHORES
+#define LIST_PROBE_INSERT_DONE(head, node, value) do { } while (0)
+#define LIST_PROBE_DELETE_UNLINK(head, pred, target, succ, value) do { } while (0)
+#define LIST_PROBE_DELETE_MISS(head, value) do { } while (0)
+#define LIST_PROBE_SEARCH_HIT(head, value, node) do { } while (0)
+#define LIST_PROBE_SEARCH_MISS(head, value) do { } while (0)
+
+#define LIST_DELETE_HOOK(pred, target, succ) deletion_instrumentation(pred, target, succ)
+
+#endif
+
+#endif
@@ -0,0 +1,179 @@
+#ifndef LIST_STATS_H
+#define LIST_STATS_H
+
+/*
+ * Always-on operation counters in a shared-memory page.
+ *
+ * Built with -DLIST_STATS (make STATS=1) each library maps a file at
+ * startup ($LIST_STATS_FILE, or /dev/shm/list_stats.<pid>) and every thread
+ * counts its operations in its own cache line of that file. Counters are
+ * single-writer plain stores, so the hot path has no atomics, no shared
+ * cache line and no trap; list_stats.py reads the file from another
+ * process at any rate. The file is left behind at exit for a final read.
+ *
+ * A forked child maps a file of its own (list_stats.<child pid>, or
+ * $LIST_STATS_FILE.<child pid>) and its threads claim lines there, so
+ * the parent's lines keep a single writer.
+ *
+ * The pool's free-list length is not counted directly (that would put
+ * every operation on one shared line): it is pool_nodes, kept in the page
+ * header, minus inserts plus successful deletes summed over the threads.
+ *
+ * Without LIST_STATS every macro compiles to nothing.
+ *
+ * Layout (must match list_stats.py):
+ *   page header  one cache line: magic, version, max_threads, threads,
+ *                pid, chunks, pool_nodes
+ *   threads[]    one cache line each: tid, inserts, deletes,
+ *                delete_misses, searches, search_misses, nodes_traversed
+ */
+
+#ifdef LIST_STATS
+#include <fcntl.h>
+#include <pthread.h>
+#include <stdint.h>
+#include <stdio.h>
+#include <stdlib.h>
+#include <sys/mman.h>
+#include <sys/syscall.h>
+#include <unistd.h>
+
+#define LIST_STATS_MAGIC 0x313053544154534cULL /* "LSTATS01" */
+#define LIST_STATS_VERSION 1
+#define LIST_STATS_MAX_THREADS 64
+#define LIST_STATS_LINE 64
+
+struct list_stats_thread {
+    uint64_t tid;
+    uint64_t inserts;
+    uint64_t deletes;
+    uint64_t delete_misses;
+    uint64_t searches;
+    uint64_t search_misses;
+    uint64_t nodes_traversed;
+    uint64_t reserved;
+} __attribute__((aligned(LIST_STATS_LINE)));
+
+struct list_stats_page {
+    uint64_t magic;
+    uint32_t version;
+    uint32_t max_threads;
+    uint32_t threads;
+    uint32_t pid;
+    uint64_t chunks;
+    uint64_t pool_nodes;
+    struct list_stats_thread thread[LIST_STATS_MAX_THREADS] __attribute__((aligned(LIST_STATS_LINE)));
+};
+
+static struct list_stats_page *list_stats_page;
+/* Threads beyond LIST_STATS_MAX_THREADS, or all of them if the file could
+ * not be mapped, count here and are not exported. */
+static struct list_stats_thread list_stats_overflow;
+static __thread struct list_stats_thread *list_stats_self;
+
+/* Map a fresh page for this process; chunks and pool_nodes seed the header. */
+static void list_stats_map(int child, uint64_t chunks, uint64_t pool_nodes) {
+    char path[256];
+    const char *env = getenv("LIST_STATS_FILE");
+    if (env && child)
+        snprintf(path, sizeof(path), "%s.%d", env, (int)getpid());
+    else if (env)
+        snprintf(path, sizeof(path), "%s", env);
+    else
+        snprintf(path, sizeof(path), "/dev/shm/list_stats.%d", (int)getpid());
+    int fd = open(path, O_RDWR | O_CREAT | O_TRUNC, 0644);
+    if (fd < 0)
+        return;
+    if (ftruncate(fd, sizeof(struct list_stats_page)) == 0) {
+        void *p = mmap(NULL, sizeof(struct list_stats_page), PROT_READ | PROT_WRITE, MAP_SHARED, fd, 0);
+        if (p != MAP_FAILED) {
+            list_stats_page = p;
+            list_stats_page->version = LIST_STATS_VERSION;
+            list_stats_page->max_threads = LIST_STATS_MAX_THREADS;
+            list_stats_page->pid = getpid();
+            list_stats_page->chunks = chunks;
+            list_stats_page->pool_nodes = pool_nodes;
+            /* The magic goes last so a reader never sees a half-made header. */
+            __atomic_store_n(&list_stats_page->magic, LIST_STATS_MAGIC, __ATOMIC_RELEASE);
+        }
+    }
+    close(fd);
+}
+
+/* The child inherits the parent's pool, so its page starts with the
+ * parent's chunks and, as pool_nodes, the nodes that were free at the fork.
+ * Every thread slot, including the forking thread's, is claimed again. */
+static void list_stats_after_fork(void) {
+    struct list_stats_page *parent = list_stats_page;
+    uint64_t chunks = 0, free_nodes = 0;
+    if (parent) {
+        chunks = parent->chunks;
+        free_nodes = parent->pool_nodes;
+        uint32_t threads = parent->threads;
+        for (uint32_t i = 0; i < threads && i < LIST_STATS_MAX_THREADS; i++)
+            free_nodes += parent->thread[i].deletes - parent->thread[i].inserts;
+        munmap(parent, sizeof(struct list_stats_page));
+    }
+    list_stats_page = NULL;
+    list_stats_self = NULL;
+    list_stats_map(1, chunks, free_nodes);
+}
+
+__attribute__((constructor))
+static void list_stats_open(void) {
+    list_stats_map(0, 0, 0);
+    pthread_atfork(NULL, NULL, list_stats_after_fork);
+}
+
+static struct list_stats_thread *list_stats_claim(void) {
+    list_stats_self = &list_stats_overflow;
+    if (list_stats_page) {
+        uint32_t idx = __atomic_fetch_add(&list_stats_page->threads, 1, __ATOMIC_RELAXED);
+        if (idx < LIST_STATS_MAX_THREADS) {
+            list_stats_self = &list_stats_page->thread[idx];
+            list_stats_self->tid = syscall(SYS_gettid);
+        }
+    }
+    return list_stats_self;
+}
+
+static inline struct list_stats_thread *list_stats_thread(void) {
+    struct list_stats_thread *s = list_stats_self;
+    return __builtin_expect(s != NULL, 1) ? s : list_stats_claim();
+}
+
+/* Single writer per line: a relaxed store is enough for readers to see
+ * whole values, and needs no lock prefix. */
+#define LIST_STATS_ADD(field, n) do {                                                   \
+        struct list_stats_thread *_s = list_stats_thread();                             \
+        __atomic_store_n(&_s->field, _s->field + (n), __ATOMIC_RELAXED);                \
+    } while (0)
+
+#define LIST_STATS_INSERT() LIST_STATS_ADD(inserts, 1)
+#define LIST_STATS_DELETE(found, steps) do {                                            \
+        if (found) LIST_STATS_ADD(deletes, 1); else LIST_STATS_ADD(delete_misses, 1);   \
+        LIST_STATS_ADD(nodes_traversed, steps);                                         \
+    } while (0)
+#define LIST_STATS_SEARCH(found, steps) do {                                            \
+        LIST_STATS_ADD(searches, 1);                                                    \
+        if (!(found)) LIST_STATS_ADD(search_misses, 1);                                 \
+        LIST_STATS_ADD(nodes_traversed, steps);                                         \
+    } while (0)
+/* Chunks are allocated rarely, so these go to the shared header line. */
+#define LIST_STATS_CHUNK(nodes) do {                                                    \
+        if (list_stats_page) {                                                          \
+            __atomic_fetch_add(&list_stats_page->chunks, 1, __ATOMIC_RELAXED);          \
+            __atomic_fetch_add(&list_stats_page->pool_nodes, (nodes), __ATOMIC_RELAXED);\
+        }                                                                               \
+    } while (0)
+
+#else
+
+#define LIST_STATS_INSERT() do { } while (0)
+#define LIST_STATS_DELETE(found, steps) do { (void)(steps); } while (0)
+#define LIST_STATS_SEARCH(found, steps) do { (void)(steps); } while (0)
+#define LIST_STATS_CHUNK(nodes) do { } while (0)
+
+#endif
+
+#endif
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Reads the shared-memory statistics page of a list library built with
+make STATS=1 (see list_stats.h).
+
+The page is mapped read-only and sampled every --interval seconds; nothing
+in the target process is trapped or stopped, so the rate can be as high as
+the reader likes. Each sample prints per-thread operation rates, nodes
+traversed per operation, and the pool's chunk count and free-list length.
+
+A forked child writes its own file, so the benchmark binaries, which run
+the workload in a child forked after the prefill, are read by the child's
+pid.
+
+Example:
+    ./main_optimised & sleep 0.5; ./list_stats.py --pid $(pgrep -P $!) --interval 0.5
+"""
+import argparse
+import csv
+import ctypes
+import mmap
+import os
+import sys
+import time
+
+MAGIC = 0x313053544154534c  # "LSTATS01"
+VERSION = 1
+COUNTERS = ["inserts", "deletes", "delete_misses", "searches", "search_misses", "nodes_traversed"]
+
+
+class ThreadStats(ctypes.Structure):
+    # Must match struct list_stats_thread: one 64-byte line per thread.
+    _fields_ = [("tid", ctypes.c_uint64)] + [(name, ctypes.c_uint64) for name in COUNTERS] + \
+               [("reserved", ctypes.c_uint64)]
+
+
+class PageHeader(ctypes.Structure):
+    # Must match the start of struct list_stats_page.
+    _fields_ = [
+        ("magic", ctypes.c_uint64),
+        ("version", ctypes.c_uint32),
+        ("max_threads", ctypes.c_uint32),
+        ("threads", ctypes.c_uint32),
+        ("pid", ctypes.c_uint32),
+        ("chunks", ctypes.c_uint64),
+        ("pool_nodes", ctypes.c_uint64),
+    ]
+
+
+HEADER_SIZE = 64
+FIELDNAMES = ["time_s", "tid"] + COUNTERS + ["ops_per_s", "nodes_per_op", "chunks", "free_nodes"]
+
+
+class StatsPage:
+    """A read-only view of one process's statistics file."""
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        header = self.header()
+        if header.magic != MAGIC:
+            raise SystemExit("%s is not a list statistics page (or is still being set up)" % path)
+        if header.version != VERSION:
+            raise SystemExit("%s has page version %d, this reader knows %d" % (path, header.version, VERSION))
+        self.max_threads = header.max_threads
+
+    def header(self):
+        return PageHeader.from_buffer_copy(self.map, 0)
+
+    def sample(self):
+        """(header, [ThreadStats]) copied from the page now."""
+        header = self.header()
+        threads = [ThreadStats.from_buffer_copy(self.map, HEADER_SIZE + i * ctypes.sizeof(ThreadStats))
+                   for i in range(min(header.threads, self.max_threads))]
+        return header, threads
+
+    def close(self):
+        self.map.close()
+
+
+def free_nodes(header, threads):
+    """Free-list length: nodes in chunks minus nodes handed out and not returned."""
+    taken = sum(t.inserts - t.deletes for t in threads)
+    return header.pool_nodes - taken
+
+
+def rows_between(prev, cur, elapsed, now):
+    header, threads = cur
+    before = {t.tid: t for t in prev[1]} if prev else {}
+    free = free_nodes(header, threads)
+    rows = []
+    for t in threads:
+        p = before.get(t.tid)
+        delta = {name: getattr(t, name) - (getattr(p, name) if p else 0) for name in COUNTERS}
+        ops = delta["inserts"] + delta["deletes"] + delta["delete_misses"] + delta["searches"]
+        row = {"time_s": round(now, 3), "tid": t.tid}
+        row.update(delta)
+        row.update({
+            "ops_per_s": ops / elapsed if elapsed > 0 else 0.0,
+            "nodes_per_op": delta["nodes_traversed"] / ops if ops else 0.0,
+            "chunks": header.chunks,
+            "free_nodes": free,
+        })
+        rows.append(row)
+    return rows
+
+
+def print_rows(rows):
+    print("%-8s %8s %12s %12s %10s %14s %10s %9s %10s" % (
+        "time s", "tid", "ops/s", "inserts", "deletes", "searches", "nodes/op", "chunks", "free"))
+    for r in rows:
+        print("%-8.1f %8d %12.0f %12d %10d %14d %10.1f %9d %10d" % (
+            r["time_s"], r["tid"], r["ops_per_s"], r["inserts"], r["deletes"], r["searches"],
+            r["nodes_per_op"], r["chunks"], r["free_nodes"]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sample the shared-memory statistics of a list library")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--pid", type=int, help="Read /dev/shm/list_stats.<pid>")
+    target.add_argument("--file", help="Read this statistics file ($LIST_STATS_FILE of the target)")
+    parser.add_argument("--interval", type=float, default=1.0, help="Seconds between samples (default: %(default)s)")
+    parser.add_argument("--duration", type=float, default=0,
+                        help="Stop after N seconds (0 = until Ctrl+C or the process exits)")
+    parser.add_argument("--csv", help="Also write every sample's per-thread rows to this CSV file")
+    parser.add_argument("--quiet", action="store_true", help="Only write --csv, print nothing per sample")
+    args = parser.parse_args()
+
+    path = args.file or "/dev/shm/list_stats.%d" % args.pid
+    page = StatsPage(path)
+    pid = page.header().pid
+
+    out = writer = None
+    if args.csv:
+        out = open(args.csv, "w", newline="")
+        writer = csv.DictWriter(out, fieldnames=FIELDNAMES)
+        writer.writeheader()
+
+    start = last_time = time.perf_counter()
+    last = None
+    deadline = start + args.duration if args.duration else None
+    try:
+        while deadline is None or time.perf_counter() < deadline:
+            time.sleep(args.interval)
+            now = time.perf_counter()
+            cur = page.sample()
+            rows = rows_between(last, cur, now - last_time, now - start)
+            last, last_time = cur, now
+            if writer is not None:
+                writer.writerows(rows)
+            if not args.quiet:
+                print_rows(rows)
+            if not os.path.exists("/proc/%d" % pid):
+                print("Process %d has exited" % pid, file=sys.stderr)
+                break
+    except KeyboardInterrupt:
+        pass
+
+    header, threads = page.sample()
+    print("Totals: %d threads, %d chunks, %d free nodes" % (len(threads), header.chunks, free_nodes(header, threads)))
+    for name in COUNTERS:
+        print("  %-16s %d" % (name, sum(getattr(t, name) for t in threads)))
+    if header.threads > page.max_threads:
+        print("  (%d threads beyond the page's %d slots were not counted)" % (
+            header.threads - page.max_threads, page.max_threads))
+    page.close()
+    if out is not None:
+        out.close()
+        print("Samples have been written to '%s'" % args.csv)
+
+
+if __name__ == "__main__":
+    main()
@@ -5,36 +5,77 @@
 #include <sys/wait.h>
 #include "list_interface.h"
 #include "workload.h"
+#include "timing.h"
+#include "perf_counters.h"
 
-int random_range(int min, int max) {
-    return rand() % (max - min + 1) + min;
-}
+int main(int argc, char** argv) {
+    WorkloadConfig cfg;
+    workload_default_config(&cfg);
+    if (workload_parse_args(&cfg, argc, argv) != 0)
+        exit(EXIT_FAILURE);
+    timer_init();
+    workload_print_config(&cfg);
 
-int main() {
-    int num_initial = 300;  // Pre-fill with 300 random values.
-    int duration = 10;     // Duration for the workload in seconds.
-    int insert_percent = 40, search_percent = 40, delete_percent = 20;
+    TraceReader replay;
+    TraceWriter record;
+    if (cfg.replay_path) {
+        if (trace_open(&replay, cfg.replay_path) != 0)
+            exit(EXIT_FAILURE);
+        printf("Trace: prefill %llu, ops %llu\n", (unsigned long long)replay.prefill,
+               (unsigned long long)replay.ops);
+    }
+    if (cfg.record_path && trace_writer_open(&record, cfg.record_path) != 0)
+        exit(EXIT_FAILURE);
 
-    srand(time(NULL));
+    KeyGen keys;
+    keygen_init(&keys, cfg.dist, cfg.key_min, cfg.key_max, cfg.seed,
+                cfg.zipf_theta, cfg.hot_fraction, cfg.hot_probability);
+    srand((unsigned)cfg.seed);
     Node* head = NULL;
 
-    // Pre-populate the list with random values.
-    for (int i = 0; i < num_initial; i++) {
-        int random_value = random_range(1, 10000);
+    PerfGroup counters;
+    PerfSample prefill_counters = { 0 }, before, after;
+    int use_counters = cfg.counters && perf_group_open(&counters) == 0;
+    if (use_counters)
+        perf_group_read(&counters, &before);
+
+    // Pre-populate the list with uniformly random values from the key range,
+    // or with the trace's prefill keys.
+    int prefill = cfg.replay_path ? (int)replay.prefill : cfg.prefill;
+    for (int i = 0; i < prefill; i++) {
+        int random_value = cfg.replay_path ? replay.records[i].key
+                                           : keygen_uniform(&keys, cfg.key_min, cfg.key_max);
         list_insert(&head, random_value);
+        if (cfg.record_path)
+            trace_write_prefill(&record, random_value);
     }
-    
+    if (use_counters) {
+        perf_group_read(&counters, &after);
+        perf_sample_add_delta(&prefill_counters, &before, &after);
+        perf_sample_print("prefill", &counters, &prefill_counters);
+        // The child counts its own phases with a fresh group.
+        perf_group_close(&counters);
+    }
+    fflush(stdout);
+
+    // Flush before forking so the recorded prefill is written only once.
+    if (cfg.record_path)
+        fflush(record.f);
+
     // Fork the process after pre-population.
     pid_t pid = fork();
     if (pid < 0) {
         perror("fork");
         exit(EXIT_FAILURE);
     }
-    
+
     if (pid == 0) {
         // Child process: execute the workload.
-        run_workload(&head, insert_percent, search_percent, delete_percent, duration);
-        
+        run_workload(&head, &cfg, &keys, cfg.replay_path ? &replay : NULL,
+                     cfg.record_path ? &record : NULL);
+        if (cfg.record_path && trace_writer_close(&record) != 0)
+            exit(EXIT_FAILURE);
+
         // Clean up the list in the child.
         list_free_all(&head);
         exit(EXIT_SUCCESS);
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+In-kernel latency histograms for the list operations.
+
+Attaches an entry and a return probe to <prefix>_insert, _search and _delete
+of any of the builds and keeps a log2 nanosecond histogram per (pid,
+operation) in a per-CPU hash, the same layout probe_stats uses for probe
+self-cost. Every --interval seconds the histograms are merged in Python and
+the percentiles of that interval are printed, so the workload loop needs no
+clock_gettime() calls of its own.
+
+The measured time runs from the entry probe to the return probe and so
+includes part of the uretprobe trampoline; compare builds with each other
+rather than with the workload's own timings.
+
+Example:
+    sudo ./op_latency.py ./main_optimised --interval 1 --csv latency.csv
+"""
+from bcc import BPF
+import argparse
+import csv
+import time
+
+from probe_stats import HIST_SLOTS, percentile
+
+OPS = ["insert", "search", "delete"]
+# Symbol prefix of each build's list functions.
+PREFIXES = {
+    "main_baseline": "baseline",
+    "main_optimised": "optimised",
+    "main_verif_optimised": "verif_optimised",
+}
+
+BPF_TEXT = r"""
+#include <uapi/linux/ptrace.h>
+
+#define FILTER_PID %(pid)d
+#define LAT_HIST_SLOTS %(slots)d
+
+struct lat_key_t {
+    u32 pid;
+    u32 op;
+};
+
+struct lat_hist_t {
+    u64 count;
+    u64 total_ns;
+    u64 max_ns;
+    u64 slots[LAT_HIST_SLOTS];
+};
+
+BPF_HASH(lat_start, u32, u64, 10240);
+BPF_PERCPU_HASH(op_latency, struct lat_key_t, struct lat_hist_t, %(max_keys)d);
+
+static inline int lat_enter(void) {
+    u64 id = bpf_get_current_pid_tgid();
+    if (FILTER_PID && (id >> 32) != FILTER_PID)
+        return 0;
+    u32 tid = id;
+    u64 ts = bpf_ktime_get_ns();
+    lat_start.update(&tid, &ts);
+    return 0;
+}
+
+// Slot s holds latencies in [2^(s-1), 2^s) ns, as in probe_stats.
+static inline int lat_exit(u32 op) {
+    u64 id = bpf_get_current_pid_tgid();
+    u32 tid = id;
+    u64 *start = lat_start.lookup(&tid);
+    if (!start)
+        return 0;
+    u64 delta = bpf_ktime_get_ns() - *start;
+    lat_start.delete(&tid);
+
+    struct lat_key_t key = {};
+    key.pid = id >> 32;
+    key.op = op;
+    struct lat_hist_t *h = op_latency.lookup(&key);
+    if (!h) {
+        struct lat_hist_t zero = {};
+        op_latency.update(&key, &zero);
+        h = op_latency.lookup(&key);
+        if (!h)
+            return 0;
+    }
+    u32 slot = bpf_log2l(delta);
+    if (slot >= LAT_HIST_SLOTS)
+        slot = LAT_HIST_SLOTS - 1;
+    h->count++;
+    h->total_ns += delta;
+    if (delta > h->max_ns)
+        h->max_ns = delta;
+    h->slots[slot]++;
+    return 0;
+}
+"""
+
+OP_PROBES = r"""
+int on_%(op)s_entry(struct pt_regs *ctx) { return lat_enter(); }
+int on_%(op)s_return(struct pt_regs *ctx) { return lat_exit(%(idx)d); }
+"""
+
+FIELDNAMES = ["time_s", "pid", "op", "count", "mean_ns", "p50_ns", "p90_ns", "p99_ns", "max_ns"]
+
+
+def build_program(ops, pid=0, max_keys=1024):
+    text = BPF_TEXT % {"pid": pid, "slots": HIST_SLOTS, "max_keys": max_keys}
+    return text + "".join(OP_PROBES % {"op": op, "idx": OPS.index(op)} for op in ops)
+
+
+class LatencyHistograms:
+    """Merges the per-CPU op_latency histograms and reports them per interval."""
+
+    def __init__(self, b):
+        self.table = b["op_latency"]
+        self.last = {}
+
+    def snapshot(self):
+        """{(pid, op): (count, total_ns, max_ns, slots)} summed over CPUs."""
+        merged = {}
+        for key, per_cpu in self.table.items():
+            count = total = max_ns = 0
+            slots = [0] * HIST_SLOTS
+            for h in per_cpu:
+                count += h.count
+                total += h.total_ns
+                max_ns = max(max_ns, h.max_ns)
+                for s in range(HIST_SLOTS):
+                    slots[s] += h.slots[s]
+            merged[(key.pid, OPS[key.op])] = (count, total, max_ns, slots)
+        return merged
+
+    def interval_rows(self, elapsed):
+        """Rows for the operations seen since the previous call."""
+        current = self.snapshot()
+        rows = []
+        for (pid, op), (count, total, max_ns, slots) in sorted(current.items()):
+            prev_count, prev_total, _, prev_slots = self.last.get((pid, op), (0, 0, 0, [0] * HIST_SLOTS))
+            count -= prev_count
+            if count <= 0:
+                continue
+            slots = [n - p for n, p in zip(slots, prev_slots)]
+            # max is only kept since start; the bucket bound can overshoot it.
+            rows.append({
+                "time_s": round(elapsed, 3),
+                "pid": pid,
+                "op": op,
+                "count": count,
+                "mean_ns": (total - prev_total) / count,
+                "p50_ns": min(percentile(slots, count, 50), max_ns),
+                "p90_ns": min(percentile(slots, count, 90), max_ns),
+                "p99_ns": min(percentile(slots, count, 99), max_ns),
+                "max_ns": max_ns,
+            })
+        self.last = current
+        return rows
+
+
+def print_rows(rows):
+    print("%-8s %8s %-7s %10s %10s %10s %10s %10s %10s" % ("time s", "pid", "op", "ops", "mean ns",
+                                                          "p50 ns", "p90 ns", "p99 ns", "max ns"))
+    for r in rows:
+        print("%-8.1f %8d %-7s %10d %10.1f %10d %10d %10d %10d" % (
+            r["time_s"], r["pid"], r["op"], r["count"], r["mean_ns"],
+            r["p50_ns"], r["p90_ns"], r["p99_ns"], r["max_ns"]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-operation latency histograms collected in BPF")
+    parser.add_argument("binary", help="Path to the target binary (e.g., ./main_optimised)")
+    parser.add_argument("--prefix",
+                        help="Symbol prefix of the list functions (default: from the binary name, "
+                             "e.g. optimised for main_optimised)")
+    parser.add_argument("--ops", default=",".join(OPS),
+                        help="Comma-separated operations to time (default: %(default)s)")
+    parser.add_argument("--pid", type=int, default=0, help="Only time this process")
+    parser.add_argument("--interval", type=float, default=1.0,
+                        help="Seconds between reports (default: %(default)s)")
+    parser.add_argument("--duration", type=float, default=0, help="Stop after N seconds (0 = run until Ctrl+C)")
+    parser.add_argument("--csv", help="Also write every interval's rows to this CSV file")
+    args = parser.parse_args()
+
+    prefix = args.prefix or PREFIXES.get(args.binary.rstrip("/").split("/")[-1])
+    if not prefix:
+        raise SystemExit("Cannot tell the symbol prefix of %s; pass --prefix" % args.binary)
+    ops = [op.strip() for op in args.ops.split(",") if op.strip()]
+    unknown = [op for op in ops if op not in OPS]
+    if unknown or not ops:
+        raise SystemExit("Unknown or empty operation list %r (available: %s)" % (args.ops, ", ".join(OPS)))
+
+    b = BPF(text=build_program(ops, args.pid))
+    for op in ops:
+        sym = "%s_%s" % (prefix, op)
+        b.attach_uprobe(name=args.binary, sym=sym, fn_name="on_%s_entry" % op, pid=args.pid or -1)
+        b.attach_uretprobe(name=args.binary, sym=sym, fn_name="on_%s_return" % op, pid=args.pid or -1)
+    hists = LatencyHistograms(b)
+
+    out = writer = None
+    if args.csv:
+        out = open(args.csv, "w", newline="")
+        writer = csv.DictWriter(out, fieldnames=FIELDNAMES)
+        writer.writeheader()
+
+    print("Timing %s on %s. Ctrl+C to exit." % (", ".join("%s_%s" % (prefix, op) for op in ops), args.binary))
+    start = time.time()
+    deadline = start + args.duration if args.duration else None
+    try:
+        while deadline is None or time.time() < deadline:
+            time.sleep(args.interval if deadline is None else max(0, min(args.interval, deadline - time.time())))
+            rows = hists.interval_rows(time.time() - start)
+            print_rows(rows)
+            if writer is not None:
+                writer.writerows(rows)
+                out.flush()
+    except KeyboardInterrupt:
+        pass
+
+    hists.last = {}
+    print("Totals:")
+    print_rows(hists.interval_rows(time.time() - start))
+    if out is not None:
+        out.close()
+        print("Interval rows have been written to '%s'" % args.csv)
+
+
+if __name__ == "__main__":
+    main()
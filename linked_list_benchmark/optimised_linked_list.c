@@ -2,6 +2,8 @@
 #include <stdlib.h>
 #include <stdbool.h>
 #include "optimised_linked_list.h"
+#include "list_probes.h"
+#include "list_stats.h"
 #include <emmintrin.h>
 
 #define NODE_CHUNK_SIZE 100000
@@ -14,6 +16,8 @@ OptimisedChunk* pool_chunks = NULL;
 #define likely(x)   __builtin_expect((x), 1)
 #define unlikely(x) __builtin_expect((x), 0)
 
+LIST_PROBES_DEFINE_SEMAPHORES;
+
 __attribute__((noinline, used, externally_visible))
 void deletion_instrumentation(void *pred, void *target, void *succ) {
     volatile int dummy = 0;
@@ -39,6 +43,7 @@ void optimised_allocate_pool_chunk() {
         new_chunk[i].next_free = node_pool;
         node_pool = &new_chunk[i];
     }
+    LIST_STATS_CHUNK(NODE_CHUNK_SIZE);
 }
 
 void optimised_insert(OptimisedNode** head, int data) {
@@ -50,6 +55,8 @@ void optimised_insert(OptimisedNode** head, int data) {
     new_node->data = data;
     new_node->next = *head;
     *head = new_node;
+    LIST_PROBE_INSERT_DONE(head, new_node, data);
+    LIST_STATS_INSERT();
 }
 
 static inline void optimised_return_node(OptimisedNode* node) {
@@ -74,21 +81,30 @@ int optimised_delete(OptimisedNode** head, int data) {
     if (*head != NULL && (*head)->data == data) {
         OptimisedNode* temp = *head;
         _mm_stream_si64((long long*)head, (long long)(*head)->next);
+        LIST_PROBE_DELETE_UNLINK(head, NULL, temp, temp->next, data);
         optimised_return_node(temp);
+        LIST_STATS_DELETE(1, 1);
         return 1; 
     }
     OptimisedNode* prev = *head;
     OptimisedNode* temp = (*head != NULL) ? (*head)->next : NULL;
+    unsigned long steps = 1;
     while (temp != NULL) {
+        steps++;
         if (temp->data == data) {
-            deletion_instrumentation(prev, temp, temp->next);
-            prev->next = temp->next;
+            OptimisedNode* succ = temp->next;
+            LIST_DELETE_HOOK(prev, temp, succ);
+            prev->next = succ;
+            LIST_PROBE_DELETE_UNLINK(head, prev, temp, succ, data);
             optimised_return_node(temp);
+            LIST_STATS_DELETE(1, steps);
             return 1; 
         }
         prev = temp;
         temp = temp->next;
     }
+    LIST_PROBE_DELETE_MISS(head, data);
+    LIST_STATS_DELETE(0, *head != NULL ? steps : 0);
     return 0;
 }
 
@@ -103,10 +119,17 @@ void optimised_show(OptimisedNode* head) {
 
 OptimisedNode* optimised_search(OptimisedNode* head, int data) {
     OptimisedNode* current = head;
+    unsigned long steps = 0;
     while (likely(current != NULL)) {
-        if (current->data == data)
+        steps++;
+        if (current->data == data) {
+            LIST_PROBE_SEARCH_HIT(head, data, current);
+            LIST_STATS_SEARCH(1, steps);
             return current;
+        }
         current = current->next;
     }
+    LIST_PROBE_SEARCH_MISS(head, data);
+    LIST_STATS_SEARCH(0, steps);
     return NULL;
 }
\ No newline at end of file
@@ -0,0 +1,101 @@
+#include <errno.h>
+#include <stdio.h>
+#include <string.h>
+#include <unistd.h>
+#include <sys/ioctl.h>
+#include <sys/syscall.h>
+#include <linux/perf_event.h>
+#include "perf_counters.h"
+
+static const struct {
+    const char* name;
+    uint32_t type;
+    uint64_t config;
+} events[PERF_NUM_EVENTS] = {
+    [PERF_CYCLES] = { "cycles", PERF_TYPE_HARDWARE, PERF_COUNT_HW_CPU_CYCLES },
+    [PERF_INSTRUCTIONS] = { "instructions", PERF_TYPE_HARDWARE, PERF_COUNT_HW_INSTRUCTIONS },
+    [PERF_CACHE_MISSES] = { "cache_misses", PERF_TYPE_HARDWARE, PERF_COUNT_HW_CACHE_MISSES },
+    [PERF_BRANCH_MISSES] = { "branch_misses", PERF_TYPE_HARDWARE, PERF_COUNT_HW_BRANCH_MISSES },
+    [PERF_LLC_LOADS] = { "llc_loads", PERF_TYPE_HW_CACHE,
+                         PERF_COUNT_HW_CACHE_LL | (PERF_COUNT_HW_CACHE_OP_READ << 8) |
+                         (PERF_COUNT_HW_CACHE_RESULT_ACCESS << 16) },
+};
+
+static int open_event(int i, int group_fd) {
+    struct perf_event_attr attr;
+    memset(&attr, 0, sizeof(attr));
+    attr.size = sizeof(attr);
+    attr.type = events[i].type;
+    attr.config = events[i].config;
+    attr.read_format = PERF_FORMAT_GROUP | PERF_FORMAT_ID |
+                       PERF_FORMAT_TOTAL_TIME_ENABLED | PERF_FORMAT_TOTAL_TIME_RUNNING;
+    attr.disabled = group_fd == -1;
+    attr.exclude_kernel = 1;
+    attr.exclude_hv = 1;
+    return (int)syscall(SYS_perf_event_open, &attr, 0, -1, group_fd, PERF_FLAG_FD_CLOEXEC);
+}
+
+int perf_group_open(PerfGroup* g) {
+    g->leader = -1;
+    g->nr_open = 0;
+    int first_errno = 0;
+    for (int i = 0; i < PERF_NUM_EVENTS; i++) {
+        g->fds[i] = open_event(i, g->leader);
+        if (g->fds[i] < 0) {
+            if (!first_errno)
+                first_errno = errno;
+            continue;
+        }
+        if (g->leader == -1)
+            g->leader = g->fds[i];
+        g->nr_open++;
+    }
+    if (g->leader == -1) {
+        fprintf(stderr, "perf_event_open: %s; running without counters\n", strerror(first_errno));
+        return -1;
+    }
+    ioctl(g->leader, PERF_EVENT_IOC_RESET, PERF_IOC_FLAG_GROUP);
+    ioctl(g->leader, PERF_EVENT_IOC_ENABLE, PERF_IOC_FLAG_GROUP);
+    return 0;
+}
+
+void perf_group_close(PerfGroup* g) {
+    for (int i = 0; i < PERF_NUM_EVENTS; i++) {
+        if (g->fds[i] >= 0)
+            close(g->fds[i]);
+        g->fds[i] = -1;
+    }
+    g->leader = -1;
+    g->nr_open = 0;
+}
+
+int perf_group_read(const PerfGroup* g, PerfSample* s) {
+    /* nr, time_enabled, time_running, then (value, id) per open event; the
+     * events come back in the order they joined the group. */
+    uint64_t buf[3 + 2 * PERF_NUM_EVENTS];
+    if (read(g->leader, buf, sizeof(buf)) < (ssize_t)(3 * sizeof(uint64_t)))
+        return -1;
+    s->time_enabled = buf[1];
+    s->time_running = buf[2];
+    int k = 0;
+    for (int i = 0; i < PERF_NUM_EVENTS; i++)
+        s->values[i] = g->fds[i] >= 0 && (uint64_t)k < buf[0] ? buf[3 + 2 * k++] : 0;
+    return 0;
+}
+
+void perf_sample_add_delta(PerfSample* acc, const PerfSample* start, const PerfSample* end) {
+    acc->time_enabled += end->time_enabled - start->time_enabled;
+    acc->time_running += end->time_running - start->time_running;
+    for (int i = 0; i < PERF_NUM_EVENTS; i++)
+        acc->values[i] += end->values[i] - start->values[i];
+}
+
+void perf_sample_print(const char* name, const PerfGroup* g, const PerfSample* s) {
+    double scale = s->time_running ? (double)s->time_enabled / s->time_running : 1.0;
+    printf("Counters %s:", name);
+    for (int i = 0; i < PERF_NUM_EVENTS; i++) {
+        if (g->fds[i] >= 0)
+            printf(" %s=%llu", events[i].name, (unsigned long long)(s->values[i] * scale + 0.5));
+    }
+    printf("\n");
+}
@@ -0,0 +1,50 @@
+#ifndef PERF_COUNTERS_H
+#define PERF_COUNTERS_H
+
+#include <stdint.h>
+
+/*
+ * A perf_event_open counter group read from inside the workload, so
+ * counters can be split by phase and operation type instead of covering
+ * the whole process as perf stat does.
+ *
+ * The group counts user space only for the calling thread. Events the CPU
+ * or kernel does not offer are left out; if none open, perf_group_open()
+ * fails and the workload runs without counters. Counts are scaled by
+ * time_enabled / time_running when the kernel had to multiplex the group.
+ */
+
+enum {
+    PERF_CYCLES,
+    PERF_INSTRUCTIONS,
+    PERF_CACHE_MISSES,
+    PERF_BRANCH_MISSES,
+    PERF_LLC_LOADS,
+    PERF_NUM_EVENTS
+};
+
+typedef struct PerfGroup {
+    int leader;
+    int fds[PERF_NUM_EVENTS];       /* -1 for events that did not open */
+    int nr_open;
+} PerfGroup;
+
+/* Raw group readings and what they add up to. */
+typedef struct PerfSample {
+    uint64_t time_enabled;
+    uint64_t time_running;
+    uint64_t values[PERF_NUM_EVENTS];
+} PerfSample;
+
+/* Returns 0, or -1 after printing why counters are unavailable. */
+int perf_group_open(PerfGroup* g);
+void perf_group_close(PerfGroup* g);
+int perf_group_read(const PerfGroup* g, PerfSample* s);
+
+/* acc += end - start */
+void perf_sample_add_delta(PerfSample* acc, const PerfSample* start, const PerfSample* end);
+
+/* Print "Counters <name>: cycles=... instructions=... ..." for the open events. */
+void perf_sample_print(const char* name, const PerfGroup* g, const PerfSample* s);
+
+#endif
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+Per-CPU probe self-cost accounting shared by the BCC monitors.
+
+Every probe hit records its own duration into a per-CPU slot (count, sum,
+max and a log2 nanosecond histogram), so there is no shared cache line and
+no atomic on the hot path. ProbeStats merges the per-CPU copies in Python
+and reports p50/p99/max per probe.
+
+LiveReporter prints (or writes as JSON lines) per-interval rates while a
+monitor runs: hits/s, ns/hit and violations/s per probe, plus the estimated
+share of one CPU the probes cost.
+"""
+import csv
+import ctypes
+import json
+import sys
+import time
+
+HIST_SLOTS = 40
+
+
+def probe_stats_bpf(num_probes):
+    """BPF text defining the probe_stats map and the BEGIN_PROBE/END_PROBE macros."""
+    return r"""
+// --- Per-CPU probe timing ---
+#define PROBE_HIST_SLOTS %d
+struct probe_stat {
+    u64 count;
+    u64 total_time;
+    u64 max_time;
+    u64 slots[PROBE_HIST_SLOTS];
+};
+BPF_PERCPU_ARRAY(probe_stats, struct probe_stat, %d);
+
+// Slot s holds durations in [2^(s-1), 2^s) ns. The entry is private to this
+// CPU, so plain increments are safe.
+static inline void record_probe(u32 idx, u64 start_ns) {
+    u64 delta = bpf_ktime_get_ns() - start_ns;
+    u32 key = idx;
+    struct probe_stat *ps = probe_stats.lookup(&key);
+    if (ps) {
+        u32 slot = bpf_log2l(delta);
+        if (slot >= PROBE_HIST_SLOTS)
+            slot = PROBE_HIST_SLOTS - 1;
+        ps->count++;
+        ps->total_time += delta;
+        if (delta > ps->max_time)
+            ps->max_time = delta;
+        ps->slots[slot]++;
+    }
+}
+#define BEGIN_PROBE() u64 __probe_start = bpf_ktime_get_ns();
+#define END_PROBE(idx) record_probe(idx, __probe_start)
+""" % (HIST_SLOTS, num_probes)
+
+
+class ProbeStat(ctypes.Structure):
+    """ctypes mirror of struct probe_stat, for loaders without BCC's type info."""
+    _fields_ = [
+        ("count", ctypes.c_uint64),
+        ("total_time", ctypes.c_uint64),
+        ("max_time", ctypes.c_uint64),
+        ("slots", ctypes.c_uint64 * HIST_SLOTS),
+    ]
+
+
+def percentile(slots, count, q):
+    """Upper bound (ns) of the log2 bucket containing the q-th percentile."""
+    if count == 0:
+        return 0
+    target = q / 100.0 * count
+    seen = 0
+    for slot, n in enumerate(slots):
+        seen += n
+        if seen >= target:
+            return 1 << slot
+    return 1 << (len(slots) - 1)
+
+
+class ProbeStats:
+    """Reads and merges the per-CPU probe_stats map of a loaded BPF object."""
+
+    FIELDNAMES = ["probe_name", "count", "total_time_ns", "mean_ns", "p50_ns", "p99_ns", "max_ns"]
+
+    def __init__(self, b, probe_names):
+        self.table = b["probe_stats"]
+        self.probe_names = probe_names
+
+    def _read_all(self):
+        """{probe index: per-CPU values}, in one batch syscall where the kernel supports it."""
+        try:
+            values = {int(getattr(k, "value", k)): v for k, v in self.table.items_lookup_batch()}
+            if all(idx in values for idx in self.probe_names):
+                return values
+        except Exception:
+            # Batch ops need Linux 5.6+ (5.7 for arrays); fall back to a lookup per probe.
+            pass
+        return {idx: self.table[idx] for idx in self.probe_names}
+
+    def snapshot(self):
+        """Return one merged row per probe that has been hit."""
+        rows = []
+        values = self._read_all()
+        for idx, name in sorted(self.probe_names.items()):
+            count = total = max_time = 0
+            slots = [0] * HIST_SLOTS
+            for per_cpu in values[idx]:
+                count += per_cpu.count
+                total += per_cpu.total_time
+                max_time = max(max_time, per_cpu.max_time)
+                for s in range(HIST_SLOTS):
+                    slots[s] += per_cpu.slots[s]
+            # The bucket bound can overshoot the largest sample seen.
+            rows.append({
+                "probe_name": name,
+                "count": count,
+                "total_time_ns": total,
+                "mean_ns": total / count if count else 0.0,
+                "p50_ns": min(percentile(slots, count, 50), max_time),
+                "p99_ns": min(percentile(slots, count, 99), max_time),
+                "max_ns": max_time,
+            })
+        return rows
+
+    def combined_total(self, rows=None):
+        rows = rows if rows is not None else self.snapshot()
+        return sum(r["total_time_ns"] for r in rows)
+
+    def print_report(self, rows=None, out=sys.stdout):
+        rows = rows if rows is not None else self.snapshot()
+        print("%-20s %10s %14s %10s %10s %10s %10s" % ("probe", "hits", "total ns", "mean ns",
+                                                    "p50 ns", "p99 ns", "max ns"), file=out)
+        for r in rows:
+            print("%-20s %10d %14d %10.1f %10d %10d %10d" % (
+                r["probe_name"], r["count"], r["total_time_ns"], r["mean_ns"],
+                r["p50_ns"], r["p99_ns"], r["max_ns"]), file=out)
+        return rows
+
+    def write_csv(self, path, rows=None):
+        rows = rows if rows is not None else self.snapshot()
+        with open(path, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=self.FIELDNAMES)
+            writer.writeheader()
+            writer.writerows(rows)
+
+
+class IntervalReporter:
+    """on_tick callback that prints a ProbeStats report every `interval` seconds."""
+
+    def __init__(self, stats, interval):
+        self.stats = stats
+        self.interval = interval
+        self.next_report = None
+
+    def __call__(self, now):
+        if not self.interval:
+            return
+        if self.next_report is None:
+            self.next_report = now + self.interval
+        elif now >= self.next_report:
+            self.stats.print_report()
+            self.next_report = now + self.interval
+
+
+class LiveReporter:
+    """
+    on_tick callback printing per-interval rates every `interval` seconds,
+    as a table or, with `json_out`, as one JSON object per line.
+
+    overhead_pct estimates the share of one CPU spent in the probes:
+    (probe ns + hits * trap_cost_ns) / wall ns, as BudgetController does.
+    """
+
+    def __init__(self, stats, interval, writer=None, trap_cost_ns=1500, json_out=None):
+        self.stats = stats
+        self.interval = interval
+        self.writer = writer
+        self.trap_cost_ns = trap_cost_ns
+        self.json_out = json_out
+        self.last = None
+
+    def _sample(self, now):
+        rows = {r["probe_name"]: r for r in self.stats.snapshot()}
+        by_probe = dict(self.writer.by_probe) if self.writer is not None else {}
+        return now, rows, by_probe
+
+    def __call__(self, now):
+        if not self.interval:
+            return
+        if self.last is not None and now - self.last[0] < self.interval:
+            return
+        current = self._sample(now)
+        if self.last is None:
+            self.last = current
+            return
+        (last_time, last_rows, last_viol), (_, rows, viol) = self.last, current
+        self.last = current
+        wall = now - last_time
+        probes = []
+        probe_ns = hits = 0
+        for name, r in rows.items():
+            prev = last_rows.get(name, {"count": 0, "total_time_ns": 0})
+            n = r["count"] - prev["count"]
+            ns = r["total_time_ns"] - prev["total_time_ns"]
+            hits += n
+            probe_ns += ns
+            probes.append({
+                "probe": name,
+                "hits_per_s": n / wall,
+                "ns_per_hit": ns / n if n else 0.0,
+                "violations_per_s": (viol.get(name, 0) - last_viol.get(name, 0)) / wall,
+            })
+        overhead = 100.0 * (probe_ns + hits * self.trap_cost_ns) / (wall * 1e9)
+        violations = (sum(viol.values()) - sum(last_viol.values())) / wall
+        if self.json_out is not None:
+            self.json_out.write(json.dumps({"time": time.time(), "interval_s": wall, "probes": probes,
+                                            "violations_per_s": violations, "overhead_pct": overhead}) + "\n")
+            self.json_out.flush()
+            return
+        print("%-20s %12s %10s %12s" % ("probe", "hits/s", "ns/hit", "violations/s"))
+        for p in probes:
+            print("%-20s %12.0f %10.1f %12.1f" % (p["probe"], p["hits_per_s"], p["ns_per_hit"],
+                                                  p["violations_per_s"]))
+        print("%-20s %12.0f %10s %12.1f  overhead %.2f%% of a CPU" % ("all", hits / wall, "", violations, overhead))
@@ -0,0 +1,31 @@
+"""
+Pluggable properties for verif_monitor.py.
+
+A property contributes BPF declarations, fields of the shared per-operation
+context (struct op_ctx_t) and C fragments for any of the hook points in
+verif_monitor.HOOKS. verif_monitor.py stitches the enabled properties into
+one BPF program with a single probe per hook, so enabling more properties
+adds work inside each probe but never another trap.
+
+Fragments run inside the generated probe with these in scope:
+    ctx       struct pt_regs *
+    tid       u32 thread id
+    c         struct op_ctx_t * for the operation in flight
+    ret       return value (return hooks only)
+    PROBE_ID  index of the probe, for report_violation()
+
+Fragments for USDT probe points (usdt_hooks, see verif_monitor.USDT_HOOKS)
+get the probe arguments as locals instead of c; see verif_monitor.USDT_PROBE.
+"""
+from properties.insert_head import InsertHead
+from properties.delete_link import DeleteLink
+from properties.length import Length
+from properties.shadow_set import ShadowSet
+
+# Registry of properties by command-line name, in the order their fragments run.
+PROPERTIES = {
+    InsertHead.name: InsertHead,
+    DeleteLink.name: DeleteLink,
+    Length.name: Length,
+    ShadowSet.name: ShadowSet,
+}
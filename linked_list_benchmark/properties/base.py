@@ -0,0 +1,34 @@
+"""Base class for verif_monitor properties; see properties/__init__.py."""
+
+
+class Property:
+    """Base class; subclasses override what they need."""
+
+    name = None
+    # C field declarations added to struct op_ctx_t.
+    context_fields = ""
+    # hook name -> C fragment
+    hooks = {}
+    # USDT probe name (verif_monitor.USDT_HOOKS) -> C fragment
+    usdt_hooks = {}
+    # map name -> ctypes value type, for maps the precompiled loader cannot size itself
+    value_types = {}
+
+    def __init__(self, args):
+        self.args = args
+
+    @classmethod
+    def add_arguments(cls, parser):
+        pass
+
+    def bpf_text(self):
+        """Maps and helpers this property needs, emitted before the probes."""
+        return ""
+
+    def ticks(self, b):
+        """on_tick callbacks to run while the monitor drains violations."""
+        return []
+
+    def report(self, b):
+        """Print property-specific summary at exit."""
+        pass
@@ -0,0 +1,69 @@
+"""
+Delete-link property: after a successful delete the predecessor's link (or
+*head, for the head node) points at the deleted node's old successor.
+
+Head deletions are recognised in the entry probe; deeper ones are reported
+by the deletion_instrumentation(pred, target, succ) hook in the library.
+"""
+from properties.base import Property
+
+
+class DeleteLink(Property):
+    name = "delete-link"
+    context_fields = "u64 pred; u64 next_after; u32 del_known;"
+    hooks = {
+        "delete_entry": r"""
+    if (c->sampled) {
+        u64 head = 0;
+        bpf_probe_read_user(&head, sizeof(head), (void*)c->head_addr);
+        if (head) {
+            int val = 0;
+            bpf_probe_read_user(&val, sizeof(val), (void*)head);
+            if (val == c->arg) {
+                c->pred = 0;
+                bpf_probe_read_user(&c->next_after, sizeof(c->next_after), (void*)(head + 8));
+                c->del_known = 1;
+            }
+        }
+    }
+""",
+        "delete_hook": r"""
+    if (c->sampled) {
+        c->pred = PT_REGS_PARM1(ctx);
+        c->next_after = PT_REGS_PARM3(ctx);
+        c->del_known = 1;
+    }
+""",
+        "delete_return": r"""
+    if (c->del_known) {
+        if (c->pred == 0) {
+            u64 new_head = 0;
+            bpf_probe_read_user(&new_head, sizeof(new_head), (void*)c->head_addr);
+            if (new_head != c->next_after)
+                report_violation(PROBE_ID, VIOL_DELETE_HEAD_LINK, c->head_addr, c->next_after, new_head);
+        } else {
+            u64 new_link = 0;
+            bpf_probe_read_user(&new_link, sizeof(new_link), (void*)(c->pred + 8));
+            if (new_link != c->next_after)
+                report_violation(PROBE_ID, VIOL_DELETE_MID_LINK, c->head_addr, c->next_after, new_link);
+        }
+    }
+""",
+    }
+    # delete_unlink fires after the unlink with pred/succ as arguments.
+    usdt_hooks = {
+        "usdt_delete_unlink": r"""
+    if (sampled) {
+        u64 link = 0;
+        if (pred == 0) {
+            bpf_probe_read_user(&link, sizeof(link), (void*)head_addr);
+            if (link != succ)
+                report_violation(PROBE_ID, VIOL_DELETE_HEAD_LINK, head_addr, succ, link);
+        } else {
+            bpf_probe_read_user(&link, sizeof(link), (void*)(pred + 8));
+            if (link != succ)
+                report_violation(PROBE_ID, VIOL_DELETE_MID_LINK, head_addr, succ, link);
+        }
+    }
+""",
+    }
@@ -0,0 +1,55 @@
+"""Insert-at-head property: after insert, *head is a node holding the value whose next is the old head."""
+from properties.base import Property
+
+
+class InsertHead(Property):
+    name = "insert-head"
+    context_fields = "u64 old_head;"
+    hooks = {
+        "insert_entry": r"""
+    if (c->sampled)
+        bpf_probe_read_user(&c->old_head, sizeof(c->old_head), (void*)c->head_addr);
+""",
+        "insert_return": r"""
+    if (c->sampled) {
+        u64 new_head = 0;
+        bpf_probe_read_user(&new_head, sizeof(new_head), (void*)c->head_addr);
+        if (!new_head) {
+            report_violation(PROBE_ID, VIOL_INSERT_NULL_HEAD, c->head_addr, 0, 0);
+        } else {
+            int new_val = 0;
+            bpf_probe_read_user(&new_val, sizeof(new_val), (void*)new_head);
+            if (new_val != c->arg)
+                report_violation(PROBE_ID, VIOL_INSERT_VALUE_MISMATCH, c->head_addr, c->arg, new_val);
+            u64 new_next = 0;
+            bpf_probe_read_user(&new_next, sizeof(new_next), (void*)(new_head + 8));
+            if (new_next != c->old_head)
+                report_violation(PROBE_ID, VIOL_INSERT_NEXT_MISMATCH, c->head_addr, c->old_head, new_next);
+        }
+    }
+""",
+    }
+    # insert_done fires after the update, so the old head comes from usdt_heads.
+    usdt_hooks = {
+        "usdt_insert_done": r"""
+    if (sampled) {
+        u64 now_head = 0;
+        bpf_probe_read_user(&now_head, sizeof(now_head), (void*)head_addr);
+        if (!now_head)
+            report_violation(PROBE_ID, VIOL_INSERT_NULL_HEAD, head_addr, 0, 0);
+        else if (now_head != node)
+            report_violation(PROBE_ID, VIOL_INSERT_NOT_AT_HEAD, head_addr, node, now_head);
+        int new_val = 0;
+        bpf_probe_read_user(&new_val, sizeof(new_val), (void*)node);
+        if (new_val != value)
+            report_violation(PROBE_ID, VIOL_INSERT_VALUE_MISMATCH, head_addr, value, new_val);
+        u64 *old_head = usdt_heads.lookup(&lkey);
+        if (old_head) {
+            u64 new_next = 0;
+            bpf_probe_read_user(&new_next, sizeof(new_next), (void*)(node + 8));
+            if (new_next != *old_head)
+                report_violation(PROBE_ID, VIOL_INSERT_NEXT_MISMATCH, head_addr, *old_head, new_next);
+        }
+    }
+""",
+    }
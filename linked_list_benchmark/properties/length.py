@@ -0,0 +1,73 @@
+"""Length property: the list length always equals inserts minus successful deletes."""
+from properties.base import Property
+from length_check import (LenList, WalkProgressReporter, add_length_arguments, length_check_from_args,
+                          print_walk_stats)
+
+
+class Length(Property):
+    name = "length"
+    # The deleted node and its successor, so a walk parked on it can move on.
+    context_fields = "u64 len_target; u64 len_succ;"
+    value_types = {"len_lists": LenList}
+    # The expected length is maintained for every operation; only the walk is sampled.
+    hooks = {
+        "insert_return": r"""
+    length_note_insert(c->head_addr);
+    if (c->sampled)
+        check_list_length(PROBE_ID, c->head_addr);
+""",
+        # Head deletions do not go through the hook.
+        "delete_entry": r"""
+    {
+        u64 head = 0;
+        bpf_probe_read_user(&head, sizeof(head), (void*)c->head_addr);
+        if (head) {
+            int val = 0;
+            bpf_probe_read_user(&val, sizeof(val), (void*)head);
+            if (val == c->arg) {
+                c->len_target = head;
+                bpf_probe_read_user(&c->len_succ, sizeof(c->len_succ), (void*)(head + 8));
+            }
+        }
+    }
+""",
+        "delete_hook": r"""
+    c->len_target = PT_REGS_PARM2(ctx);
+    c->len_succ = PT_REGS_PARM3(ctx);
+""",
+        "delete_return": r"""
+    if (ret == 1) {
+        length_note_delete(c->head_addr, c->len_target, c->len_succ);
+        if (c->sampled)
+            check_list_length(PROBE_ID, c->head_addr);
+    }
+""",
+    }
+    usdt_hooks = {
+        "usdt_insert_done": r"""
+    length_note_insert(head_addr);
+    if (sampled)
+        check_list_length(PROBE_ID, head_addr);
+""",
+        "usdt_delete_unlink": r"""
+    length_note_delete(head_addr, target, succ);
+    if (sampled)
+        check_list_length(PROBE_ID, head_addr);
+""",
+    }
+
+    @classmethod
+    def add_arguments(cls, parser):
+        add_length_arguments(parser, default_throttle_ms=1000)
+
+    def bpf_text(self):
+        return length_check_from_args(self.args)
+
+    def ticks(self, b):
+        # Walks in progress per list, alongside the --stats-interval reports.
+        if self.args.stats_interval:
+            return [WalkProgressReporter(b, self.args.stats_interval)]
+        return []
+
+    def report(self, b):
+        print_walk_stats(b, self.args)
@@ -0,0 +1,221 @@
+"""
+Shadow-set delete property: a BPF hash of live node addresses (and a count
+per value) is maintained on every insert and delete return, so a delete at
+any depth is checked with a few map lookups and no traversal:
+
+  - the unlinked node was live and held the value being deleted,
+  - the predecessor's link (or *head) now points at its old successor,
+  - a delete that found nothing really had no live node with that value.
+
+With --attach usdt the search probes are checked as well: a hit must be
+a live node and a miss must not have a live node with that value.
+
+Nodes are keyed by (pid, address) and value counts by (pid, head, value),
+so lists in different processes, or several lists in one process, do not
+mix. Nodes inserted before the monitor attached are not in the set. Deleting
+one is counted as untracked rather than reported, unless --shadow-strict
+says the monitor was attached before the list was populated.
+"""
+from properties.base import Property
+
+
+class ShadowSet(Property):
+    name = "delete-shadow"
+    context_fields = "u64 sh_pred; u64 sh_target; u64 sh_succ;"
+    hooks = {
+        "insert_return": r"""
+    {
+        u64 node = 0;
+        bpf_probe_read_user(&node, sizeof(node), (void*)c->head_addr);
+        if (node)
+            shadow_add(c->head_addr, node, c->arg);
+    }
+""",
+        # Head deletions do not go through the hook.
+        "delete_entry": r"""
+    {
+        u64 head = 0;
+        bpf_probe_read_user(&head, sizeof(head), (void*)c->head_addr);
+        if (head) {
+            int val = 0;
+            bpf_probe_read_user(&val, sizeof(val), (void*)head);
+            if (val == c->arg) {
+                c->sh_pred = 0;
+                c->sh_target = head;
+                bpf_probe_read_user(&c->sh_succ, sizeof(c->sh_succ), (void*)(head + 8));
+            }
+        }
+    }
+""",
+        "delete_hook": r"""
+    c->sh_pred = PT_REGS_PARM1(ctx);
+    c->sh_target = PT_REGS_PARM2(ctx);
+    c->sh_succ = PT_REGS_PARM3(ctx);
+""",
+        "delete_return": r"""
+    if (ret == 1 && c->sh_target) {
+        shadow_check_delete(PROBE_ID, c->head_addr, c->sh_pred, c->sh_target, c->sh_succ, c->arg, c->sampled);
+    } else if (ret == 1) {
+        shadow_stat(SHADOW_UNTRACKED, 1);
+    } else if (c->sampled && SHADOW_STRICT) {
+        u32 cnt = shadow_live_count(c->head_addr, c->arg);
+        if (cnt > 0)
+            report_violation(PROBE_ID, VIOL_DELETE_MISSED_LIVE_VALUE, c->head_addr, cnt, 0);
+    }
+""",
+    }
+    usdt_hooks = {
+        "usdt_insert_done": r"""
+    shadow_add(head_addr, node, value);
+""",
+        "usdt_delete_unlink": r"""
+    shadow_check_delete(PROBE_ID, head_addr, pred, target, succ, value, sampled);
+""",
+        "usdt_delete_miss": r"""
+    if (sampled && SHADOW_STRICT) {
+        u32 cnt = shadow_live_count(head_addr, value);
+        if (cnt > 0)
+            report_violation(PROBE_ID, VIOL_DELETE_MISSED_LIVE_VALUE, head_addr, cnt, 0);
+    }
+""",
+        "usdt_search_hit": r"""
+    if (sampled && SHADOW_STRICT && !shadow_node(node))
+        report_violation(PROBE_ID, VIOL_SEARCH_HIT_NOT_LIVE, first, node, 0);
+""",
+        # Search probes only see the first node; its entry names the list.
+        "usdt_search_miss": r"""
+    if (sampled && SHADOW_STRICT && first) {
+        struct live_node_t *n = shadow_node(first);
+        u32 cnt = n ? shadow_live_count(n->head_addr, value) : 0;
+        if (cnt > 0)
+            report_violation(PROBE_ID, VIOL_SEARCH_MISSED_LIVE_VALUE, first, cnt, 0);
+    }
+""",
+    }
+
+    @classmethod
+    def add_arguments(cls, parser):
+        parser.add_argument("--shadow-size", type=int, default=1 << 20,
+                            help="delete-shadow: maximum number of live nodes tracked (default: %(default)s)")
+        parser.add_argument("--shadow-strict", action="store_true",
+                            help="delete-shadow: the monitor is attached before the list is populated, so "
+                                 "untracked nodes and missed values are violations")
+
+    def bpf_text(self):
+        return r"""
+// --- Shadow set of live nodes ---
+#define SHADOW_STRICT %(strict)d
+#define SHADOW_TRACKED 0
+#define SHADOW_UNTRACKED 1
+#define SHADOW_FULL 2
+struct live_node_t {
+    u64 head_addr;
+    int value;
+};
+struct live_value_t {
+    u64 head_addr;
+    u32 pid;
+    int value;
+};
+BPF_HASH(live_nodes, struct pid_addr_t, struct live_node_t, %(size)d);
+BPF_HASH(live_values, struct live_value_t, u32, %(size)d);
+// 0: nodes added, 1: deletes of untracked nodes, 2: adds that found the set full
+BPF_ARRAY(shadow_stats, u64, 3);
+
+static inline void shadow_stat(u32 idx, u64 n) {
+    u64 *v = shadow_stats.lookup(&idx);
+    if (v)
+        __sync_fetch_and_add(v, n);
+}
+
+static inline struct live_value_t live_value_key(u64 head_addr, int value) {
+    struct live_value_t k = {};
+    k.head_addr = head_addr;
+    k.pid = bpf_get_current_pid_tgid() >> 32;
+    k.value = value;
+    return k;
+}
+
+static inline struct live_node_t *shadow_node(u64 node) {
+    struct pid_addr_t key = pid_addr(node);
+    return live_nodes.lookup(&key);
+}
+
+static inline u32 shadow_live_count(u64 head_addr, int value) {
+    struct live_value_t key = live_value_key(head_addr, value);
+    u32 *cnt = live_values.lookup(&key);
+    return cnt ? *cnt : 0;
+}
+
+// Counts that reach zero are removed, so live_values holds only values
+// that are live and does not fill up with every value ever inserted.
+static inline void shadow_value_drop(u64 head_addr, int value) {
+    struct live_value_t vkey = live_value_key(head_addr, value);
+    u32 *cnt = live_values.lookup(&vkey);
+    if (!cnt)
+        return;
+    if (*cnt > 1)
+        __sync_fetch_and_add(cnt, -1);
+    else
+        live_values.delete(&vkey);
+}
+
+static inline void shadow_add(u64 head_addr, u64 node, int value) {
+    struct pid_addr_t key = pid_addr(node);
+    // A node still in the set was freed by a delete the monitor did not
+    // see; its old value is no longer live.
+    struct live_node_t *old = live_nodes.lookup(&key);
+    if (old)
+        shadow_value_drop(old->head_addr, old->value);
+    struct live_node_t n = {};
+    n.head_addr = head_addr;
+    n.value = value;
+    if (live_nodes.update(&key, &n) != 0) {
+        shadow_stat(SHADOW_FULL, 1);
+        return;
+    }
+    u32 one = 1;
+    struct live_value_t vkey = live_value_key(head_addr, value);
+    u32 *cnt = live_values.lookup(&vkey);
+    if (cnt)
+        __sync_fetch_and_add(cnt, 1);
+    else
+        live_values.update(&vkey, &one);
+    shadow_stat(SHADOW_TRACKED, 1);
+}
+
+static inline void shadow_check_delete(u32 probe_id, u64 head_addr, u64 pred, u64 target,
+                                       u64 succ, int value, u32 sampled) {
+    struct pid_addr_t key = pid_addr(target);
+    struct live_node_t *n = live_nodes.lookup(&key);
+    if (!n) {
+        shadow_stat(SHADOW_UNTRACKED, 1);
+        if (sampled && SHADOW_STRICT)
+            report_violation(probe_id, VIOL_DELETE_TARGET_NOT_LIVE, head_addr, target, 0);
+    } else {
+        if (sampled && n->value != value)
+            report_violation(probe_id, VIOL_DELETE_VALUE_MISMATCH, head_addr, value, n->value);
+        // The count to drop is the node's, whatever value the delete asked for.
+        struct live_node_t gone = *n;
+        live_nodes.delete(&key);
+        shadow_value_drop(gone.head_addr, gone.value);
+    }
+    if (!sampled)
+        return;
+    u64 link = 0;
+    if (pred == 0) {
+        bpf_probe_read_user(&link, sizeof(link), (void*)head_addr);
+        if (link != succ)
+            report_violation(probe_id, VIOL_DELETE_HEAD_LINK, head_addr, succ, link);
+    } else {
+        bpf_probe_read_user(&link, sizeof(link), (void*)(pred + 8));
+        if (link != succ)
+            report_violation(probe_id, VIOL_DELETE_MID_LINK, head_addr, succ, link);
+    }
+}
+""" % {"strict": int(self.args.shadow_strict), "size": self.args.shadow_size}
+
+    def report(self, b):
+        stats = b["shadow_stats"]
+        print("Shadow set: %d nodes added, %d deletes of untracked nodes, %d adds dropped (set full)" % (
+            stats[0].value, stats[1].value, stats[2].value))
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Probabilistic sampling of property checks.
+
+With a sample rate N the probes check roughly 1 in N inserts/deletes,
+chosen with bpf_get_prandom_u32(). N lives in the sample_rate map so it
+can be changed while the monitor runs: BudgetController does that from
+the measured probe_stats cost to keep the estimated overhead under a
+target percentage of one CPU.
+
+Sampling only skips probe bodies. The uprobe/uretprobe traps still fire
+for every call, so their cost (--trap-cost-ns per hit) sets a floor that
+no sample rate can get under.
+"""
+import ctypes
+import sys
+
+SAMPLING_BPF = r"""
+// --- Sampling ---
+// Check 1 in N operations; N <= 1 checks every operation.
+BPF_ARRAY(sample_rate, u32, 1);
+// 0: sampling decisions, 1: decisions that selected the operation
+BPF_PERCPU_ARRAY(sample_counts, u64, 2);
+
+static inline int sample_op(void) {
+    u32 key = 0;
+    u32 *n = sample_rate.lookup(&key);
+    int take = !n || *n <= 1 || bpf_get_prandom_u32() % *n == 0;
+    u64 *seen = sample_counts.lookup(&key);
+    if (seen)
+        (*seen)++;
+    if (take) {
+        key = 1;
+        u64 *taken = sample_counts.lookup(&key);
+        if (taken)
+            (*taken)++;
+    }
+    return take;
+}
+"""
+
+MAX_SAMPLE_RATE = 1 << 20
+
+
+def add_sampling_arguments(parser):
+    parser.add_argument("--sample", type=int, default=1,
+                        help="Check 1 in N inserts/deletes (default: %(default)s = every operation)")
+    parser.add_argument("--overhead-budget", type=float, default=0,
+                        help="Adjust the sample rate at runtime to keep estimated probe overhead under "
+                             "this percentage of one CPU (0 = fixed rate)")
+    parser.add_argument("--trap-cost-ns", type=int, default=1500,
+                        help="Estimated kernel trap cost per probe hit, added to the measured probe time "
+                             "in budget mode (default: %(default)s)")
+
+
+def set_sample_rate(b, rate):
+    b["sample_rate"][ctypes.c_int(0)] = ctypes.c_uint32(max(1, min(int(rate), MAX_SAMPLE_RATE)))
+
+
+def print_sampling_summary(b):
+    counts = b["sample_counts"]
+    seen = sum(counts[0])
+    taken = sum(counts[1])
+    rate = b["sample_rate"][ctypes.c_int(0)].value
+    coverage = 100.0 * taken / seen if seen else 0.0
+    print("Sampling: %d of %d operations checked (%.2f%% coverage, final rate 1 in %d)" % (
+        taken, seen, coverage, max(rate, 1)))
+
+
+class BudgetController:
+    """
+    on_tick callback that retunes the sample rate every `interval` seconds.
+
+    The estimated overhead over the last interval is
+        (probe ns + hits * trap_cost_ns) / wall ns.
+    Only the probe-body part scales with the sample rate, so the rate is
+    set to make that part fit in whatever the traps leave of the budget.
+    """
+
+    def __init__(self, b, stats, budget_pct, trap_cost_ns, initial_rate=1, interval=1.0):
+        self.b = b
+        self.stats = stats
+        self.budget = budget_pct / 100.0
+        self.trap_cost_ns = trap_cost_ns
+        self.rate = max(1, initial_rate)
+        self.interval = interval
+        self.last = None
+        set_sample_rate(b, self.rate)
+
+    def _totals(self):
+        rows = self.stats.snapshot()
+        return sum(r["total_time_ns"] for r in rows), sum(r["count"] for r in rows)
+
+    def __call__(self, now):
+        if self.last is not None and now - self.last[0] < self.interval:
+            return
+        probe_ns, hits = self._totals()
+        if self.last is None:
+            self.last = (now, probe_ns, hits)
+            return
+        last_time, last_ns, last_hits = self.last
+        self.last = (now, probe_ns, hits)
+        wall_ns = (now - last_time) * 1e9
+        body_ns = probe_ns - last_ns
+        trap_ns = (hits - last_hits) * self.trap_cost_ns
+        if wall_ns <= 0 or hits == last_hits:
+            return
+        overhead = (body_ns + trap_ns) / wall_ns
+        allowed_body = self.budget * wall_ns - trap_ns
+        if allowed_body <= 0:
+            new_rate = MAX_SAMPLE_RATE
+        elif body_ns <= 0:
+            new_rate = self.rate // 2
+        else:
+            # body_ns was measured at the current rate; scale towards the allowance,
+            # at most 4x per step in either direction.
+            new_rate = self.rate * body_ns / allowed_body
+            new_rate = min(max(new_rate, self.rate / 4.0), self.rate * 4.0)
+        new_rate = max(1, min(int(round(new_rate)), MAX_SAMPLE_RATE))
+        if new_rate != self.rate:
+            print("Overhead %.2f%% (budget %.2f%%): sample rate 1 in %d -> 1 in %d" % (
+                overhead * 100, self.budget * 100, self.rate, new_rate), file=sys.stderr)
+            if allowed_body <= 0:
+                print("  trap cost alone exceeds the budget; sampling cannot reach it", file=sys.stderr)
+            self.rate = new_rate
+            set_sample_rate(self.b, self.rate)
+
+
+def sampling_ticks(b, stats, args):
+    """Set the initial rate and return the on_tick callbacks for the chosen mode."""
+    if args.overhead_budget > 0:
+        return [BudgetController(b, stats, args.overhead_budget, args.trap_cost_ns, args.sample)]
+    set_sample_rate(b, args.sample)
+    return []
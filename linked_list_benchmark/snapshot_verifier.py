@@ -0,0 +1,389 @@
+#!/usr/bin/env python3
+"""
+Out-of-band structural verifier for the verif_optimised list.
+
+Instead of checking inside probes on the traced thread, this reads the
+target's memory from a separate process with batched process_vm_readv
+calls and checks the copy:
+
+  - the list from *head has no cycle (Floyd's tortoise and hare),
+  - every list node and every free-list node lies in a pool chunk
+    (VerifOptimisedChunk ranges) on a node boundary,
+  - live nodes plus free nodes account for the whole pool, with no node
+    on both lists,
+  - optionally, the list length equals --expected-len.
+
+Each snapshot reads the pool chunks whole, so the number of syscalls does
+not depend on the list length, then walks the copy in Python. The head
+pointer address is either given with --head-addr or learned from a short
+uprobe on <prefix>_insert/<prefix>_delete that is detached after
+--learn-seconds; from then on the workload pays nothing. Forked children
+of a learned process share its head address and are verified too.
+
+The workload keeps running while a snapshot is taken, so a snapshot can be
+torn. A finding is only reported once it shows up in --confirm consecutive
+snapshots, and the accounting checks are skipped for snapshots during
+which the head or free-list pointer moved. --interval and --budget-pct
+bound how much CPU the verifier uses.
+
+Example:
+    sudo ./snapshot_verifier.py ./main_verif_optimised --budget-pct 5
+"""
+import argparse
+import bisect
+import ctypes
+import os
+import struct
+import subprocess
+import sys
+import time
+
+from violation_events import VIOLATION_KINDS, ViolationWriter, format_value
+
+# VerifOptimisedNode: data at 0, next at 8, next_free at 16. The aligned
+# attribute on the typedef raises its alignment but not its size, so pool
+# chunks hold nodes 24 bytes apart.
+NODE_SIZE = 24
+NEXT_OFF = 8
+NEXT_FREE_OFF = 16
+# VerifOptimisedChunk: chunk pointer at 0, next at 8.
+MAX_CHUNKS = 4096
+IOV_MAX = 1024
+
+KIND_IDS = {name: kind for kind, name in VIOLATION_KINDS.items()}
+
+LEARN_BPF = r"""
+#include <uapi/linux/ptrace.h>
+
+// tgid -> address of the Node** passed to insert/delete
+BPF_HASH(heads, u32, u64, 1024);
+
+int on_list_op(struct pt_regs *ctx) {
+    u32 pid = bpf_get_current_pid_tgid() >> 32;
+    u64 head = PT_REGS_PARM1(ctx);
+    heads.update(&pid, &head);
+    return 0;
+}
+"""
+
+
+class _IoVec(ctypes.Structure):
+    _fields_ = [("iov_base", ctypes.c_void_p), ("iov_len", ctypes.c_size_t)]
+
+
+_libc = ctypes.CDLL(None, use_errno=True)
+_libc.process_vm_readv.restype = ctypes.c_ssize_t
+_libc.process_vm_readv.argtypes = [ctypes.c_int, ctypes.POINTER(_IoVec), ctypes.c_ulong,
+                                   ctypes.POINTER(_IoVec), ctypes.c_ulong, ctypes.c_ulong]
+
+
+def read_batch(pid, ranges):
+    """Read each (addr, size) range of pid; returns one bytearray per range."""
+    bufs = [bytearray(size) for _, size in ranges]
+    for start in range(0, len(ranges), IOV_MAX):
+        part = ranges[start:start + IOV_MAX]
+        local = (_IoVec * len(part))()
+        remote = (_IoVec * len(part))()
+        want = 0
+        for i, (addr, size) in enumerate(part):
+            buf = (ctypes.c_char * size).from_buffer(bufs[start + i])
+            local[i] = _IoVec(ctypes.addressof(buf), size)
+            remote[i] = _IoVec(addr, size)
+            want += size
+        got = _libc.process_vm_readv(pid, local, len(part), remote, len(part), 0)
+        if got < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, "process_vm_readv(%d): %s" % (pid, os.strerror(err)))
+        if got != want:
+            raise OSError(0, "process_vm_readv(%d): short read (%d of %d bytes)" % (pid, got, want))
+    return bufs
+
+
+def read_u64(pid, addr):
+    return struct.unpack("<Q", read_batch(pid, [(addr, 8)])[0])[0]
+
+
+def symbol_offset(binary, name):
+    """st_value of a symbol, from nm."""
+    out = subprocess.run(["nm", "--defined-only", binary], capture_output=True, text=True, check=True).stdout
+    for line in out.splitlines():
+        fields = line.split()
+        if len(fields) == 3 and fields[2] == name:
+            return int(fields[0], 16)
+    raise SystemExit("Symbol %s not found in %s" % (name, binary))
+
+
+def load_base(pid, binary):
+    """Load address of a PIE binary in pid (0 for a fixed-address executable)."""
+    with open(binary, "rb") as f:
+        header = f.read(18)
+    if struct.unpack_from("<H", header, 16)[0] != 3:  # ET_DYN
+        return 0
+    path = os.path.realpath(binary)
+    with open("/proc/%d/maps" % pid) as f:
+        for line in f:
+            fields = line.split()
+            if len(fields) >= 6 and fields[5] == path and int(fields[2], 16) == 0:
+                return int(fields[0].split("-")[0], 16)
+    raise OSError(0, "%s is not mapped in pid %d" % (binary, pid))
+
+
+def children(pid):
+    try:
+        with open("/proc/%d/task/%d/children" % (pid, pid)) as f:
+            return [int(c) for c in f.read().split()]
+    except OSError:
+        return []
+
+
+class Snapshot:
+    """Pool chunks of one process copied at (roughly) one instant."""
+
+    def __init__(self, pid, head_addr, chunks_addr, pool_addr, chunk_nodes):
+        self.pid = pid
+        self.head_addr = head_addr
+        chunk_bytes = chunk_nodes * NODE_SIZE
+        # The chunk metadata list is short and only grows, so walk it first.
+        starts = []
+        meta = read_u64(pid, chunks_addr)
+        while meta and len(starts) < MAX_CHUNKS:
+            chunk, meta = struct.unpack("<QQ", read_batch(pid, [(meta, 16)])[0])
+            starts.append(chunk)
+        pointers = read_batch(pid, [(head_addr, 8), (pool_addr, 8)])
+        self.head = struct.unpack("<Q", pointers[0])[0]
+        self.free_head = struct.unpack("<Q", pointers[1])[0]
+        starts.sort()
+        self.starts = starts
+        self.chunk_bytes = chunk_bytes
+        self.data = read_batch(pid, [(s, chunk_bytes) for s in starts])
+        # If either list head moved while the chunks were copied, the copy
+        # mixes states from before and after those operations.
+        self.stable = read_batch(pid, [(head_addr, 8), (pool_addr, 8)]) == pointers
+        self.capacity = len(starts) * chunk_nodes
+        self.bytes_read = len(starts) * chunk_bytes + 16 * (len(starts) + 2)
+
+    def locate(self, addr):
+        """(chunk index, offset) of the node at addr, or None if it is not a pool node."""
+        i = bisect.bisect_right(self.starts, addr) - 1
+        if i < 0:
+            return None
+        off = addr - self.starts[i]
+        if off >= self.chunk_bytes or off % NODE_SIZE:
+            return None
+        return i, off
+
+    def link(self, addr, field_off):
+        loc = self.locate(addr)
+        if loc is None:
+            return None
+        return struct.unpack_from("<Q", self.data[loc[0]], loc[1] + field_off)[0]
+
+
+def walk(snap, first, field_off):
+    """
+    Follow field_off links from first. Returns (length, findings, nodes):
+    Floyd's algorithm decides whether there is a cycle before counting.
+    """
+    findings = []
+    slow = fast = first
+    while fast:
+        fast = snap.link(fast, field_off)
+        if fast is None:
+            break
+        if fast:
+            fast = snap.link(fast, field_off)
+            if fast is None:
+                break
+        slow = snap.link(slow, field_off)
+        if fast and fast == slow:
+            findings.append(("list_cycle", 0, slow))
+            return 0, findings, set()
+    nodes = set()
+    curr = first
+    while curr:
+        nxt = snap.link(curr, field_off)
+        if nxt is None:
+            findings.append(("node_not_in_pool", 0, curr))
+            break
+        nodes.add(curr)
+        curr = nxt
+    return len(nodes), findings, nodes
+
+
+def verify(snap, expected_len=None):
+    """List of (kind, expected, observed) found in one snapshot."""
+    length, findings, live = walk(snap, snap.head, NEXT_OFF)
+    free_len, free_findings, free = walk(snap, snap.free_head, NEXT_FREE_OFF)
+    findings += free_findings
+    # Accounting only holds for a copy of a single instant; cycles and
+    # foreign pointers are reported from any snapshot and left to --confirm.
+    if not findings and snap.stable:
+        if length + free_len != snap.capacity:
+            findings.append(("pool_count_mismatch", snap.capacity, length + free_len))
+        both = live & free
+        if both:
+            findings.append(("node_live_and_free", 0, min(both)))
+        if expected_len is not None and length != expected_len:
+            findings.append(("length_mismatch", expected_len, length))
+    return findings, length
+
+
+class Target:
+    def __init__(self, pid, head_addr):
+        self.pid = pid
+        self.head_addr = head_addr
+        self.pending = {}  # kind -> consecutive snapshots it was seen in
+        self.last_len = None
+
+
+class SnapshotVerifier:
+    def __init__(self, args):
+        self.args = args
+        self.targets = {}
+        self.snapshots = 0
+        self.bytes_read = 0
+        self.busy = 0.0
+        self.torn = 0
+        self.writer = ViolationWriter(args.violations_out)
+
+    def add_target(self, pid, head_addr):
+        if pid not in self.targets:
+            self.targets[pid] = Target(pid, head_addr)
+            print("Verifying pid %d (head at 0x%x)" % (pid, head_addr))
+
+    def report(self, target, kind, expected, observed):
+        self.writer.write({
+            "ts_ns": time.monotonic_ns(),
+            "pid": target.pid,
+            "tid": target.pid,
+            "probe": "snapshot",
+            "kind": kind,
+            "head_addr": "0x%x" % target.head_addr,
+            "expected": format_value(KIND_IDS[kind], expected),
+            "observed": format_value(KIND_IDS[kind], observed),
+        })
+        self.writer.flush()
+
+    def check(self, target):
+        args = self.args
+        base = load_base(target.pid, args.binary)
+        snap = Snapshot(target.pid, target.head_addr, base + self.chunks_sym, base + self.pool_sym,
+                        args.chunk_nodes)
+        findings, target.last_len = verify(snap, args.expected_len)
+        self.snapshots += 1
+        self.torn += not snap.stable
+        self.bytes_read += snap.bytes_read
+        seen = {}
+        for kind, expected, observed in findings:
+            count = target.pending.get(kind, 0) + 1
+            seen[kind] = count
+            if count == args.confirm:
+                self.report(target, kind, expected, observed)
+        target.pending = seen
+
+    def refresh_targets(self):
+        for pid in list(self.targets):
+            for child in children(pid):
+                self.add_target(child, self.targets[pid].head_addr)
+            if not os.path.exists("/proc/%d" % pid):
+                del self.targets[pid]
+
+    def run(self):
+        args = self.args
+        self.chunks_sym = symbol_offset(args.binary, args.chunks_symbol)
+        self.pool_sym = symbol_offset(args.binary, args.pool_symbol)
+        deadline = time.time() + args.duration if args.duration else None
+        try:
+            while deadline is None or time.time() < deadline:
+                self.refresh_targets()
+                start = time.perf_counter()
+                for target in list(self.targets.values()):
+                    try:
+                        self.check(target)
+                    except OSError as e:
+                        # Exited, or exec'd something else.
+                        print("pid %d: %s" % (target.pid, e), file=sys.stderr)
+                        self.targets.pop(target.pid, None)
+                elapsed = time.perf_counter() - start
+                self.busy += elapsed
+                # Sleep long enough that the time spent checking stays
+                # under budget_pct of one CPU.
+                pause = args.interval
+                if args.budget_pct > 0:
+                    pause = max(pause, elapsed * (100.0 / args.budget_pct - 1))
+                if not self.targets:
+                    break
+                time.sleep(pause)
+        except KeyboardInterrupt:
+            pass
+
+    def close(self):
+        self.writer.close()
+        mean = self.busy / self.snapshots * 1000 if self.snapshots else 0.0
+        print("Snapshots: %d (%d torn, accounting skipped), %.1f MiB read, %.2f ms mean check time, "
+              "%d violations reported" % (self.snapshots, self.torn, self.bytes_read / 1048576.0, mean,
+                                          self.writer.count))
+        for target in self.targets.values():
+            if target.last_len is not None:
+                print("  pid %d: last list length %d" % (target.pid, target.last_len))
+
+
+def learn_heads(args):
+    """Attach a uprobe until a process calls insert/delete; return {pid: head address}."""
+    from bcc import BPF
+    b = BPF(text=LEARN_BPF)
+    for op in ("insert", "delete"):
+        b.attach_uprobe(name=args.binary, sym="%s_%s" % (args.prefix, op), fn_name="on_list_op")
+    print("Waiting for %s_insert/%s_delete calls..." % (args.prefix, args.prefix))
+    first = None
+    try:
+        while first is None or time.time() - first < args.learn_seconds:
+            time.sleep(0.05)
+            if first is None and len(b["heads"]):
+                first = time.time()
+    except KeyboardInterrupt:
+        pass
+    heads = {k.value: v.value for k, v in b["heads"].items()}
+    b.cleanup()
+    return heads
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Verify the list from outside the process with memory snapshots")
+    parser.add_argument("binary", help="Path to the target binary (e.g., ./main_verif_optimised)")
+    parser.add_argument("--pid", type=int, help="Verify this process instead of learning targets with a uprobe")
+    parser.add_argument("--head-addr", type=lambda x: int(x, 0),
+                        help="Address of the head pointer in --pid (skips the learning uprobe)")
+    parser.add_argument("--prefix", default="verif_optimised",
+                        help="Symbol prefix of the list functions (<prefix>_insert, <prefix>_delete)")
+    parser.add_argument("--learn-seconds", type=float, default=1.0,
+                        help="Keep the learning uprobe attached this long after its first hit (default: %(default)s)")
+    parser.add_argument("--chunks-symbol", default="verif_pool_chunks", help="Pool chunk list global")
+    parser.add_argument("--pool-symbol", default="verif_node_pool", help="Free list head global")
+    parser.add_argument("--chunk-nodes", type=int, default=100000,
+                        help="Nodes per pool chunk (NODE_CHUNK_SIZE, default: %(default)s)")
+    parser.add_argument("--expected-len", type=int, help="Also check the list has exactly this many nodes")
+    parser.add_argument("--interval", type=float, default=1.0, help="Seconds between snapshots (default: %(default)s)")
+    parser.add_argument("--budget-pct", type=float, default=0,
+                        help="Stretch the interval so checking uses at most this percentage of one CPU")
+    parser.add_argument("--confirm", type=int, default=2,
+                        help="Report a finding once it appears in this many consecutive snapshots (default: %(default)s)")
+    parser.add_argument("--duration", type=float, default=0, help="Stop after N seconds (0 = until targets exit)")
+    parser.add_argument("--violations-out", help="Write violation records to this CSV file instead of stdout")
+    args = parser.parse_args()
+
+    verifier = SnapshotVerifier(args)
+    if args.head_addr is not None:
+        if args.pid is None:
+            raise SystemExit("--head-addr needs --pid")
+        verifier.add_target(args.pid, args.head_addr)
+    else:
+        for pid, head in learn_heads(args).items():
+            if args.pid is None or pid == args.pid:
+                verifier.add_target(pid, head)
+    verifier.run()
+    verifier.close()
+
+
+if __name__ == "__main__":
+    main()
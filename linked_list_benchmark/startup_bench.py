@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Monitor startup cost: compile, load (verifier) and attach time per
+configuration, for BCC and for the precompiled libbpf objects.
+
+For BCC, compile is BPF(text=...), load is load_func() on every probe
+program and attach is attaching them. For libbpf, compile is the one-off
+build time recorded by bpf_precompile.py, load is opening and loading the
+object and attach is the same attach_hooks() call. startup_s is what a
+monitor launch pays, so it leaves out the libbpf build time.
+
+Needs root and the objects from ./bpf_precompile.py (configurations without
+one are reported for BCC only).
+
+Example:
+    sudo ./startup_bench.py ./main_verif_optimised --runs 3
+"""
+import argparse
+import csv
+import os
+import time
+
+from bpf_precompile import CONFIGS, DEFAULT_OUT_DIR, object_path, build_seconds
+from probe_stats import ProbeStat
+from verif_monitor import program_for_args, attach_hooks, HOOKS
+
+FIELDNAMES = ["config", "loader", "run", "compile_s", "load_s", "attach_s", "startup_s"]
+
+
+def time_bcc(args, bpf_text, active):
+    from bcc import BPF
+    start = time.perf_counter()
+    b = BPF(text=bpf_text)
+    compiled = time.perf_counter()
+    for idx in active:
+        b.load_func("on_" + HOOKS[idx][0], BPF.KPROBE)
+    loaded = time.perf_counter()
+    attach_hooks(b, args, active)
+    attached = time.perf_counter()
+    b.cleanup()
+    return compiled - start, loaded - compiled, attached - loaded
+
+
+def time_libbpf(args, bpf_text, active, obj_dir):
+    from libbpf_loader import LibbpfObject
+    path = object_path(obj_dir, bpf_text)
+    if not os.path.exists(path):
+        return None
+    start = time.perf_counter()
+    b = LibbpfObject(path, value_types={"probe_stats": ProbeStat})
+    loaded = time.perf_counter()
+    attach_hooks(b, args, active)
+    attached = time.perf_counter()
+    b.cleanup()
+    return build_seconds(path) or 0.0, loaded - start, attached - loaded
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure monitor compile, load and attach time")
+    parser.add_argument("binary", help="Target binary to attach to (e.g., ./main_verif_optimised)")
+    parser.add_argument("--config", action="append", choices=sorted(CONFIGS),
+                        help="Measure only this configuration (repeatable)")
+    parser.add_argument("--objects", default=DEFAULT_OUT_DIR,
+                        help="Directory of precompiled objects (default: %(default)s)")
+    parser.add_argument("--runs", type=int, default=3, help="Repetitions per configuration (default: %(default)s)")
+    parser.add_argument("--output", default="startup_times.csv", help="Output CSV (default: %(default)s)")
+    args = parser.parse_args()
+
+    rows = []
+    for config in args.config or CONFIGS:
+        monitor_args, _, bpf_text, active = program_for_args([args.binary] + CONFIGS[config])
+        for run in range(args.runs):
+            timings = {"bcc": time_bcc(monitor_args, bpf_text, active),
+                       "libbpf": time_libbpf(monitor_args, bpf_text, active, args.objects)}
+            for loader, t in timings.items():
+                if t is None:
+                    continue
+                row = {"config": config, "loader": loader, "run": run,
+                       "compile_s": t[0], "load_s": t[1], "attach_s": t[2],
+                       "startup_s": sum(t) if loader == "bcc" else t[1] + t[2]}
+                rows.append(row)
+                print("%-20s %-7s run %d: compile %.3f s, load %.3f s, attach %.3f s" % (
+                    config, loader, run, t[0], t[1], t[2]))
+
+    with open(args.output, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=FIELDNAMES)
+        writer.writeheader()
+        writer.writerows(rows)
+    print("Startup times have been written to '%s'" % args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Run a grid of workload shapes against every build and write one CSV row per run.
+
+Each axis takes a comma-separated list; every combination is run --runs times
+against each binary. Distributions take their parameters after a colon:
+zipf:0.8 sets the skew, hotset:0.2:0.8 the hot fraction and probability.
+
+Examples:
+    ./sweep.py --mixes 40/40/20,90/5/5,5/90/5 --dists uniform,zipf:0.99 --ops 200000
+    ./sweep.py --prefills 100,1000,10000 --key-ranges 1-10000,1-100000 --duration 5 --perf
+"""
+import argparse
+import csv
+import itertools
+import subprocess
+import sys
+import time
+
+from collect_perf import COUNTER_FIELDS, LATENCY_FIELDS, parse_perf_output, parse_stdout, run_perf
+
+VERSIONS = {
+    "baseline": "./main_baseline",
+    "optimised": "./main_optimised",
+    "verif": "./main_verif_optimised",
+}
+
+FIELDNAMES = [
+    "Version", "Run", "mix", "dist", "prefill", "keys", "seed",
+    "total_operations", "insertions", "insert_time",
+    "searches", "search_time", "deletions", "delete_time",
+    "search_hits", "delete_hits",
+    "insert_ns_per_op", "search_ns_per_op", "delete_ns_per_op",
+    *LATENCY_FIELDS,
+    *COUNTER_FIELDS,
+    "cache_misses", "cycles", "instructions", "branch_misses",
+    "elapsed", "user", "sys", "IPC",
+]
+
+
+def dist_args(spec):
+    """Workload options for a distribution spec such as zipf:0.9 or hotset:0.1:0.9."""
+    name, *params = spec.split(":")
+    args = ["--dist", name]
+    if name == "zipf" and params:
+        args += ["--zipf-theta", params[0]]
+    elif name == "hotset" and params:
+        args += ["--hot-fraction", params[0]]
+        if len(params) > 1:
+            args += ["--hot-prob", params[1]]
+    elif params:
+        raise SystemExit("%s takes no parameters" % name)
+    return args
+
+
+def csv_list(text):
+    return [item.strip() for item in text.split(",") if item.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sweep workload shapes across linked list builds")
+    parser.add_argument("--versions", type=csv_list, default=list(VERSIONS),
+                        help="Builds to run (default: %s)" % ",".join(VERSIONS))
+    parser.add_argument("--mixes", type=csv_list, default=["40/40/20"],
+                        help="Insert/search/delete percentages")
+    parser.add_argument("--dists", type=csv_list, default=["uniform"],
+                        help="Key distributions: uniform, zipf[:theta], hotset[:fraction[:prob]], sequential")
+    parser.add_argument("--prefills", type=csv_list, default=["300"], help="Prefill sizes")
+    parser.add_argument("--key-ranges", type=csv_list, default=["1-10000"], help="Key ranges MIN-MAX")
+    limit = parser.add_mutually_exclusive_group()
+    limit.add_argument("--duration", type=float, help="User CPU seconds per run")
+    limit.add_argument("--ops", type=int, help="Operations per run")
+    parser.add_argument("--runs", type=int, default=3, help="Runs per combination")
+    parser.add_argument("--seed", type=int, default=1,
+                        help="Seed of the first run; run r uses seed+r-1 (0 = from the clock)")
+    parser.add_argument("--perf", action="store_true", help="Collect hardware counters with perf stat")
+    parser.add_argument("--batch", type=int, metavar="N",
+                        help="Have the workload time batches of N operations instead of each one")
+    parser.add_argument("--counters", action="store_true",
+                        help="Have the workload count hardware events per phase and operation type "
+                             "(needs --batch)")
+    parser.add_argument("--output", type=str, default="sweep.csv", help="Output CSV file")
+    args = parser.parse_args()
+
+    unknown = [v for v in args.versions if v not in VERSIONS]
+    if unknown:
+        parser.error("unknown version(s): %s" % ", ".join(unknown))
+    if args.counters and not args.batch:
+        parser.error("--counters needs --batch")
+    if args.duration is None and args.ops is None:
+        args.duration = 10
+    limit_args = ["--duration", str(args.duration)] if args.ops is None else ["--duration", "0", "--ops", str(args.ops)]
+
+    grid = list(itertools.product(args.mixes, args.dists, args.prefills, args.key_ranges))
+    total = len(grid) * len(args.versions) * args.runs
+    done = 0
+
+    with open(args.output, "w", newline="") as csvfile:
+        writer = csv.DictWriter(csvfile, fieldnames=FIELDNAMES, extrasaction="ignore")
+        writer.writeheader()
+
+        for mix, dist, prefill, keys in grid:
+            for version in args.versions:
+                for run in range(1, args.runs + 1):
+                    seed = args.seed + run - 1 if args.seed else 0
+                    workload = (["--mix", mix, "--prefill", prefill, "--keys", keys,
+                                 "--seed", str(seed)] + dist_args(dist) + limit_args
+                                + (["--batch", str(args.batch)] if args.batch else [])
+                                + (["--counters"] if args.counters else []))
+                    done += 1
+                    print("[%d/%d] %s %s" % (done, total, version, " ".join(workload)))
+                    if args.perf:
+                        stdout, stderr = run_perf(VERSIONS[version], workload)
+                        perf_data = parse_perf_output(stderr)
+                    else:
+                        result = subprocess.run([VERSIONS[version]] + workload, capture_output=True, text=True)
+                        stdout, stderr = result.stdout, result.stderr
+                        perf_data = {}
+                    run_data = parse_stdout(stdout)
+                    if "total_operations" not in run_data:
+                        print(stderr, end="", file=sys.stderr)
+                        raise SystemExit("%s produced no results" % version)
+                    ipc = ""
+                    if perf_data.get("cycles"):
+                        ipc = perf_data["instructions"] / perf_data["cycles"]
+                    writer.writerow({
+                        "Version": version,
+                        "Run": run,
+                        "mix": mix,
+                        "dist": dist,
+                        "prefill": prefill,
+                        "keys": keys,
+                        "seed": seed,
+                        **run_data,
+                        **perf_data,
+                        "IPC": ipc,
+                    })
+                    csvfile.flush()
+                    time.sleep(0.5)
+
+    print("Sweep complete. Results written to", args.output)
+
+
+if __name__ == "__main__":
+    main()
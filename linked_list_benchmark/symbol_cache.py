@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Cached symbol lookup for uprobe attachment.
+
+Attaching by symbol name makes the loader search the ELF symbol table once
+per probe, and again on every monitor start. symbol_addresses() reads the
+table once per file version with nm and caches the defined symbols with the
+file's load segments, keyed by (device, inode, size, mtime), in
+$SYMBOL_CACHE (default ~/.cache/linked_list_benchmark/symbols.json).
+The monitors then attach by address, so attach time depends only on the
+number of probes: a uprobe on a shared library's path covers every process
+that maps it, however many there are.
+
+Addresses are symbol values (st_value); file_offset() converts one to the
+file offset libbpf wants.
+
+Example:
+    ./symbol_cache.py ../linked_list_lib/linked_list_lib.so insert delete search
+"""
+import json
+import os
+import struct
+import subprocess
+import sys
+
+CACHE_PATH = os.environ.get("SYMBOL_CACHE",
+                            os.path.expanduser("~/.cache/linked_list_benchmark/symbols.json"))
+
+_cache = None
+
+
+def _file_key(path):
+    st = os.stat(path)
+    return [st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns]
+
+
+def _load_segments(path):
+    """[(vaddr, file offset, size)] of the PT_LOAD segments of a 64-bit ELF file."""
+    with open(path, "rb") as f:
+        ident = f.read(64)
+        if ident[:4] != b"\x7fELF" or ident[4] != 2:
+            raise SystemExit("%s is not a 64-bit ELF file" % path)
+        phoff, = struct.unpack_from("<Q", ident, 32)
+        phentsize, phnum = struct.unpack_from("<HH", ident, 54)
+        f.seek(phoff)
+        table = f.read(phentsize * phnum)
+    segments = []
+    for i in range(phnum):
+        p_type, _, p_offset, p_vaddr, _, p_filesz = struct.unpack_from("<IIQQQQ", table, i * phentsize)
+        if p_type == 1:  # PT_LOAD
+            segments.append((p_vaddr, p_offset, p_filesz))
+    return segments
+
+
+def _read_symbols(path):
+    symbols = {}
+    # The static table first; stripped shared libraries only have the dynamic one.
+    for extra in ([], ["-D"]):
+        out = subprocess.run(["nm", "--defined-only"] + extra + [path],
+                             capture_output=True, text=True).stdout
+        for line in out.splitlines():
+            fields = line.split()
+            if len(fields) == 3:
+                symbols.setdefault(fields[2], int(fields[0], 16))
+        if symbols:
+            break
+    return symbols
+
+
+def _load_cache():
+    global _cache
+    if _cache is None:
+        try:
+            with open(CACHE_PATH) as f:
+                _cache = json.load(f)
+        except (OSError, ValueError):
+            _cache = {}
+    return _cache
+
+
+def _save_cache():
+    try:
+        os.makedirs(os.path.dirname(CACHE_PATH), exist_ok=True)
+        tmp = CACHE_PATH + ".%d" % os.getpid()
+        with open(tmp, "w") as f:
+            json.dump(_cache, f)
+        os.replace(tmp, CACHE_PATH)
+    except OSError:
+        pass  # a read-only home only costs the next start a lookup
+
+
+def _entry(path):
+    path = os.path.realpath(path)
+    cache = _load_cache()
+    key = _file_key(path)
+    entry = cache.get(path)
+    if entry is None or entry["key"] != key:
+        entry = {"key": key, "symbols": _read_symbols(path), "segments": _load_segments(path)}
+        cache[path] = entry
+        _save_cache()
+    return entry
+
+
+def symbol_addresses(path, names):
+    """{name: st_value} for the given symbols of the ELF file at path."""
+    symbols = _entry(path)["symbols"]
+    missing = [n for n in names if n not in symbols]
+    if missing:
+        raise SystemExit("Symbol(s) %s not found in %s" % (", ".join(sorted(missing)), path))
+    return {n: symbols[n] for n in names}
+
+
+def file_offset(path, addr):
+    """File offset of the virtual address addr in the ELF file at path."""
+    for vaddr, offset, size in _entry(path)["segments"]:
+        if vaddr <= addr < vaddr + size:
+            return addr - vaddr + offset
+    raise SystemExit("Address 0x%x is not in a loaded segment of %s" % (addr, path))
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        raise SystemExit("usage: %s FILE SYMBOL..." % sys.argv[0])
+    for name, addr in sorted(symbol_addresses(sys.argv[1], sys.argv[2:]).items()):
+        print("%-32s 0x%x (file offset 0x%x)" % (name, addr, file_offset(sys.argv[1], addr)))
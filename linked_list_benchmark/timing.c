@@ -0,0 +1,41 @@
+#include <stdlib.h>
+#include "timing.h"
+
+#ifdef TIMING_HAVE_TSC
+#include <cpuid.h>
+#endif
+
+int timer_use_tsc = 0;
+double timer_ns_per_tick = 1.0;
+
+static uint64_t monotonic_ns(void) {
+    struct timespec ts;
+    clock_gettime(CLOCK_MONOTONIC, &ts);
+    return (uint64_t)ts.tv_sec * 1000000000ULL + ts.tv_nsec;
+}
+
+int timer_init(void) {
+#ifdef TIMING_HAVE_TSC
+    unsigned int eax, ebx, ecx, edx;
+    if (getenv("WORKLOAD_NO_TSC") != NULL)
+        return 0;
+    if (!__get_cpuid(0x80000007, &eax, &ebx, &ecx, &edx) || !(edx & (1u << 8)))
+        return 0;
+    /* Spin for 20 ms of CLOCK_MONOTONIC and count the ticks in between. */
+    uint64_t ns0 = monotonic_ns(), tsc0 = __rdtsc();
+    uint64_t ns1;
+    do {
+        ns1 = monotonic_ns();
+    } while (ns1 - ns0 < 20000000ULL);
+    uint64_t tsc1 = __rdtsc();
+    if (tsc1 <= tsc0)
+        return 0;
+    timer_ns_per_tick = (double)(ns1 - ns0) / (double)(tsc1 - tsc0);
+    timer_use_tsc = 1;
+#endif
+    return timer_use_tsc;
+}
+
+double timer_hz(void) {
+    return 1e9 / timer_ns_per_tick;
+}
@@ -0,0 +1,47 @@
+#ifndef TIMING_H
+#define TIMING_H
+
+#include <stdint.h>
+#include <time.h>
+
+/*
+ * Cheap timestamps for the workload loop.
+ *
+ * On x86-64 with an invariant TSC (CPUID 0x80000007 EDX bit 8) timer_now()
+ * is an lfence-ordered rdtsc, a few nanoseconds instead of a vDSO
+ * clock_gettime(); timer_init() calibrates ticks against CLOCK_MONOTONIC.
+ * Anywhere else timer_now() falls back to CLOCK_MONOTONIC in nanoseconds.
+ */
+
+#if defined(__x86_64__) || defined(__i386__)
+#include <x86intrin.h>
+#define TIMING_HAVE_TSC 1
+#endif
+
+extern int timer_use_tsc;
+extern double timer_ns_per_tick;
+
+/* Calibrate; returns 1 if the TSC is used. */
+int timer_init(void);
+/* Ticks per second, for reporting. */
+double timer_hz(void);
+
+static inline uint64_t timer_now(void) {
+#ifdef TIMING_HAVE_TSC
+    if (timer_use_tsc) {
+        _mm_lfence();
+        uint64_t t = __rdtsc();
+        _mm_lfence();
+        return t;
+    }
+#endif
+    struct timespec ts;
+    clock_gettime(CLOCK_MONOTONIC, &ts);
+    return (uint64_t)ts.tv_sec * 1000000000ULL + ts.tv_nsec;
+}
+
+static inline uint64_t timer_ns(uint64_t ticks) {
+    return (uint64_t)(ticks * timer_ns_per_tick);
+}
+
+#endif
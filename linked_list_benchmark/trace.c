@@ -0,0 +1,95 @@
+#include <fcntl.h>
+#include <string.h>
+#include <sys/mman.h>
+#include <sys/stat.h>
+#include <unistd.h>
+#include "trace.h"
+
+static void fill_header(TraceHeader* h, uint64_t prefill, uint64_t ops) {
+    memset(h, 0, sizeof(*h));
+    memcpy(h->magic, TRACE_MAGIC, sizeof(h->magic));
+    h->version = TRACE_VERSION;
+    h->record_size = sizeof(TraceRecord);
+    h->prefill = prefill;
+    h->ops = ops;
+}
+
+int trace_writer_open(TraceWriter* w, const char* path) {
+    w->prefill = 0;
+    w->ops = 0;
+    w->f = fopen(path, "wb");
+    if (w->f == NULL) {
+        perror(path);
+        return -1;
+    }
+    /* Placeholder; the counts are filled in on close. */
+    TraceHeader h;
+    fill_header(&h, 0, 0);
+    fwrite(&h, sizeof(h), 1, w->f);
+    return 0;
+}
+
+int trace_writer_close(TraceWriter* w) {
+    TraceHeader h;
+    fill_header(&h, w->prefill, w->ops);
+    int rc = 0;
+    if (fseek(w->f, 0, SEEK_SET) != 0 || fwrite(&h, sizeof(h), 1, w->f) != 1)
+        rc = -1;
+    if (fclose(w->f) != 0)
+        rc = -1;
+    if (rc != 0)
+        perror("trace");
+    w->f = NULL;
+    return rc;
+}
+
+int trace_open(TraceReader* r, const char* path) {
+    memset(r, 0, sizeof(*r));
+    int fd = open(path, O_RDONLY);
+    if (fd < 0) {
+        perror(path);
+        return -1;
+    }
+    struct stat st;
+    if (fstat(fd, &st) != 0 || (size_t)st.st_size < sizeof(TraceHeader)) {
+        fprintf(stderr, "%s: not a trace file\n", path);
+        close(fd);
+        return -1;
+    }
+    void* map = mmap(NULL, st.st_size, PROT_READ, MAP_PRIVATE | MAP_POPULATE, fd, 0);
+    close(fd);
+    if (map == MAP_FAILED) {
+        perror(path);
+        return -1;
+    }
+    const TraceHeader* h = map;
+    if (memcmp(h->magic, TRACE_MAGIC, sizeof(h->magic)) != 0 || h->version != TRACE_VERSION ||
+        h->record_size != sizeof(TraceRecord) ||
+        sizeof(*h) + (h->prefill + h->ops) * sizeof(TraceRecord) > (size_t)st.st_size) {
+        fprintf(stderr, "%s: not a trace file, or truncated\n", path);
+        munmap(map, st.st_size);
+        return -1;
+    }
+    madvise(map, st.st_size, MADV_SEQUENTIAL);
+    r->map = map;
+    r->map_len = st.st_size;
+    r->records = (const TraceRecord*)(h + 1);
+    r->prefill = h->prefill;
+    r->ops = h->ops;
+    /* Check the op codes once so the replay loop can trust them. */
+    for (uint64_t i = 0; i < r->prefill + r->ops; i++) {
+        if (r->records[i].op > 2 || (i < r->prefill && r->records[i].op != 0)) {
+            fprintf(stderr, "%s: bad op %u in record %llu\n", path, r->records[i].op,
+                    (unsigned long long)i);
+            trace_close(r);
+            return -1;
+        }
+    }
+    return 0;
+}
+
+void trace_close(TraceReader* r) {
+    if (r->map)
+        munmap(r->map, r->map_len);
+    r->map = NULL;
+}
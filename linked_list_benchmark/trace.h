@@ -0,0 +1,71 @@
+#ifndef TRACE_H
+#define TRACE_H
+
+#include <stdint.h>
+#include <stdio.h>
+
+/*
+ * Binary operation traces.
+ *
+ * A trace is a 32-byte header followed by 8-byte records: first the
+ * prefill inserts, then the workload operations in execution order.
+ * Records are fixed-size and aligned so a replay can mmap the file and
+ * walk it without parsing. trace_gen.py writes the same format.
+ *
+ *   header   magic "LLTRACE1", version, record size, prefill count, op count
+ *   record   op (0 insert, 1 search, 2 delete), 3 reserved bytes, int32 key
+ *
+ * All fields are little-endian.
+ */
+
+#define TRACE_MAGIC "LLTRACE1"
+#define TRACE_VERSION 1
+
+typedef struct TraceHeader {
+    char magic[8];
+    uint32_t version;
+    uint32_t record_size;
+    uint64_t prefill;
+    uint64_t ops;
+} TraceHeader;
+
+typedef struct TraceRecord {
+    uint8_t op;
+    uint8_t reserved[3];
+    int32_t key;
+} TraceRecord;
+
+typedef struct TraceWriter {
+    FILE* f;
+    uint64_t prefill;
+    uint64_t ops;
+} TraceWriter;
+
+typedef struct TraceReader {
+    const TraceRecord* records;   /* prefill records, then ops */
+    uint64_t prefill;
+    uint64_t ops;
+    size_t map_len;
+    void* map;
+} TraceReader;
+
+/* Each returns 0, or -1 after printing why. */
+int trace_writer_open(TraceWriter* w, const char* path);
+int trace_writer_close(TraceWriter* w);
+int trace_open(TraceReader* r, const char* path);
+void trace_close(TraceReader* r);
+
+/* Prefill records must all be written before the first op. */
+static inline void trace_write_prefill(TraceWriter* w, int key) {
+    TraceRecord rec = { 0, { 0, 0, 0 }, key };
+    fwrite(&rec, sizeof(rec), 1, w->f);
+    w->prefill++;
+}
+
+static inline void trace_write_op(TraceWriter* w, int op, int key) {
+    TraceRecord rec = { (uint8_t)op, { 0, 0, 0 }, key };
+    fwrite(&rec, sizeof(rec), 1, w->f);
+    w->ops++;
+}
+
+#endif
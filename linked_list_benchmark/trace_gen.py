@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Generate operation traces for the workload's --replay mode.
+
+Writes the format in trace.h: a 32-byte header, the prefill inserts, then
+the operations as 8-byte (op, key) records. The distributions match the
+workload's own: uniform, zipf (YCSB's generator, rank 0 hottest), hotset
+and sequential. Every build replaying the same trace sees the same prefill
+and the same key sequence.
+
+Examples:
+    ./trace_gen.py --ops 1000000 --mix 40/40/20 --dist zipf --zipf-theta 0.9 -o zipf.trace
+    ./trace_gen.py --info zipf.trace
+    ./main_optimised --replay zipf.trace --duration 0
+"""
+import argparse
+import struct
+import sys
+
+import numpy as np
+
+MAGIC = b"LLTRACE1"
+VERSION = 1
+HEADER = struct.Struct("<8sIIQQ")
+RECORD = np.dtype([("op", "u1"), ("reserved", "u1", 3), ("key", "<i4")])
+OP_NAMES = ("insert", "search", "delete")
+
+
+def zipf_keys(rng, n_keys, theta, count):
+    """Ranks 0..n_keys-1 drawn with Gray et al.'s zipf generator, as in keygen.c."""
+    ranks = np.arange(1, n_keys + 1, dtype=np.float64)
+    zetan = np.sum(ranks ** -theta)
+    zeta2 = 1.0 + 0.5 ** theta
+    alpha = 1.0 / (1.0 - theta)
+    eta = (1.0 - (2.0 / n_keys) ** (1.0 - theta)) / (1.0 - zeta2 / zetan)
+    u = rng.random(count)
+    uz = u * zetan
+    rank = (n_keys * (eta * u - eta + 1.0) ** alpha).astype(np.int64)
+    rank = np.where(uz < 1.0 + 0.5 ** theta, 1, rank)
+    rank = np.where(uz < 1.0, 0, rank)
+    return np.minimum(rank, n_keys - 1)
+
+
+def generate(args):
+    rng = np.random.default_rng(args.seed)
+    key_min, key_max = args.keys
+    n_keys = key_max - key_min + 1
+    mix = np.array(args.mix, dtype=np.float64) / 100.0
+
+    ops = rng.choice(3, size=args.ops, p=mix).astype(np.uint8)
+    if args.dist == "uniform":
+        keys = rng.integers(0, n_keys, size=args.ops)
+    elif args.dist == "zipf":
+        keys = zipf_keys(rng, n_keys, args.zipf_theta, args.ops)
+    elif args.dist == "hotset":
+        hot_keys = max(1, int(n_keys * args.hot_fraction))
+        hot = rng.random(args.ops) < args.hot_prob
+        keys = np.where(hot, rng.integers(0, hot_keys, size=args.ops),
+                        rng.integers(0, n_keys, size=args.ops))
+    else:
+        # Each operation type walks the range on its own; deletes start half
+        # way so they don't always hit the head.
+        keys = np.empty(args.ops, dtype=np.int64)
+        for op, start in ((0, 0), (1, 0), (2, n_keys // 2)):
+            idx = np.flatnonzero(ops == op)
+            keys[idx] = (start + np.arange(len(idx))) % n_keys
+
+    records = np.zeros(args.prefill + args.ops, dtype=RECORD)
+    records["key"][:args.prefill] = key_min + rng.integers(0, n_keys, size=args.prefill)
+    records["op"][args.prefill:] = ops
+    records["key"][args.prefill:] = key_min + keys
+    return records
+
+
+def write_trace(path, prefill, records):
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, RECORD.itemsize, prefill, len(records) - prefill))
+        f.write(records.tobytes())
+
+
+def read_trace(path):
+    with open(path, "rb") as f:
+        magic, version, record_size, prefill, ops = HEADER.unpack(f.read(HEADER.size))
+        if magic != MAGIC or version != VERSION or record_size != RECORD.itemsize:
+            raise SystemExit("%s is not a trace file" % path)
+        records = np.fromfile(f, dtype=RECORD, count=prefill + ops)
+    if len(records) != prefill + ops:
+        raise SystemExit("%s is truncated" % path)
+    return prefill, records
+
+
+def print_info(path):
+    prefill, records = read_trace(path)
+    ops = records[prefill:]
+    print("%s: prefill %d, ops %d" % (path, prefill, len(ops)))
+    for op, name in enumerate(OP_NAMES):
+        keys = ops["key"][ops["op"] == op]
+        if len(keys) == 0:
+            print("  %-7s 0" % name)
+            continue
+        _, counts = np.unique(keys, return_counts=True)
+        top = np.sort(counts)[::-1][:max(1, len(counts) // 100)].sum()
+        print("  %-7s %d (%.1f%%), %d distinct keys %d-%d, top 1%% of keys get %.1f%%"
+              % (name, len(keys), 100.0 * len(keys) / len(ops), len(counts),
+                 keys.min(), keys.max(), 100.0 * top / len(keys)))
+
+
+def parse_mix(text):
+    parts = [int(p) for p in text.replace(":", "/").replace(",", "/").split("/")]
+    if len(parts) != 3 or sum(parts) != 100 or min(parts) < 0:
+        raise argparse.ArgumentTypeError("mix must be three percentages adding up to 100")
+    return parts
+
+
+def parse_keys(text):
+    lo, hi = (int(p) for p in text.split("-"))
+    if lo > hi:
+        raise argparse.ArgumentTypeError("empty key range")
+    return lo, hi
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate linked list operation traces")
+    parser.add_argument("-o", "--output", type=str, help="Trace file to write")
+    parser.add_argument("--info", type=str, metavar="TRACE", help="Summarise an existing trace and exit")
+    parser.add_argument("--ops", type=int, default=1000000, help="Number of operations")
+    parser.add_argument("--mix", type=parse_mix, default=[40, 40, 20], help="Insert/search/delete percentages")
+    parser.add_argument("--prefill", type=int, default=300, help="Keys inserted before the operations")
+    parser.add_argument("--keys", type=parse_keys, default=(1, 10000), help="Key range MIN-MAX")
+    parser.add_argument("--dist", choices=["uniform", "zipf", "hotset", "sequential"], default="uniform")
+    parser.add_argument("--zipf-theta", type=float, default=0.99, help="Zipf skew, 0 < theta < 1")
+    parser.add_argument("--hot-fraction", type=float, default=0.1, help="Hotset: share of keys that are hot")
+    parser.add_argument("--hot-prob", type=float, default=0.9, help="Hotset: share of operations on hot keys")
+    parser.add_argument("--seed", type=int, default=1, help="Random seed")
+    args = parser.parse_args()
+
+    if args.info:
+        print_info(args.info)
+        return
+    if not args.output:
+        parser.error("give --output or --info")
+    if not 0 < args.zipf_theta < 1:
+        parser.error("--zipf-theta must be between 0 and 1")
+
+    records = generate(args)
+    write_trace(args.output, args.prefill, records)
+    print("Wrote %s: prefill %d, ops %d" % (args.output, args.prefill, args.ops), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,569 @@
+#!/usr/bin/env python3
+"""
+Composable runtime verification monitor.
+
+Builds one BPF program from the selected properties (see properties/) and
+attaches each probe once, whichever properties use it.
+
+With --attach uprobe (the default) entry probes record a per-thread
+operation context (struct op_ctx_t) that the hook and return probes of the
+same operation share, so the properties do not each keep their own per-tid
+maps. With --attach usdt the monitor uses the static probe points of a
+binary built with `make USDT=1` (see list_probes.h): one trap per operation,
+fired after the list has been updated, and no cost when nothing is attached.
+
+With --attach deferred no uretprobes are used. An operation's context stays
+in opctx and its post-conditions are checked by the next insert/delete entry
+probe on the same thread, which sees the list exactly as the return probe
+would have as long as no other thread changes it in between. That saves the
+uretprobe trampoline on every call. Whether a delete succeeded is taken from
+the head comparison at entry and the deletion hook instead of the return
+value.
+
+With --flight-recorder N the last N operations on each list are kept in BPF
+and dumped to a file when a check fires (see flight_recorder.py).
+
+The target can be an executable or a shared library: probes on
+../linked_list_lib/linked_list_lib.so cover every process that maps it,
+with one attachment per probe. --per-pid reports operations and violations
+per process at exit. Probes attach by address from symbol_cache.py, so
+starting a monitor does not search the symbol table again.
+
+With --precompiled DIR the program is loaded from an object built by
+bpf_precompile.py through libbpf instead of being compiled by BCC.
+
+Example:
+    sudo ./verif_monitor.py ./main_verif_optimised --properties insert-head,length
+"""
+import argparse, csv, ctypes, os, sys
+
+from violation_events import VIOLATION_BPF, ViolationConsumer
+from probe_stats import probe_stats_bpf, ProbeStats, ProbeStat, IntervalReporter, LiveReporter
+from sampling import SAMPLING_BPF, add_sampling_arguments, sampling_ticks, print_sampling_summary
+from properties import PROPERTIES
+from flight_recorder import FlightRecorder
+from symbol_cache import symbol_addresses
+
+# Hook points, in probe index order: (name, operation, attach kind, symbol).
+HOOKS = [
+    ("insert_entry", "insert", "uprobe", "{prefix}_insert"),
+    ("insert_return", "insert", "uretprobe", "{prefix}_insert"),
+    ("delete_entry", "delete", "uprobe", "{prefix}_delete"),
+    ("delete_hook", "delete", "uprobe", "{hook_symbol}"),
+    ("delete_return", "delete", "uretprobe", "{prefix}_delete"),
+    ("search_entry", "search", "uprobe", "{prefix}_search"),
+    ("search_return", "search", "uretprobe", "{prefix}_search"),
+]
+
+# USDT probe points, indexed after HOOKS: (name, operation, probe, arguments).
+USDT_HOOKS = [
+    ("usdt_insert_done", "insert", "insert_done", ["head_addr", "node", "value_arg"]),
+    ("usdt_delete_unlink", "delete", "delete_unlink", ["head_addr", "pred", "target", "succ", "value_arg"]),
+    ("usdt_delete_miss", "delete", "delete_miss", ["head_addr", "value_arg"]),
+    ("usdt_search_hit", "search", "search_hit", ["first", "value_arg", "node"]),
+    ("usdt_search_miss", "search", "search_miss", ["first", "value_arg"]),
+]
+NUM_PROBES = len(HOOKS) + len(USDT_HOOKS)
+
+# --prefix default per target file name; any other target uses verif_optimised.
+# The shared library's functions have no prefix.
+TARGET_PREFIXES = {
+    "main_baseline": "baseline",
+    "main_optimised": "optimised",
+    "main_verif_optimised": "verif_optimised",
+    "linked_list_lib.so": "",
+}
+
+HEADER = r"""
+#include <uapi/linux/ptrace.h>
+
+// --- Process filters (0 = any) ---
+#define FILTER_PID %(pid)d
+#define FILTER_CGROUP %(cgroup)dULL
+
+static inline int monitor_skip(void) {
+    if (FILTER_PID && (bpf_get_current_pid_tgid() >> 32) != FILTER_PID)
+        return 1;
+    if (FILTER_CGROUP && bpf_get_current_cgroup_id() != FILTER_CGROUP)
+        return 1;
+    return 0;
+}
+
+// Per-list state is keyed by (pid, address): uprobes fire in every process
+// running the binary, and forked children reuse their parent's addresses.
+struct pid_addr_t {
+    u32 pid;
+    u32 pad;
+    u64 addr;
+};
+
+static inline struct pid_addr_t pid_addr(u64 addr) {
+    struct pid_addr_t k = {};
+    k.pid = bpf_get_current_pid_tgid() >> 32;
+    k.addr = addr;
+    return k;
+}
+
+// --- Per-operation context shared by every enabled property ---
+#define OP_INSERT 1
+#define OP_DELETE 2
+#define OP_SEARCH 3
+struct op_ctx_t {
+    u64 head_addr;  // searches: the first node
+    int arg;
+    u32 sampled;
+    u32 op;
+    u32 found;  // deferred mode: the delete found its value
+%(fields)s
+};
+BPF_HASH(opctx, u32, struct op_ctx_t, %(max_threads)d);
+// Head of each list as of the last insert/delete seen (USDT mode).
+BPF_HASH(usdt_heads, struct pid_addr_t, u64, %(max_lists)d);
+
+// --- Operations per process (--per-pid) ---
+#define PER_PID %(per_pid)d
+struct pid_ops_t {
+    u64 ops[4];  // indexed by OP_*
+};
+BPF_LRU_HASH(pid_ops, u32, struct pid_ops_t, %(max_pids)d);
+
+static inline void count_pid_op(u32 op) {
+    if (!PER_PID)
+        return;
+    u32 pid = bpf_get_current_pid_tgid() >> 32;
+    struct pid_ops_t *p = pid_ops.lookup(&pid);
+    if (!p) {
+        struct pid_ops_t zero = {};
+        pid_ops.update(&pid, &zero);
+        p = pid_ops.lookup(&pid);
+        if (!p)
+            return;
+    }
+    // Shared by every CPU running this process.
+    if (op < 4)
+        __sync_fetch_and_add(&p->ops[op], 1);
+}
+"""
+
+ENTRY_PROBE = r"""
+int on_%(name)s(struct pt_regs *ctx) {
+    if (monitor_skip())
+        return 0;
+    BEGIN_PROBE();
+    u32 tid = bpf_get_current_pid_tgid();
+    struct op_ctx_t entry_c = {};
+    struct op_ctx_t *c = &entry_c;
+    c->head_addr = PT_REGS_PARM1(ctx);
+    c->arg = PT_REGS_PARM2(ctx);
+    c->sampled = sample_op();
+    c->op = %(op)s;
+    count_pid_op(c->op);
+%(deferred)s
+%(body)s
+    opctx.update(&tid, c);
+    END_PROBE(PROBE_ID);
+    return 0;
+}
+"""
+
+HOOK_PROBE = r"""
+int on_%(name)s(struct pt_regs *ctx) {
+    if (monitor_skip())
+        return 0;
+    BEGIN_PROBE();
+    u32 tid = bpf_get_current_pid_tgid();
+    struct op_ctx_t *c = opctx.lookup(&tid);
+    if (!c) {
+        END_PROBE(PROBE_ID);
+        return 0;
+    }
+%(body)s
+    END_PROBE(PROBE_ID);
+    return 0;
+}
+"""
+
+RETURN_PROBE = r"""
+int on_%(name)s(struct pt_regs *ctx) {
+    if (monitor_skip())
+        return 0;
+    BEGIN_PROBE();
+    u32 tid = bpf_get_current_pid_tgid();
+    struct op_ctx_t *c = opctx.lookup(&tid);
+    if (!c) {
+        END_PROBE(PROBE_ID);
+        return 0;
+    }
+    int ret = PT_REGS_RC(ctx);
+%(body)s
+    opctx.delete(&tid);
+    END_PROBE(PROBE_ID);
+    return 0;
+}
+"""
+
+# USDT fragments see head_addr, first, node, pred, target, succ, value
+# (whichever the probe provides), lkey (the list's pid_addr_t), sampled and
+# PROBE_ID.
+USDT_PROBE = r"""
+int on_%(name)s(struct pt_regs *ctx) {
+    if (monitor_skip())
+        return 0;
+    BEGIN_PROBE();
+    u64 head_addr = 0, first = 0, node = 0, pred = 0, target = 0, succ = 0, value_arg = 0;
+%(readargs)s
+    struct pid_addr_t lkey = pid_addr(head_addr);
+    int value = (int)value_arg;
+    u32 sampled = sample_op();
+    count_pid_op(%(op)s);
+%(body)s
+%(epilogue)s
+    END_PROBE(PROBE_ID);
+    return 0;
+}
+"""
+
+# Deferred mode: return fragments run from the next entry probe on the thread.
+# The return probe IDs are kept so violations name the check that failed.
+DEFERRED_FLUSH = r"""
+// --- Deferred post-conditions ---
+static inline void flush_pending(u32 tid) {
+    struct op_ctx_t *c = opctx.lookup(&tid);
+    if (!c)
+        return;
+    int ret = c->found;
+    if (c->op == OP_INSERT) {
+#define PROBE_ID 1
+%(insert_return)s
+#undef PROBE_ID
+    } else if (c->op == OP_DELETE) {
+#define PROBE_ID 4
+%(delete_return)s
+#undef PROBE_ID
+    }
+    opctx.delete(&tid);
+}
+"""
+
+# Head deletions are recognised at entry; deeper ones set found in the hook.
+DEFERRED_DELETE_FOUND = r"""
+    {
+        u64 head = 0;
+        bpf_probe_read_user(&head, sizeof(head), (void*)c->head_addr);
+        if (head) {
+            int val = 0;
+            bpf_probe_read_user(&val, sizeof(val), (void*)head);
+            c->found = val == c->arg;
+        }
+    }
+"""
+
+USDT_EPILOGUE = {
+    "usdt_insert_done": "    usdt_heads.update(&lkey, &node);",
+    "usdt_delete_unlink": "    if (pred == 0)\n        usdt_heads.update(&lkey, &succ);",
+}
+
+
+def active_hooks(props, deferred=False, per_pid=False):
+    """
+    Indices into HOOKS that need a probe for the given properties. per_pid
+    probes every operation so the per-process counts cover all of them.
+    """
+    used = {hook for p in props for hook in p.hooks}
+    ops = {op for name, op, _, _ in HOOKS if name in used}
+    # Operations whose entry (and, outside deferred mode, return) is probed.
+    probed = {op for _, op, _, _ in HOOKS} if per_pid else ops
+    active = []
+    for idx, (name, op, kind, _) in enumerate(HOOKS):
+        if deferred:
+            # Every insert/delete entry probe flushes, so a pending check never
+            # sees a list changed by an unmonitored operation; the hook is
+            # needed to know whether a delete succeeded. Searches change
+            # nothing and are only probed when something uses them or
+            # per_pid counts them.
+            if (kind == "uretprobe" or (op not in ops and name.endswith("_hook"))
+                    or (op == "search" and op not in probed)):
+                continue
+            active.append(idx)
+        # Entry and return probes own the context, so they are needed whenever
+        # any hook of their operation is used.
+        elif name in used or (op in probed and not name.endswith("_hook")):
+            active.append(idx)
+    return active
+
+
+def active_usdt_hooks(props, per_pid=False):
+    """
+    Indices (offset by len(HOOKS)) of the USDT probes the given properties
+    need. per_pid takes every probe: each operation ends in exactly one of
+    them, so together they count inserts, deletes and searches.
+    """
+    used = {hook for p in props for hook in p.usdt_hooks}
+    if per_pid:
+        used |= {hook[0] for hook in USDT_HOOKS}
+    if used & {"usdt_insert_done", "usdt_delete_unlink"}:
+        # Both keep usdt_heads current, so they come as a pair.
+        used |= {"usdt_insert_done", "usdt_delete_unlink"}
+    return [len(HOOKS) + i for i, hook in enumerate(USDT_HOOKS) if hook[0] in used]
+
+
+def build_usdt_probes(props, active):
+    parts = []
+    for idx in active:
+        name, op, _, arguments = USDT_HOOKS[idx - len(HOOKS)]
+        readargs = "\n".join("    bpf_usdt_readarg(%d, ctx, &%s);" % (i + 1, arg)
+                             for i, arg in enumerate(arguments))
+        body = "".join(p.usdt_hooks.get(name, "") for p in props)
+        parts.append("#define PROBE_ID %d" % idx)
+        parts.append(USDT_PROBE % {"name": name, "readargs": readargs, "body": body, "op": "OP_" + op.upper(),
+                                   "epilogue": USDT_EPILOGUE.get(name, "")})
+        parts.append("#undef PROBE_ID")
+    return parts
+
+
+def build_program(props, attach="uprobe", pid=0, cgroup_id=0, max_threads=10240, max_lists=1024, max_pids=0):
+    """
+    Return (bpf_text, active probe indices) for the given property instances.
+    max_pids > 0 counts operations per process for that many processes.
+    """
+    header = HEADER % {
+        "fields": "\n".join("    " + p.context_fields for p in props if p.context_fields),
+        "pid": pid,
+        "cgroup": cgroup_id,
+        "max_threads": max_threads,
+        "max_lists": max_lists,
+        "per_pid": int(max_pids > 0),
+        "max_pids": max(max_pids, 1),
+    }
+    parts = [VIOLATION_BPF, probe_stats_bpf(NUM_PROBES), SAMPLING_BPF, header]
+    parts += [p.bpf_text() for p in props]
+    if attach == "usdt":
+        active = active_usdt_hooks(props, max_pids > 0)
+        return "\n".join(parts + build_usdt_probes(props, active)), active
+    deferred = attach == "deferred"
+    if deferred:
+        parts.append(DEFERRED_FLUSH % {
+            name: "".join(p.hooks.get(name, "") for p in props)
+            for name in ("insert_return", "delete_return")
+        })
+    active = active_hooks(props, deferred, max_pids > 0)
+    for idx in active:
+        name, op = HOOKS[idx][:2]
+        body = "".join(p.hooks.get(name, "") for p in props)
+        extra = ""
+        if name.endswith("_entry"):
+            template = ENTRY_PROBE
+            if deferred:
+                extra = "    flush_pending(tid);\n"
+                if op == "delete":
+                    extra += DEFERRED_DELETE_FOUND
+        elif name.endswith("_return"):
+            template = RETURN_PROBE
+        else:
+            template = HOOK_PROBE
+            if deferred:
+                body = "    c->found = 1;\n" + body
+        parts.append("#define PROBE_ID %d" % idx)
+        parts.append(template % {"name": name, "body": body, "op": "OP_" + op.upper(), "deferred": extra})
+        parts.append("#undef PROBE_ID")
+    return "\n".join(parts), active
+
+
+def build_parser(**defaults):
+    parser = argparse.ArgumentParser(
+        description="Runtime verification of linked list operations from composable properties"
+    )
+    parser.add_argument("binary", help="Path to the target binary (e.g., ./main_verif_optimised)")
+    parser.add_argument("--properties", default="insert-head,delete-link,length",
+                        help="Comma-separated properties to check (available: %s)" % ", ".join(PROPERTIES))
+    parser.add_argument("--attach", choices=("uprobe", "usdt", "deferred"), default="uprobe",
+                        help="uprobe: entry/return probes on the list functions; usdt: static probes "
+                             "of a binary built with make USDT=1; deferred: entry probes only, each "
+                             "checking the thread's previous operation")
+    parser.add_argument("--precompiled", metavar="DIR",
+                        help="Load the object built for this configuration by bpf_precompile.py from DIR "
+                             "instead of compiling with BCC (uprobe and deferred attach only)")
+    parser.add_argument("--prefix",
+                        help="Symbol prefix of the list functions (<prefix>_insert, <prefix>_delete); "
+                             "empty for unprefixed symbols (default: from the target name, e.g. none for "
+                             "linked_list_lib.so, otherwise verif_optimised)")
+    parser.add_argument("--hook-symbol", default="deletion_instrumentation",
+                        help="Deletion hook called with (pred, target, succ)")
+    parser.add_argument("--pid", type=int, default=0,
+                        help="Only monitor this process (uprobes are attached to it alone)")
+    parser.add_argument("--cgroup", help="Only monitor processes in this cgroup v2 directory")
+    parser.add_argument("--max-lists", type=int, default=1024,
+                        help="Lists (per process and head address) the per-list maps can hold (default: %(default)s)")
+    parser.add_argument("--per-pid", action="store_true",
+                        help="Count operations per process and print them with each process's violations at exit")
+    parser.add_argument("--max-pids", type=int, default=4096,
+                        help="Processes --per-pid keeps counts for; the least recently used are dropped "
+                             "(default: %(default)s)")
+    parser.add_argument("--max-threads", type=int, default=10240,
+                        help="Threads with an operation in flight the context map can hold (default: %(default)s)")
+    parser.add_argument("--duration", type=float, default=0,
+                        help="Stop after N seconds (0 = run until Ctrl+C)")
+    parser.add_argument("--csv", help="Combined total probe time CSV (default: combined_total_time_<properties>.csv)")
+    parser.add_argument("--violations-out", help="Write violation records to this CSV file instead of stdout")
+    parser.add_argument("--stats-interval", type=float, default=0,
+                        help="Print merged probe timing percentiles every N seconds (0 = only at exit)")
+    parser.add_argument("--live", type=float, default=0, metavar="SECONDS",
+                        help="Every N seconds print hits/s, ns/hit and violations/s per probe and the "
+                             "estimated overhead (0 = off)")
+    parser.add_argument("--live-json", metavar="PATH",
+                        help="Write the --live samples as JSON lines to PATH ('-' for stdout) instead "
+                             "(implies --live 1 if not given)")
+    parser.add_argument("--stats-out", help="Write per-probe count/total/p50/p99/max to this CSV file at exit")
+    add_sampling_arguments(parser)
+    for prop in PROPERTIES.values():
+        prop.add_arguments(parser)
+    FlightRecorder.add_arguments(parser)
+    parser.set_defaults(**defaults)
+    return parser
+
+
+def parse_properties(spec):
+    names = [n.strip() for n in spec.split(",") if n.strip()]
+    unknown = [n for n in names if n not in PROPERTIES]
+    if unknown or not names:
+        raise SystemExit("Unknown or empty property list %r (available: %s)" % (spec, ", ".join(PROPERTIES)))
+    # Fragments run in registry order regardless of the order given.
+    return [name for name in PROPERTIES if name in names]
+
+
+def program_for_args(argv=None, **defaults):
+    """Parse monitor arguments; return (args, property instances, bpf_text, active probes)."""
+    args = build_parser(**defaults).parse_args(argv)
+    if args.prefix is None:
+        args.prefix = TARGET_PREFIXES.get(os.path.basename(args.binary), "verif_optimised")
+    props = [PROPERTIES[name](args) for name in parse_properties(args.properties)]
+    if args.flight_recorder:
+        # Last, so its fragments see the violations the checks just reported.
+        props.append(FlightRecorder(args))
+    # A cgroup v2 directory's inode number is its cgroup id.
+    cgroup_id = os.stat(args.cgroup).st_ino if args.cgroup else 0
+    bpf_text, active = build_program(props, args.attach, args.pid, cgroup_id, args.max_threads, args.max_lists,
+                                     args.max_pids if args.per_pid else 0)
+    return args, props, bpf_text, active
+
+
+def hook_symbol(template, args):
+    symbol = template.format(prefix=args.prefix, hook_symbol=args.hook_symbol)
+    return symbol if args.prefix or not template.startswith("{prefix}_") else symbol[1:]
+
+
+def attach_hooks(b, args, active):
+    """Attach the uprobe/uretprobe programs; return {probe index: name}."""
+    symbols = {idx: hook_symbol(HOOKS[idx][3], args) for idx in active}
+    addrs = symbol_addresses(args.binary, set(symbols.values()))
+    probe_names = {}
+    for idx in active:
+        name, _, kind, _ = HOOKS[idx]
+        attach = b.attach_uprobe if kind == "uprobe" else b.attach_uretprobe
+        attach(name=args.binary, addr=addrs[symbols[idx]], fn_name="on_" + name, pid=args.pid or -1)
+        probe_names[idx] = "on_" + name
+    return probe_names
+
+
+class PidOps(ctypes.Structure):
+    # Must match struct pid_ops_t.
+    _fields_ = [("ops", ctypes.c_uint64 * 4)]
+
+
+def print_pid_report(b, writer):
+    """Operations and violations per process; exited processes stay listed."""
+    ops = {k.value: list(v.ops) for k, v in b["pid_ops"].items()}
+    print("%8s %12s %12s %12s %10s" % ("pid", "inserts", "deletes", "searches", "violations"))
+    for pid in sorted(set(ops) | set(writer.by_pid)):
+        counts = ops.get(pid, [0] * 4)
+        print("%8d %12d %12d %12d %10d" % (pid, counts[1], counts[2], counts[3], writer.by_pid[pid]))
+
+
+def load_precompiled(args, bpf_text, props=()):
+    from bpf_precompile import object_path
+    from libbpf_loader import LibbpfObject
+    if args.attach == "usdt":
+        raise SystemExit("--precompiled does not support --attach usdt")
+    path = object_path(args.precompiled, bpf_text)
+    if not os.path.exists(path):
+        raise SystemExit("No precompiled object for this configuration (%s); build it with "
+                         "./bpf_precompile.py --out-dir %s -- <these monitor arguments>" % (path, args.precompiled))
+    value_types = {"probe_stats": ProbeStat, "pid_ops": PidOps}
+    for prop in props:
+        value_types.update(prop.value_types)
+    return LibbpfObject(path, value_types=value_types)
+
+
+def load_monitor(args, bpf_text, active, props=()):
+    """Load the program and attach its probes; return (b, {probe index: name})."""
+    if args.precompiled:
+        b = load_precompiled(args, bpf_text, props)
+        return b, attach_hooks(b, args, active)
+    from bcc import BPF, USDT
+    if args.attach != "usdt":
+        b = BPF(text=bpf_text)
+        return b, attach_hooks(b, args, active)
+    # BCC attaches by path and has the kernel bump each probe's semaphore.
+    probe_names = {}
+    usdt = USDT(path=args.binary, pid=args.pid) if args.pid else USDT(path=args.binary)
+    for idx in active:
+        name, _, probe, _ = USDT_HOOKS[idx - len(HOOKS)]
+        usdt.enable_probe(probe=probe, fn_name="on_" + name)
+        probe_names[idx] = "on_" + name
+    return BPF(text=bpf_text, usdt_contexts=[usdt]), probe_names
+
+
+def main(argv=None, **defaults):
+    args, props, bpf_text, active = program_for_args(argv, **defaults)
+    names = [p.name for p in props if p.name in PROPERTIES]
+    b, probe_names = load_monitor(args, bpf_text, active, props)
+
+    violation_names = dict(probe_names)
+    if args.attach == "deferred":
+        violation_names.update({1: "deferred insert_return", 4: "deferred delete_return"})
+    consumer = ViolationConsumer(b, violation_names, out_path=args.violations_out)
+    stats = ProbeStats(b, probe_names)
+    ticks = [IntervalReporter(stats, args.stats_interval)] + sampling_ticks(b, stats, args)
+    ticks += [tick for prop in props for tick in prop.ticks(b)]
+    live_out = None
+    if args.live_json:
+        live_out = sys.stdout if args.live_json == "-" else open(args.live_json, "w")
+    if args.live or live_out:
+        ticks.append(LiveReporter(stats, args.live or 1.0, consumer.writer, args.trap_cost_ns, live_out))
+
+    print("Checking %s with %d probes on %s. Ctrl+C to exit." % (", ".join(names), len(active), args.binary))
+    consumer.run(duration=args.duration, on_tick=ticks)
+    consumer.close()
+    if live_out not in (None, sys.stdout):
+        live_out.close()
+    print("Exiting...")
+
+    print("Aggregated probe timings:")
+    rows = stats.print_report()
+    combined_total = stats.combined_total(rows)
+    if args.stats_out:
+        stats.write_csv(args.stats_out, rows)
+    for prop in props:
+        prop.report(b)
+    print_sampling_summary(b)
+    if args.per_pid:
+        print_pid_report(b, consumer.writer)
+    if args.attach == "deferred":
+        # The last operation of each thread had no later entry to check it.
+        print("Deferred: %d operations still pending at exit (not checked)" % len(b["opctx"]))
+    print("Combined total time for all probes: %d ns (%.6f seconds)" % (combined_total, combined_total/1e9))
+
+    csv_file = args.csv or "combined_total_time_%s.csv" % "_".join(n.replace("-", "") for n in names)
+    with open(csv_file, "w", newline="") as f:
+        fieldnames = ["combined_total_time_ns", "combined_total_time_seconds"]
+        writer = csv.DictWriter(f, fieldnames=fieldnames)
+        writer.writeheader()
+        writer.writerow({
+            "combined_total_time_ns": combined_total,
+            "combined_total_time_seconds": combined_total/1e9
+        })
+    print("Combined total time has been written to '%s'" % csv_file)
+
+
+if __name__ == "__main__":
+    main()
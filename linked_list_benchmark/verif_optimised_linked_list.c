@@ -2,6 +2,8 @@
 #include <stdlib.h>
 #include <stdbool.h>
 #include "verif_optimised_linked_list.h"
+#include "list_probes.h"
+#include "list_stats.h"
 #include <emmintrin.h>
 
 #define NODE_CHUNK_SIZE 100000
@@ -14,6 +16,8 @@ VerifOptimisedChunk* verif_pool_chunks = NULL;
 #define likely(x)   __builtin_expect((x), 1)
 #define unlikely(x) __builtin_expect((x), 0)
 
+LIST_PROBES_DEFINE_SEMAPHORES;
+
 __attribute__((noinline, used, externally_visible))
 void deletion_instrumentation(void *pred, void *target, void *succ) {
     volatile int dummy = 0;
@@ -40,6 +44,7 @@ void verif_optimised_allocate_pool_chunk() {
         new_chunk[i].next_free = verif_node_pool;
         verif_node_pool = &new_chunk[i];
     }
+    LIST_STATS_CHUNK(NODE_CHUNK_SIZE);
 }
 
 static inline void verif_optimised_return_node(VerifOptimisedNode* node) {
@@ -68,27 +73,38 @@ void verif_optimised_insert(VerifOptimisedNode** head, int data) {
     new_node->data = data;
     new_node->next = *head;
     *head = new_node;
+    LIST_PROBE_INSERT_DONE(head, new_node, data);
+    LIST_STATS_INSERT();
 }
 
 int verif_optimised_delete(VerifOptimisedNode** head, int data) {
     if (*head != NULL && (*head)->data == data) {
         VerifOptimisedNode* temp = *head;
         _mm_stream_si64((long long*)head, (long long)(*head)->next);
+        LIST_PROBE_DELETE_UNLINK(head, NULL, temp, temp->next, data);
         verif_optimised_return_node(temp);
+        LIST_STATS_DELETE(1, 1);
         return 1; // Deletion successful.
     }
     VerifOptimisedNode* prev = *head;
     VerifOptimisedNode* temp = (*head != NULL) ? (*head)->next : NULL;
+    unsigned long steps = 1;
     while (temp != NULL) {
+        steps++;
         if (temp->data == data) {
-            deletion_instrumentation(prev, temp, temp->next);
-            prev->next = temp->next;
+            VerifOptimisedNode* succ = temp->next;
+            LIST_DELETE_HOOK(prev, temp, succ);
+            prev->next = succ;
+            LIST_PROBE_DELETE_UNLINK(head, prev, temp, succ, data);
             verif_optimised_return_node(temp);
+            LIST_STATS_DELETE(1, steps);
             return 1; // Deletion successful.
         }
         prev = temp;
         temp = temp->next;
     }
+    LIST_PROBE_DELETE_MISS(head, data);
+    LIST_STATS_DELETE(0, *head != NULL ? steps : 0);
     return 0; // Node not found.
 }
 
@@ -103,10 +119,17 @@ void verif_optimised_show(VerifOptimisedNode* head) {
 
 VerifOptimisedNode* verif_optimised_search(VerifOptimisedNode* head, int data) {
     VerifOptimisedNode* current = head;
+    unsigned long steps = 0;
     while (likely(current != NULL)) {
-        if (current->data == data)
+        steps++;
+        if (current->data == data) {
+            LIST_PROBE_SEARCH_HIT(head, data, current);
+            LIST_STATS_SEARCH(1, steps);
             return current;
+        }
         current = current->next;
     }
+    LIST_PROBE_SEARCH_MISS(head, data);
+    LIST_STATS_SEARCH(0, steps);
     return NULL;
 }
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Structured violation reporting shared by the BCC monitors.
+
+Probes call report_violation() to push a fixed-size record into a BPF ring
+buffer instead of formatting a string through bpf_trace_printk (which goes
+through the global, lock-serialised trace_pipe). Records are submitted
+without waking the reader; ViolationConsumer drains the buffer in batches
+on a timer and hands each record to a file writer or a callback.
+"""
+import collections
+import csv
+import ctypes
+import sys
+import time
+
+# Violation kinds. The BPF side gets these as #defines generated below so
+# the two sides cannot drift apart.
+VIOLATION_KINDS = {
+    1: "insert_null_head",
+    2: "insert_value_mismatch",
+    3: "insert_next_mismatch",
+    4: "delete_head_link",
+    5: "delete_mid_link",
+    6: "length_mismatch",
+    7: "delete_target_not_live",
+    8: "delete_value_mismatch",
+    9: "delete_missed_live_value",
+    10: "insert_not_at_head",
+    11: "search_hit_not_live",
+    12: "search_missed_live_value",
+    # Reported by snapshot_verifier.py rather than by probes.
+    13: "list_cycle",
+    14: "node_not_in_pool",
+    15: "pool_count_mismatch",
+    16: "node_live_and_free",
+}
+# Kinds whose expected/observed fields hold user-space pointers.
+POINTER_KINDS = {3, 4, 5, 7, 10, 11, 13, 14, 16}
+
+_KIND_MACROS = "\n".join(
+    "#define VIOL_%s %d" % (name.upper(), kind) for kind, name in VIOLATION_KINDS.items()
+)
+
+VIOLATION_BPF = _KIND_MACROS + r"""
+
+// --- Structured violation records ---
+struct violation_t {
+    u64 ts_ns;
+    u64 head_addr;
+    s64 expected;
+    s64 observed;
+    u32 pid;
+    u32 tid;
+    u32 probe_id;
+    u32 kind;
+};
+
+// 64 pages; the consumer drains it in batches so wakeups are suppressed.
+BPF_RINGBUF_OUTPUT(violations, 64);
+// Records lost because the ring buffer was full.
+BPF_PERCPU_ARRAY(violation_drops, u64, 1);
+// Violations reported on each CPU, so code later in the same probe can tell
+// that a check fired (see flight_recorder.py).
+BPF_PERCPU_ARRAY(violation_seq, u64, 1);
+
+static inline void report_violation(u32 probe_id, u32 kind, u64 head_addr, s64 expected, s64 observed) {
+    struct violation_t v = {};
+    u64 id = bpf_get_current_pid_tgid();
+    v.ts_ns = bpf_ktime_get_ns();
+    v.head_addr = head_addr;
+    v.expected = expected;
+    v.observed = observed;
+    v.pid = id >> 32;
+    v.tid = (u32)id;
+    v.probe_id = probe_id;
+    v.kind = kind;
+    u32 zero = 0;
+    u64 *seq = violation_seq.lookup(&zero);
+    if (seq)
+        (*seq)++;
+    if (violations.ringbuf_output(&v, sizeof(v), BPF_RB_NO_WAKEUP) != 0) {
+        u64 *drops = violation_drops.lookup(&zero);
+        if (drops)
+            (*drops)++;
+    }
+}
+"""
+
+
+class Violation(ctypes.Structure):
+    # Must match struct violation_t above.
+    _fields_ = [
+        ("ts_ns", ctypes.c_uint64),
+        ("head_addr", ctypes.c_uint64),
+        ("expected", ctypes.c_int64),
+        ("observed", ctypes.c_int64),
+        ("pid", ctypes.c_uint32),
+        ("tid", ctypes.c_uint32),
+        ("probe_id", ctypes.c_uint32),
+        ("kind", ctypes.c_uint32),
+    ]
+
+
+FIELDNAMES = ["ts_ns", "pid", "tid", "probe", "kind", "head_addr", "expected", "observed"]
+
+
+def format_value(kind, value):
+    """expected/observed as printed: hex for pointer kinds."""
+    if kind in POINTER_KINDS:
+        return "0x%x" % (value & 0xffffffffffffffff)
+    return str(value)
+
+
+class ViolationWriter:
+    """
+    Sends violation rows (dicts with FIELDNAMES keys) to `callback` if
+    given, otherwise appends them as CSV rows to `out_path`, or prints them
+    to stdout when neither is set.
+    """
+
+    def __init__(self, out_path=None, callback=None):
+        self.callback = callback
+        self.count = 0
+        self.by_pid = collections.Counter()
+        self.by_probe = collections.Counter()
+        self._out = None
+        self._writer = None
+        if callback is None and out_path:
+            self._out = open(out_path, "w", newline="")
+            self._writer = csv.DictWriter(self._out, fieldnames=FIELDNAMES)
+            self._writer.writeheader()
+
+    def write(self, row):
+        self.count += 1
+        self.by_pid[row["pid"]] += 1
+        self.by_probe[row["probe"]] += 1
+        if self.callback is not None:
+            self.callback(row)
+        elif self._writer is not None:
+            self._writer.writerow(row)
+        else:
+            print("VIOLATION %(kind)s in %(probe)s: expected %(expected)s, observed %(observed)s "
+                  "(pid %(pid)d tid %(tid)d head %(head_addr)s)" % row)
+
+    def flush(self):
+        if self._out is not None:
+            self._out.flush()
+
+    def close(self):
+        if self._out is not None:
+            self._out.close()
+            self._out = None
+
+
+class ViolationConsumer:
+    """
+    Drains the `violations` ring buffer of a loaded BPF object.
+
+    Each record is converted to a dict (see FIELDNAMES) and handed to a
+    ViolationWriter.
+    """
+
+    def __init__(self, b, probe_names, out_path=None, callback=None, batch_interval=0.1):
+        self.b = b
+        self.probe_names = probe_names
+        self.batch_interval = batch_interval
+        self.writer = ViolationWriter(out_path, callback)
+        b["violations"].open_ring_buffer(self._handle)
+
+    @property
+    def count(self):
+        return self.writer.count
+
+    def _handle(self, ctx, data, size):
+        v = ctypes.cast(data, ctypes.POINTER(Violation)).contents
+        self.writer.write({
+            "ts_ns": v.ts_ns,
+            "pid": v.pid,
+            "tid": v.tid,
+            "probe": self.probe_names.get(v.probe_id, str(v.probe_id)),
+            "kind": VIOLATION_KINDS.get(v.kind, str(v.kind)),
+            "head_addr": "0x%x" % v.head_addr,
+            "expected": format_value(v.kind, v.expected),
+            "observed": format_value(v.kind, v.observed),
+        })
+
+    def drain(self):
+        """Consume every record currently in the ring buffer."""
+        self.b.ring_buffer_consume()
+        self.writer.flush()
+
+    def dropped(self):
+        return sum(self.b["violation_drops"][0])
+
+    def run(self, duration=None, on_tick=()):
+        """
+        Drain in batches until Ctrl+C (or `duration` seconds). Every callable
+        in `on_tick` is called after each batch with the current time.
+        """
+        deadline = time.time() + duration if duration else None
+        try:
+            while deadline is None or time.time() < deadline:
+                time.sleep(self.batch_interval)
+                self.drain()
+                now = time.time()
+                for tick in on_tick:
+                    tick(now)
+        except KeyboardInterrupt:
+            pass
+        self.drain()
+
+    def close(self):
+        self.drain()
+        self.writer.close()
+        drops = self.dropped()
+        print("Violations reported: %d (dropped: %d)" % (self.count, drops), file=sys.stderr)
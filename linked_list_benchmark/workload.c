@@ -1,85 +1,405 @@
 #include <stdio.h>
 #include <stdlib.h>
+#include <string.h>
 #include <time.h>
+#include <getopt.h>
 #include <sys/time.h>
 #include <sys/resource.h>
 #include "workload.h"
+#include "latency_hist.h"
+#include "timing.h"
+#include "perf_counters.h"
 #include "list_interface.h"
 
+enum { OP_INSERT, OP_SEARCH, OP_DELETE };
+
 // Returns a random value between min and max (inclusive)
 int random_in_range(int min, int max) {
     return rand() % (max - min + 1) + min;
 }
 
-void run_workload(Node** head, int insert_percentage, int search_percentage, int delete_percentage, int duration_seconds) {
-    int total_operations = 0;
-    int insert_count = 0, search_count = 0, delete_count = 0;
-    double insert_time = 0.0, search_time = 0.0, delete_time = 0.0;
-    
-    // Set up cycling for insertion and deletion.
-    int insert_value = 1;
-    // Start deletions at a different value so they don't always target the head.
-    int delete_value = 6010;  
-    
-    // Variables to measure each operation's time.
-    struct timespec op_start, op_end;
-    double diff = 0.0;
-    
-    // Variables to check the process's user CPU time.
+void workload_default_config(WorkloadConfig* cfg) {
+    cfg->insert_percent = 40;
+    cfg->search_percent = 40;
+    cfg->delete_percent = 20;
+    cfg->prefill = 300;
+    cfg->key_min = 1;
+    cfg->key_max = 10000;
+    cfg->dist = DIST_UNIFORM;
+    cfg->zipf_theta = 0.99;
+    cfg->hot_fraction = 0.1;
+    cfg->hot_probability = 0.9;
+    cfg->duration = 10;
+    cfg->max_ops = 0;
+    cfg->batch = 0;
+    cfg->check_every = 1024;
+    cfg->counters = 0;
+    cfg->seed = 0;
+    cfg->record_path = NULL;
+    cfg->replay_path = NULL;
+}
+
+static void usage(const char* prog) {
+    fprintf(stderr,
+        "Usage: %s [options]\n"
+        "  --mix I/S/D          insert/search/delete percentages (default 40/40/20)\n"
+        "  --prefill N          keys inserted before the workload (default 300)\n"
+        "  --keys MIN-MAX       key range (default 1-10000)\n"
+        "  --dist NAME          uniform, zipf, hotset or sequential (default uniform)\n"
+        "  --zipf-theta T       zipf skew, 0 < T < 1 (default 0.99)\n"
+        "  --hot-fraction F     hotset: share of keys that are hot (default 0.1)\n"
+        "  --hot-prob P         hotset: share of operations on hot keys (default 0.9)\n"
+        "  --duration S         stop after S seconds of user CPU time, 0 = no limit (default 10)\n"
+        "  --ops N              stop after N operations, 0 = no limit (default 0)\n"
+        "  --batch N            time batches of N operations, grouped by type, instead of\n"
+        "                       each operation; no latency histograms (default 0)\n"
+        "  --check-every N      operations between CPU-time deadline checks (default 1024)\n"
+        "  --counters           read cycles, instructions, cache and branch misses and LLC\n"
+        "                       loads per phase and operation type with perf_event_open;\n"
+        "                       needs --batch\n"
+        "  --seed N             random seed, 0 = from the clock (default 0)\n"
+        "  --record FILE        write the prefill and every operation to a trace file\n"
+        "  --replay FILE        run the prefill and operations of a trace file instead of\n"
+        "                       generating them, in trace order; the mix and key options\n"
+        "                       are ignored and --batch is not allowed\n"
+        "  --config FILE        read options from FILE, one \"name value\" per line\n",
+        prog);
+}
+
+static const struct option long_options[] = {
+    { "mix", required_argument, NULL, 'm' },
+    { "prefill", required_argument, NULL, 'p' },
+    { "keys", required_argument, NULL, 'k' },
+    { "dist", required_argument, NULL, 'd' },
+    { "zipf-theta", required_argument, NULL, 'z' },
+    { "hot-fraction", required_argument, NULL, 'f' },
+    { "hot-prob", required_argument, NULL, 'h' },
+    { "duration", required_argument, NULL, 't' },
+    { "ops", required_argument, NULL, 'n' },
+    { "batch", required_argument, NULL, 'b' },
+    { "check-every", required_argument, NULL, 'e' },
+    { "counters", no_argument, NULL, 'C' },
+    { "seed", required_argument, NULL, 's' },
+    { "record", required_argument, NULL, 'r' },
+    { "replay", required_argument, NULL, 'R' },
+    { "config", required_argument, NULL, 'c' },
+    { "help", no_argument, NULL, '?' },
+    { NULL, 0, NULL, 0 }
+};
+
+static int read_config(WorkloadConfig* cfg, const char* path);
+
+// Applies one option; returns 0 or -1 if the value is invalid.
+static int set_option(WorkloadConfig* cfg, int opt, const char* value) {
+    char* end = NULL;
+    switch (opt) {
+    case 'm':
+        if (sscanf(value, "%d%*[/:,]%d%*[/:,]%d", &cfg->insert_percent, &cfg->search_percent,
+                   &cfg->delete_percent) != 3)
+            return -1;
+        return cfg->insert_percent + cfg->search_percent + cfg->delete_percent == 100 ? 0 : -1;
+    case 'p':
+        cfg->prefill = (int)strtol(value, &end, 10);
+        return *end || cfg->prefill < 0 ? -1 : 0;
+    case 'k':
+        if (sscanf(value, "%d-%d", &cfg->key_min, &cfg->key_max) != 2)
+            return -1;
+        return cfg->key_min <= cfg->key_max ? 0 : -1;
+    case 'd':
+        return keygen_parse_dist(value, &cfg->dist);
+    case 'z':
+        cfg->zipf_theta = strtod(value, &end);
+        return *end || cfg->zipf_theta <= 0 || cfg->zipf_theta >= 1 ? -1 : 0;
+    case 'f':
+        cfg->hot_fraction = strtod(value, &end);
+        return *end || cfg->hot_fraction <= 0 || cfg->hot_fraction > 1 ? -1 : 0;
+    case 'h':
+        cfg->hot_probability = strtod(value, &end);
+        return *end || cfg->hot_probability < 0 || cfg->hot_probability > 1 ? -1 : 0;
+    case 't':
+        cfg->duration = strtod(value, &end);
+        return *end || cfg->duration < 0 ? -1 : 0;
+    case 'n':
+        cfg->max_ops = strtoll(value, &end, 10);
+        return *end || cfg->max_ops < 0 ? -1 : 0;
+    case 'b':
+        cfg->batch = (int)strtol(value, &end, 10);
+        return *end || cfg->batch < 0 ? -1 : 0;
+    case 'e':
+        cfg->check_every = (int)strtol(value, &end, 10);
+        return *end || cfg->check_every < 1 ? -1 : 0;
+    case 'C':
+        // No argument on the command line; "counters 0/1" in a config file.
+        cfg->counters = value == NULL || strcmp(value, "0") != 0;
+        return 0;
+    case 's':
+        cfg->seed = strtoull(value, &end, 10);
+        return *end ? -1 : 0;
+    case 'r':
+        cfg->record_path = strdup(value);
+        return 0;
+    case 'R':
+        cfg->replay_path = strdup(value);
+        return 0;
+    case 'c':
+        return read_config(cfg, value);
+    }
+    return -1;
+}
+
+static int read_config(WorkloadConfig* cfg, const char* path) {
+    FILE* f = fopen(path, "r");
+    if (f == NULL) {
+        perror(path);
+        return -1;
+    }
+    char line[256], name[64], value[128];
+    int lineno = 0, rc = 0;
+    while (rc == 0 && fgets(line, sizeof(line), f) != NULL) {
+        lineno++;
+        char* hash = strchr(line, '#');
+        if (hash)
+            *hash = '\0';
+        if (sscanf(line, " %63[^= \t\n] %*[=]%127s", name, value) != 2 &&
+            sscanf(line, " %63[^= \t\n] %127s", name, value) != 2)
+            continue;
+        const struct option* o = long_options;
+        while (o->name && strcmp(o->name, name) != 0)
+            o++;
+        if (o->name == NULL || o->val == '?' || set_option(cfg, o->val, value) != 0) {
+            fprintf(stderr, "%s:%d: bad option '%s %s'\n", path, lineno, name, value);
+            rc = -1;
+        }
+    }
+    fclose(f);
+    return rc;
+}
+
+int workload_parse_args(WorkloadConfig* cfg, int argc, char** argv) {
+    int opt;
+    while ((opt = getopt_long(argc, argv, "", long_options, NULL)) != -1) {
+        if (opt == '?' || set_option(cfg, opt, optarg) != 0) {
+            if (opt != '?' && opt != 'c')
+                fprintf(stderr, "%s: bad value '%s'\n", argv[0], optarg);
+            usage(argv[0]);
+            return -1;
+        }
+    }
+    if (optind < argc) {
+        usage(argv[0]);
+        return -1;
+    }
+    if (cfg->replay_path && cfg->batch) {
+        // Batches regroup operations by type, which would not replay the trace.
+        fprintf(stderr, "%s: --replay runs the trace in order and cannot be combined with --batch\n",
+                argv[0]);
+        return -1;
+    }
+    if (cfg->counters && !cfg->batch) {
+        // Around single operations the group reads cost more than the
+        // operations, so the counts would mostly measure the reads.
+        fprintf(stderr, "%s: --counters needs --batch\n", argv[0]);
+        return -1;
+    }
+    if (cfg->duration == 0 && cfg->max_ops == 0 && cfg->replay_path == NULL) {
+        fprintf(stderr, "%s: give --duration or --ops\n", argv[0]);
+        return -1;
+    }
+    if (cfg->seed == 0) {
+        struct timespec ts;
+        clock_gettime(CLOCK_REALTIME, &ts);
+        cfg->seed = (unsigned long long)ts.tv_sec * 1000000000ULL + ts.tv_nsec;
+    }
+    return 0;
+}
+
+void workload_print_config(const WorkloadConfig* cfg) {
+    if (cfg->replay_path) {
+        printf("Workload: replay %s", cfg->replay_path);
+    } else {
+        printf("Workload: mix %d/%d/%d, prefill %d, keys %d-%d, dist %s",
+               cfg->insert_percent, cfg->search_percent, cfg->delete_percent, cfg->prefill,
+               cfg->key_min, cfg->key_max, keygen_dist_name(cfg->dist));
+        if (cfg->dist == DIST_ZIPF)
+            printf(" (theta %.3f)", cfg->zipf_theta);
+        else if (cfg->dist == DIST_HOTSET)
+            printf(" (%.3f of keys get %.3f of ops)", cfg->hot_fraction, cfg->hot_probability);
+    }
+    printf(", duration %.1f s, ops %lld, seed %llu\n", cfg->duration, cfg->max_ops, cfg->seed);
+    if (cfg->batch)
+        printf("Timing: batches of %d, ", cfg->batch);
+    else
+        printf("Timing: per operation, ");
+    if (timer_use_tsc)
+        printf("TSC at %.3f GHz\n", timer_hz() / 1e9);
+    else
+        printf("CLOCK_MONOTONIC\n");
+}
+
+// One latency histogram per operation type, in nanoseconds.
+static LatencyHist insert_hist, search_hist, delete_hist;
+
+static int deadline_passed(const WorkloadConfig* cfg) {
+    if (cfg->duration <= 0)
+        return 0;
     struct rusage usage;
-    double user_time = 0.0;
-    
-    // Loop until the process has consumed at least duration_seconds of user CPU time.
-    while (1) {
-        // Update user CPU time.
-        getrusage(RUSAGE_SELF, &usage);
-        user_time = usage.ru_utime.tv_sec + usage.ru_utime.tv_usec / 1e6;
-        if (user_time >= duration_seconds)
-            break;
-        
-        // --- Insert Operation ---
-        clock_gettime(CLOCK_MONOTONIC, &op_start);
-        list_insert(head, insert_value);
-        clock_gettime(CLOCK_MONOTONIC, &op_end);
-        diff = (op_end.tv_sec - op_start.tv_sec) + (op_end.tv_nsec - op_start.tv_nsec) / 1e9;
-        insert_time += diff;
-        insert_count++;
-        total_operations++;
-        
-        // Cycle the insert_value between 1 and 500.
-        insert_value++;
-        if (insert_value > 50000)
-            insert_value = 1;
-        
-        // // --- Delete Operation ---
-        // clock_gettime(CLOCK_MONOTONIC, &op_start);
-        // int result = list_delete(head, delete_value);
-        // clock_gettime(CLOCK_MONOTONIC, &op_end);
-        // diff = (op_end.tv_sec - op_start.tv_sec) + (op_end.tv_nsec - op_start.tv_nsec) / 1e9;
-        // if (result) { // Only count deletion if it succeeds.
-        //     delete_time += diff;
-        //     delete_count++;
-        // }
-        // total_operations++;
-        
-        // // Cycle the delete_value between 1 and 500.
-        // delete_value++;
-        // if (delete_value > 50000)
-        //     delete_value = 1;
-        
-        // --- Random Search Operation ---
-        // int random_val = random_in_range(1, 10000);
-        // clock_gettime(CLOCK_MONOTONIC, &op_start);
-        // list_search(*head, random_val);
-        // clock_gettime(CLOCK_MONOTONIC, &op_end);
-        // diff = (op_end.tv_sec - op_start.tv_sec) + (op_end.tv_nsec - op_start.tv_nsec) / 1e9;
-        // search_time += diff;
-        // search_count++;
-        // total_operations++;
-    }
-    
-    printf("Total Operations: %d\n", total_operations);
-    printf("Insertions: %d, Time spent: %.4f seconds\n", insert_count, insert_time);
-    printf("Searches: %d, Time spent: %.4f seconds\n", search_count, search_time);
-    printf("Deletions: %d, Time spent: %.4f seconds\n", delete_count, delete_time);
+    getrusage(RUSAGE_SELF, &usage);
+    return usage.ru_utime.tv_sec + usage.ru_utime.tv_usec / 1e6 >= cfg->duration;
+}
+
+static int choose_op(const WorkloadConfig* cfg, KeyGen* keys) {
+    int choice = (int)(keygen_rand(keys) % 100);
+    if (choice < cfg->insert_percent)
+        return OP_INSERT;
+    if (choice < cfg->insert_percent + cfg->search_percent)
+        return OP_SEARCH;
+    return OP_DELETE;
+}
+
+// The next operation, generated or read from the trace being replayed.
+static inline int next_op(const WorkloadConfig* cfg, KeyGen* keys, const TraceRecord** replay, int* key) {
+    if (*replay) {
+        const TraceRecord* rec = (*replay)++;
+        *key = rec->key;
+        return rec->op;
+    }
+    int op = choose_op(cfg, keys);
+    *key = keygen_next(keys, op);
+    return op;
+}
+
+// Runs n operations of one type back to back.
+static inline void run_batch_op(Node** head, int op, const int* keys, int n,
+                                long long* search_hits, long long* delete_hits) {
+    if (op == OP_INSERT) {
+        for (int i = 0; i < n; i++)
+            list_insert(head, keys[i]);
+    } else if (op == OP_SEARCH) {
+        for (int i = 0; i < n; i++)
+            *search_hits += list_search(*head, keys[i]) != NULL;
+    } else {
+        for (int i = 0; i < n; i++)
+            *delete_hits += list_delete(head, keys[i]);
+    }
+}
+
+void run_workload(Node** head, const WorkloadConfig* cfg, KeyGen* keys,
+                  const TraceReader* replay, TraceWriter* record) {
+    long long total_operations = 0;
+    long long count[3] = { 0, 0, 0 };
+    long long search_hits = 0, delete_hits = 0;
+    uint64_t ticks[3] = { 0, 0, 0 };
+    long long remaining = cfg->max_ops ? cfg->max_ops : -1;
+    const TraceRecord* next_record = NULL;
+    PerfGroup counters;
+    PerfSample op_counters[3], before, after;
+    int use_counters = cfg->counters && perf_group_open(&counters) == 0;
+    memset(op_counters, 0, sizeof(op_counters));
+    if (replay) {
+        next_record = replay->records + replay->prefill;
+        if (remaining < 0 || (uint64_t)remaining > replay->ops)
+            remaining = (long long)replay->ops;
+    }
+
+    if (cfg->batch) {
+        // Generate a batch up front, then run its inserts, searches and
+        // deletes as three timed runs: two timer (and counter) reads per run
+        // instead of per operation, and key generation stays out of the timings.
+        int* batch_keys[3];
+        for (int op = 0; op < 3; op++) {
+            batch_keys[op] = malloc(sizeof(int) * cfg->batch);
+            if (batch_keys[op] == NULL) {
+                perror("batch keys");
+                exit(EXIT_FAILURE);
+            }
+        }
+        while (remaining != 0 && !deadline_passed(cfg)) {
+            int n = cfg->batch;
+            if (remaining > 0 && remaining < n)
+                n = (int)remaining;
+            int fill[3] = { 0, 0, 0 };
+            for (int i = 0; i < n; i++) {
+                int key;
+                int op = next_op(cfg, keys, &next_record, &key);
+                batch_keys[op][fill[op]++] = key;
+            }
+
+            for (int op = 0; op < 3; op++) {
+                if (use_counters)
+                    perf_group_read(&counters, &before);
+                uint64_t t0 = timer_now();
+                run_batch_op(head, op, batch_keys[op], fill[op], &search_hits, &delete_hits);
+                uint64_t t1 = timer_now();
+                if (use_counters) {
+                    perf_group_read(&counters, &after);
+                    perf_sample_add_delta(&op_counters[op], &before, &after);
+                }
+                ticks[op] += t1 - t0;
+            }
+            for (int op = 0; op < 3; op++) {
+                count[op] += fill[op];
+                // Recorded in execution order, so a replay runs exactly this.
+                for (int i = 0; record && i < fill[op]; i++)
+                    trace_write_op(record, op, batch_keys[op][i]);
+            }
+            total_operations += n;
+            if (remaining > 0)
+                remaining -= n;
+        }
+        for (int op = 0; op < 3; op++)
+            free(batch_keys[op]);
+    } else {
+        LatencyHist* hist[3] = { &insert_hist, &search_hist, &delete_hist };
+        int until_check = 0;
+        // Loop until the process has consumed duration user CPU seconds or
+        // run max_ops operations; the deadline is checked every check_every.
+        while (remaining != 0) {
+            if (--until_check <= 0) {
+                if (deadline_passed(cfg))
+                    break;
+                until_check = cfg->check_every;
+            }
+
+            int key;
+            int op = next_op(cfg, keys, &next_record, &key);
+            uint64_t start = timer_now();
+            if (op == OP_INSERT) {
+                list_insert(head, key);
+            } else if (op == OP_SEARCH) {
+                search_hits += list_search(*head, key) != NULL;
+            } else {
+                delete_hits += list_delete(head, key);
+            }
+            uint64_t t = timer_now() - start;
+            ticks[op] += t;
+            count[op]++;
+            lat_hist_record(hist[op], timer_ns(t));
+            if (record)
+                trace_write_op(record, op, key);
+            total_operations++;
+            if (remaining > 0)
+                remaining--;
+        }
+    }
+
+    printf("Total Operations: %lld\n", total_operations);
+    printf("Insertions: %lld, Time spent: %.4f seconds\n", count[OP_INSERT], timer_ns(ticks[OP_INSERT]) / 1e9);
+    printf("Searches: %lld, Time spent: %.4f seconds\n", count[OP_SEARCH], timer_ns(ticks[OP_SEARCH]) / 1e9);
+    printf("Deletions: %lld, Time spent: %.4f seconds\n", count[OP_DELETE], timer_ns(ticks[OP_DELETE]) / 1e9);
+    printf("Hits: searches %lld, deletions %lld\n", search_hits, delete_hits);
+    printf("Cost: insert=%.1f search=%.1f delete=%.1f ns/op\n",
+           count[OP_INSERT] ? timer_ns(ticks[OP_INSERT]) / (double)count[OP_INSERT] : 0.0,
+           count[OP_SEARCH] ? timer_ns(ticks[OP_SEARCH]) / (double)count[OP_SEARCH] : 0.0,
+           count[OP_DELETE] ? timer_ns(ticks[OP_DELETE]) / (double)count[OP_DELETE] : 0.0);
+    if (!cfg->batch) {
+        lat_hist_print("insert", &insert_hist);
+        lat_hist_print("search", &search_hist);
+        lat_hist_print("delete", &delete_hist);
+    }
+    if (use_counters) {
+        perf_sample_print("insert", &counters, &op_counters[OP_INSERT]);
+        perf_sample_print("search", &counters, &op_counters[OP_SEARCH]);
+        perf_sample_print("delete", &counters, &op_counters[OP_DELETE]);
+        perf_group_close(&counters);
+    }
 }
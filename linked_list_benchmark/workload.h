@@ -3,8 +3,41 @@
 
 #include <time.h>
 #include "list_interface.h"
+#include "keygen.h"
+#include "trace.h"
+
+typedef struct WorkloadConfig {
+    /* Operation mix in percent; the three add up to 100. */
+    int insert_percent;
+    int search_percent;
+    int delete_percent;
+    int prefill;              /* keys inserted before the fork */
+    int key_min;
+    int key_max;
+    KeyDist dist;
+    double zipf_theta;
+    double hot_fraction;      /* hotset: share of the key range that is hot */
+    double hot_probability;   /* hotset: share of operations on hot keys */
+    double duration;          /* user CPU seconds; 0 = no limit */
+    long long max_ops;        /* operations; 0 = no limit */
+    int batch;                /* time batches of this many operations; 0 = time each one */
+    int check_every;          /* operations between CPU-time deadline checks */
+    int counters;             /* read hardware counters per phase and op type (batch only) */
+    unsigned long long seed;  /* 0 = from the clock */
+    const char* record_path;  /* write the prefill and operations here */
+    const char* replay_path;  /* run this trace instead of generating keys */
+} WorkloadConfig;
+
+void workload_default_config(WorkloadConfig* cfg);
+/* Fill cfg from the command line (and any --config file); returns 0, or -1
+ * after printing a usage message. */
+int workload_parse_args(WorkloadConfig* cfg, int argc, char** argv);
+void workload_print_config(const WorkloadConfig* cfg);
 
 int random_in_range(int min, int max);
-void run_workload(Node** head, int insert_percentage, int search_percentage, int delete_percentage, int duration_seconds);
+/* Generates operations from keys, or replays them from replay if it is not
+ * NULL; records what runs to record if that is not NULL. */
+void run_workload(Node** head, const WorkloadConfig* cfg, KeyGen* keys,
+                  const TraceReader* replay, TraceWriter* record);
 
 #endif
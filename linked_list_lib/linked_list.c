@@ -2,6 +2,8 @@
 #include <stdlib.h>
 #include <stdbool.h>
 #include "linked_list.h"
+#include "../linked_list_benchmark/list_probes.h"
+#include "../linked_list_benchmark/list_stats.h"
 #define CACHE_LINE_SIZE 64
 #define NODE_CHUNK_SIZE 100000
 
@@ -10,6 +12,16 @@ Chunk* pool_chunks = NULL;
 
 void insert_exit_marker() {}
 
+LIST_PROBES_DEFINE_SEMAPHORES;
+
+/* Same contract as the benchmark libraries, so verif_monitor.py can check
+ * deletes in every process that maps this library. */
+__attribute__((noinline, used, externally_visible))
+void deletion_instrumentation(void *pred, void *target, void *succ) {
+    volatile int dummy = 0;
+    dummy++;
+}
+
 void allocate_pool_chunk() {
     Node* new_chunk = NULL;
     if (posix_memalign((void**)&new_chunk, CACHE_LINE_SIZE, NODE_CHUNK_SIZE * sizeof(Node)) != 0) {
@@ -30,6 +42,7 @@ void allocate_pool_chunk() {
         new_chunk[i].next_free = node_pool;
         node_pool = &new_chunk[i];
     }
+    LIST_STATS_CHUNK(NODE_CHUNK_SIZE);
 }
 
 inline void return_node(Node* node) {
@@ -56,29 +69,42 @@ inline void insert(Node** head, int data) {
     new_node->data = data;
     new_node->next = *head;
     *head = new_node;
+    LIST_PROBE_INSERT_DONE(head, new_node, data);
+    LIST_STATS_INSERT();
     insert_exit_marker();
 }
 
-void delete(Node** head, int data) {
+int delete(Node** head, int data) {
     if (*head != NULL && (*head)->data == data) {
         Node* temp = *head;
         *head = (*head)->next;
+        LIST_PROBE_DELETE_UNLINK(head, NULL, temp, temp->next, data);
         return_node(temp);
-        return;
+        LIST_STATS_DELETE(1, 1);
+        return 1;
     }
 
     Node* prev = *head;
     Node* temp = (*head != NULL) ? (*head)->next : NULL;
+    unsigned long steps = 1;
 
     while (temp != NULL) {
+        steps++;
         if (temp->data == data) {
-            prev->next = temp->next;
+            Node* succ = temp->next;
+            LIST_DELETE_HOOK(prev, temp, succ);
+            prev->next = succ;
+            LIST_PROBE_DELETE_UNLINK(head, prev, temp, succ, data);
             return_node(temp);
-            return;
+            LIST_STATS_DELETE(1, steps);
+            return 1;
         }
         prev = temp;
         temp = temp->next;
     }
+    LIST_PROBE_DELETE_MISS(head, data);
+    LIST_STATS_DELETE(0, *head != NULL ? steps : 0);
+    return 0;
 }
 
 void show(Node* head) {
@@ -92,11 +118,17 @@ void show(Node* head) {
 
 Node* search(Node* head, int data) {
     Node* current = head;
+    unsigned long steps = 0;
     while (current != NULL) {
+        steps++;
         if (current->data == data) {
+            LIST_PROBE_SEARCH_HIT(head, data, current);
+            LIST_STATS_SEARCH(1, steps);
             return current;
         }
         current = current->next;
     }
+    LIST_PROBE_SEARCH_MISS(head, data);
+    LIST_STATS_SEARCH(0, steps);
     return NULL;
 }
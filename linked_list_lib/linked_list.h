@@ -13,7 +13,7 @@ typedef struct Chunk {
 } Chunk;
 
 void insert(Node** head, int data);
-void delete(Node** head, int data);
+int delete(Node** head, int data);
 void show(Node* head);
 Node* search(Node* head, int data);
 void return_node(Node* node);